@@ -0,0 +1,206 @@
+# Copyright (c) 2017, Matt Layman
+"""Benchmark end-to-end builds of synthetic sites.
+
+For each scale, a site is generated and built three ways:
+
+* ``cold``: the first build into an empty output directory.
+* ``noop``: a rebuild with no changes.
+* ``incremental``: a rebuild after a single post changes.
+
+Each build runs in a fresh process through ``Director.produce``
+so the peak memory of one build does not leak into the next.
+
+Examples::
+
+    $ python benchmarks/run.py --scales 100 1000 --output results.json
+    $ python benchmarks/run.py --scales 100 1000 --baseline results.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from sitegen import SiteGenerator
+
+SCENARIOS = ('cold', 'noop', 'incremental')
+
+
+def peak_rss():
+    """Get the peak resident set size in bytes of this process
+    and its children or ``None`` when the platform cannot say."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    usage = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # Linux reports kilobytes while OS X reports bytes.
+    if sys.platform == 'darwin':
+        return usage
+    return usage * 1024
+
+
+def measure(site_path, outdir, jobs):
+    """Build the site once and measure it."""
+    from handroll.commands.base import prepare_director
+    from handroll.site import Site
+
+    args = argparse.Namespace(
+        site=site_path, outdir=outdir, force=False, timing=False,
+        profile=None, cprofile=None, jobs=jobs)
+    start = time.perf_counter()
+    site = Site(site_path)
+    director = prepare_director(args, site)
+    director.produce()
+    seconds = time.perf_counter() - start
+    return {'seconds': seconds, 'peak_rss': peak_rss()}
+
+
+def run_build(site_path, outdir, jobs):
+    """Run a build in a fresh process and get its measurements."""
+    command = [
+        sys.executable, os.path.abspath(__file__), 'measure',
+        site_path, outdir, '--jobs', str(jobs)]
+    output = subprocess.check_output(command)
+    return json.loads(output.decode('utf-8').splitlines()[-1])
+
+
+def change_one_source(sources):
+    """Change a post in the middle of the site like an author would."""
+    source = sources[len(sources) // 2]
+    with open(source, 'a') as f:
+        f.write('\nAn edit to the post.\n')
+
+
+def benchmark_scale(workdir, pages, jobs):
+    """Benchmark every scenario for a site with the number of pages."""
+    site_path = os.path.join(workdir, 'site{0}'.format(pages))
+    outdir = os.path.join(workdir, 'output{0}'.format(pages))
+    generator = SiteGenerator(site_path, pages)
+    files = generator.generate()
+
+    results = []
+    for scenario in SCENARIOS:
+        if scenario == 'incremental':
+            change_one_source(generator.sources)
+        measurements = run_build(site_path, outdir, jobs)
+        result = {
+            'pages': pages,
+            'files': files,
+            'scenario': scenario,
+            'seconds': measurements['seconds'],
+            'files_per_second': files / measurements['seconds'],
+            'peak_rss': measurements['peak_rss'],
+        }
+        print_result(result)
+        results.append(result)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Compare results to a baseline and return the regressions."""
+    baseline_seconds = dict(
+        ((result['pages'], result['scenario']), result['seconds'])
+        for result in baseline['results'])
+    regressions = []
+    print('\nComparison to baseline:')
+    for result in results:
+        key = (result['pages'], result['scenario'])
+        if key not in baseline_seconds:
+            continue
+        ratio = result['seconds'] / baseline_seconds[key]
+        regressed = ratio > 1 + threshold
+        print('{0:>8} {1:<12} {2:>7.2f}x{3}'.format(
+            result['pages'], result['scenario'], ratio,
+            '  REGRESSION' if regressed else ''))
+        if regressed:
+            regressions.append(result)
+    return regressions
+
+
+def print_result(result):
+    rss = result['peak_rss']
+    print('{pages:>8} {scenario:<12} {seconds:>9.3f}s '
+          '{files_per_second:>10.1f} files/s {rss:>9} MB'.format(
+              rss='-' if rss is None else '{0:.1f}'.format(rss / 2 ** 20),
+              **result))
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    subparsers = parser.add_subparsers(dest='command')
+
+    run_parser = subparsers.add_parser('run', help='run the benchmarks')
+    run_parser.add_argument(
+        '--scales', type=int, nargs='+', default=[100, 1000],
+        help='the numbers of pages to benchmark (default: 100 1000)')
+    run_parser.add_argument(
+        '-j', '--jobs', type=int, default=1,
+        help='compose files with this many worker processes')
+    run_parser.add_argument(
+        '--output', help='write the results as JSON to this file')
+    run_parser.add_argument(
+        '--baseline', help='compare to the results in this JSON file')
+    run_parser.add_argument(
+        '--threshold', type=float, default=0.1,
+        help='the slowdown fraction that counts as a regression'
+             ' (default: 0.1)')
+    run_parser.add_argument(
+        '--workdir', help='generate sites in this directory and keep them')
+
+    measure_parser = subparsers.add_parser(
+        'measure', help='build a site once and print the measurements')
+    measure_parser.add_argument('site')
+    measure_parser.add_argument('outdir')
+    measure_parser.add_argument('-j', '--jobs', type=int, default=1)
+
+    # Running the benchmarks is the default command.
+    if len(argv) < 2 or argv[1] not in ('run', 'measure', '-h', '--help'):
+        argv = argv[:1] + ['run'] + argv[1:]
+    args = parser.parse_args(argv[1:])
+
+    if args.command == 'measure':
+        print(json.dumps(measure(args.site, args.outdir, args.jobs)))
+        return 0
+
+    from handroll import __version__
+
+    workdir = args.workdir or tempfile.mkdtemp()
+    results = []
+    print('{0:>8} {1:<12} {2:>10} {3:>16} {4:>12}'.format(
+        'pages', 'scenario', 'time', 'throughput', 'peak RSS'))
+    try:
+        for pages in args.scales:
+            results.extend(benchmark_scale(workdir, pages, args.jobs))
+    finally:
+        if args.workdir is None:
+            shutil.rmtree(workdir)
+
+    report = {
+        'handroll': __version__,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'jobs': args.jobs,
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,227 @@
+# Copyright (c) 2017, Matt Layman
+"""Generate synthetic sites for benchmarking"""
+
+import datetime
+import os
+import random
+
+CONFIG = """[site]
+domain = http://bench.example.com
+with_blog = true
+
+[blog]
+atom_author = Benchmark Author
+atom_id = http://bench.example.com/feed.xml
+atom_title = A Benchmark Blog
+atom_url = http://bench.example.com/archive.html
+atom_output = feed.xml
+list_template = archive.j2
+list_output = archive.html
+"""
+
+DEFAULT_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head><title>$title</title></head>
+<body>
+$content
+</body>
+</html>
+"""
+
+BASE_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+  <title>{% block title %}{{ title }}{% endblock %}</title>
+  <link rel="stylesheet" href="/static/css/site.css">
+</head>
+<body>
+  {% include "nav.j2" %}
+  {% block body %}{% endblock %}
+</body>
+</html>
+"""
+
+NAV_TEMPLATE = """<nav>
+  <a href="/">Home</a>
+  <a href="/archive.html">Archive</a>
+</nav>
+"""
+
+LAYOUT_TEMPLATE = """{% extends "base.j2" %}
+{% block body %}
+<main>{% block main %}{% endblock %}</main>
+{% endblock %}
+"""
+
+POST_TEMPLATE = """{% extends "layout.j2" %}
+{% block main %}
+<article>
+  <h1>{{ title }}</h1>
+  <p>{% for tag in tags %}<span>{{ tag }}</span> {% endfor %}</p>
+  {{ content }}
+</article>
+{% if post.previous %}
+<a href="{{ post.previous.route }}">Previous</a>
+{% endif %}
+{% if post.next %}<a href="{{ post.next.route }}">Next</a>{% endif %}
+{% endblock %}
+"""
+
+ARCHIVE_TEMPLATE = """{% extends "layout.j2" %}
+{% block main %}
+<ul>
+{{ blog_list }}
+</ul>
+{% endblock %}
+"""
+
+WORDS = (
+    'static', 'site', 'generator', 'artisan', 'template', 'markdown',
+    'python', 'build', 'output', 'content', 'feed', 'blog', 'page', 'fast',
+    'simple', 'craft', 'theme', 'source', 'compose', 'render', 'the', 'a',
+    'with', 'and', 'for', 'of', 'to', 'in',
+)
+
+TAGS = ('python', 'web', 'design', 'performance', 'testing', 'release')
+
+# The share of pages for each markup format
+FORMATS = (
+    ('.md', 6),
+    ('.rst', 2),
+    ('.textile', 2),
+)
+
+
+class SiteGenerator(object):
+    """Generate a synthetic site with blog posts, plain pages,
+    a Jinja template hierarchy, and static assets.
+
+    Every generated site with the same ``pages`` and ``seed``
+    has the same content.
+
+    :param path: The directory to generate the site in
+    :param pages: The number of pages to generate
+    :param seed: The seed for the random content
+    """
+
+    # One in this many pages is a plain page instead of a blog post.
+    PLAIN_PAGE_RATIO = 10
+    # One static asset is made for this many pages.
+    ASSET_RATIO = 10
+    POSTS_PER_DIRECTORY = 500
+
+    def __init__(self, path, pages, seed=0):
+        self.path = path
+        self.pages = pages
+        self._random = random.Random(seed)
+        self.sources = []
+
+    def generate(self):
+        """Generate the site and return the number of files in it."""
+        os.makedirs(self.path)
+        self._write('handroll.conf', CONFIG)
+        self._write('template.html', DEFAULT_TEMPLATE)
+        self._write('templates/base.j2', BASE_TEMPLATE)
+        self._write('templates/nav.j2', NAV_TEMPLATE)
+        self._write('templates/layout.j2', LAYOUT_TEMPLATE)
+        self._write('templates/post.j2', POST_TEMPLATE)
+        self._write('templates/archive.j2', ARCHIVE_TEMPLATE)
+
+        formats = []
+        for extension, share in FORMATS:
+            formats.extend([extension] * share)
+
+        start = datetime.datetime(2010, 1, 1)
+        for index in range(self.pages):
+            extension = formats[index % len(formats)]
+            if index % self.PLAIN_PAGE_RATIO == 0:
+                self._make_page(index, extension)
+            else:
+                date = start + datetime.timedelta(hours=index)
+                self._make_post(index, extension, date)
+
+        for index in range(max(1, self.pages // self.ASSET_RATIO)):
+            self._make_asset(index)
+
+        count = 0
+        for dirpath, dirnames, filenames in os.walk(self.path):
+            count += len(filenames)
+        return count
+
+    def _make_post(self, index, extension, date):
+        directory = 'posts/{0:04d}'.format(index // self.POSTS_PER_DIRECTORY)
+        tags = self._random.sample(TAGS, 3)
+        frontmatter = '\n'.join([
+            '---',
+            'blog: true',
+            'title: "{0}"'.format(self._sentence(6)),
+            'date: {0}'.format(date.strftime('%Y-%m-%dT%H:%M:%S')),
+            'summary: "{0}"'.format(self._sentence(12)),
+            'tags: [{0}]'.format(', '.join(tags)),
+            'template: post.j2',
+            '---',
+        ])
+        body = self._body(extension)
+        self._add_source(
+            '{0}/post{1}{2}'.format(directory, index, extension),
+            frontmatter + '\n' + body)
+
+    def _make_page(self, index, extension):
+        # Plain pages take the title from the first line.
+        body = self._body(extension)
+        self._add_source(
+            'pages/page{0}{1}'.format(index, extension),
+            self._sentence(4) + '\n' + body)
+
+    def _make_asset(self, index):
+        kind = index % 3
+        if kind == 0:
+            self._write(
+                'static/css/style{0}.css'.format(index),
+                'body {{ margin: {0}px; }}\n'.format(index) * 50)
+        elif kind == 1:
+            self._write(
+                'static/js/script{0}.js'.format(index),
+                'console.log({0});\n'.format(index) * 50)
+        else:
+            path = os.path.join(
+                self.path, 'static/images/image{0}.png'.format(index))
+            self._makedirs(path)
+            with open(path, 'wb') as f:
+                f.write(bytes(
+                    self._random.getrandbits(8) for _ in range(4096)))
+
+    def _body(self, extension):
+        paragraphs = [self._sentence(40) for _ in range(5)]
+        if extension == '.md':
+            return '\n\n'.join(
+                ['## ' + self._sentence(4)] + paragraphs +
+                ['```python\nprint("hello")\n```', '* one\n* two\n* three'])
+        if extension == '.rst':
+            heading = self._sentence(4)
+            return '\n\n'.join(
+                [heading + '\n' + '=' * len(heading)] + paragraphs +
+                ['.. code-block:: python\n\n    print("hello")',
+                 '* one\n* two\n* three'])
+        return '\n\n'.join(
+            ['h2. ' + self._sentence(4)] + paragraphs +
+            ['* one\n* two\n* three'])
+
+    def _sentence(self, length):
+        words = [self._random.choice(WORDS) for _ in range(length)]
+        return ' '.join(words).capitalize()
+
+    def _add_source(self, name, content):
+        self._write(name, content + '\n')
+        self.sources.append(os.path.join(self.path, name))
+
+    def _write(self, name, content):
+        path = os.path.join(self.path, name)
+        self._makedirs(path)
+        with open(path, 'w') as f:
+            f.write(content)
+
+    def _makedirs(self, path):
+        dirname = os.path.dirname(path)
+        if not os.path.exists(dirname):
+            os.makedirs(dirname)
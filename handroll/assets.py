@@ -0,0 +1,217 @@
+# Copyright (c) 2017, Matt Layman
+"""Put static assets in the output"""
+
+import errno
+import json
+import os
+import posixpath
+import shutil
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+from handroll import logger
+from handroll.exceptions import AbortError
+from handroll.i18n import _
+
+COPY = 'copy'
+HARDLINK = 'hardlink'
+SYMLINK = 'symlink'
+COPY_MODES = (COPY, HARDLINK, SYMLINK)
+
+# The Linux ioctl that shares the data blocks of one file with another
+# on file systems with copy on write (e.g., Btrfs or XFS).
+FICLONE = 0x40049409
+
+
+def put_asset(source_file, destination, mode=COPY):
+    """Put a source file at the destination with the copy mode.
+
+    ``copy`` makes a real copy but lets the operating system do the work.
+    It shares the data blocks when the file system can (a reflink)
+    or copies in the kernel with ``copy_file_range``.
+    ``hardlink`` and ``symlink`` do not copy any data
+    which is fast for development builds but ties the output to the site.
+    A hard link falls back to a copy
+    when the output is on another file system.
+    """
+    # Remove the old file first. Writing through a link from an earlier
+    # build would change the source.
+    if os.path.lexists(destination):
+        os.remove(destination)
+
+    if mode == SYMLINK:
+        os.symlink(os.path.abspath(source_file), destination)
+        return
+
+    if mode == HARDLINK:
+        try:
+            os.link(source_file, destination)
+            return
+        except OSError as ex:
+            if ex.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK):
+                raise
+            logger.debug(_('Unable to link {source_file} ... '
+                           'Copying it instead.').format(
+                source_file=source_file))
+
+    copy_file(source_file, destination)
+
+
+def copy_file(source_file, destination):
+    """Copy the file data and permissions with the fastest available way."""
+    if not (
+        _clone_file(source_file, destination) or
+        _copy_file_range(source_file, destination)
+    ):
+        shutil.copyfile(source_file, destination)
+    shutil.copymode(source_file, destination)
+
+
+def _clone_file(source_file, destination):
+    """Try to make the destination share the source's data blocks."""
+    if fcntl is None:
+        return False
+    with open(source_file, 'rb') as source, open(destination, 'wb') as dest:
+        try:
+            fcntl.ioctl(dest.fileno(), FICLONE, source.fileno())
+        except (IOError, OSError):
+            return False
+    return True
+
+
+def _copy_file_range(source_file, destination):
+    """Try to copy the data in the kernel without reading it into Python."""
+    copy_range = getattr(os, 'copy_file_range', None)
+    if copy_range is None:
+        return False
+    with open(source_file, 'rb') as source, open(destination, 'wb') as dest:
+        remaining = os.fstat(source.fileno()).st_size
+        try:
+            while remaining > 0:
+                copied = copy_range(
+                    source.fileno(), dest.fileno(), remaining)
+                if copied == 0:
+                    break
+                remaining -= copied
+        except OSError:
+            return False
+    return remaining <= 0
+
+
+class AssetManifest(object):
+    """An asset manifest maps the names of assets to fingerprinted names.
+
+    A fingerprinted name has a hash of the asset's content
+    (e.g., ``css/site.css`` becomes ``css/site.1a2b3c4d.css``).
+    The name changes whenever the content does
+    so the assets can be cached forever by browsers and CDNs.
+
+    Names are relative to the output directory and use ``/`` separators.
+    """
+
+    FILENAME = 'assets.json'
+    DIGEST_LENGTH = 8
+    EXTENSIONS = (
+        '.css', '.js', '.gif', '.jpeg', '.jpg', '.png', '.svg', '.webp',
+        '.eot', '.otf', '.ttf', '.woff', '.woff2',
+    )
+
+    def __init__(self, extensions=EXTENSIONS):
+        self.extensions = extensions
+        # The fingerprinted names by name
+        self._names = {}
+        # The source files by name
+        self._name_sources = {}
+        # The names and digests by source file
+        self._sources = {}
+
+    def is_asset_name(self, name):
+        """Check if an output name has an extension to fingerprint."""
+        return name.lower().endswith(self.extensions)
+
+    def add(self, source_file, name, digest):
+        """Add an asset made from the source file.
+
+        Return ``True`` when the asset is new or its content changed.
+        """
+        if self._sources.get(source_file) == (name, digest):
+            return False
+        self._sources[source_file] = (name, digest)
+        self._name_sources[name] = source_file
+        root, ext = posixpath.splitext(name)
+        self._names[name] = '{root}.{digest}{ext}'.format(
+            root=root, digest=digest[:self.DIGEST_LENGTH], ext=ext)
+        return True
+
+    def remove(self, source_file):
+        """Remove the asset made from a source file that is gone."""
+        name, digest = self._sources.pop(source_file, (None, None))
+        if name is None:
+            return
+        if self._name_sources.get(name) == source_file:
+            del self._name_sources[name]
+            del self._names[name]
+
+    def has_source(self, source_file):
+        """Check if the source file makes an asset."""
+        return source_file in self._sources
+
+    def get_filename(self, source_file, filename):
+        """Get the fingerprinted output filename for a source file.
+
+        Files that are not assets keep the filename.
+        """
+        if source_file not in self._sources:
+            return filename
+        name, digest = self._sources[source_file]
+        return posixpath.basename(self._names[name])
+
+    def get_digests(self, source_files):
+        """Get the digests of the assets made from the source files."""
+        return dict(
+            self._sources[source_file]
+            for source_file in source_files
+            if source_file in self._sources)
+
+    def url(self, name):
+        """Get the URL of the fingerprinted asset with the name."""
+        fingerprinted = self._names.get(name.lstrip('/'))
+        if fingerprinted is None:
+            raise AbortError(_('There is no asset named {name}.').format(
+                name=name))
+        return '/' + fingerprinted
+
+    def get_source(self, name):
+        """Get the source file of the asset with the name."""
+        return self._name_sources.get(name.lstrip('/'))
+
+    def to_json(self):
+        """Serialize the manifest of names to fingerprinted names."""
+        return json.dumps(self._names, indent=2, sort_keys=True)
+
+
+class AssetLookup(object):
+    """An asset lookup is the helper that templates call
+    to get the URL of a fingerprinted asset.
+
+    The lookup remembers the source of every asset it found
+    so the page composes again when one of those assets changes.
+    Without an asset manifest (i.e., assets are not fingerprinted),
+    the URL is the asset's usual name.
+
+    :param assets: The ``AssetManifest`` or ``None``
+    """
+
+    def __init__(self, assets):
+        self._assets = assets
+        self.used = set()
+
+    def __call__(self, name):
+        if self._assets is None:
+            return '/' + name.lstrip('/')
+        url = self._assets.url(name)
+        self.used.add(self._assets.get_source(name))
+        return url
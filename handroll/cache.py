@@ -0,0 +1,97 @@
+# Copyright (c) 2017, Matt Layman
+"""The cache of generated content"""
+
+import hashlib
+import io
+import os
+import tempfile
+
+from handroll import logger
+from handroll.i18n import _
+
+
+class ContentCache(object):
+    """An on-disk cache of content that composers generate from source.
+
+    Converting a source body (e.g., Markdown to HTML) is the expensive part
+    of composing a page. When only a template changes, the body is the same
+    so the cached content skips the conversion.
+
+    Entries are files named by their key. A hit refreshes an entry's modified
+    time so that pruning removes the least recently used entries first.
+
+    :param path: The directory to store cache entries
+    :param max_size: The size in bytes that the cache may grow to
+    """
+
+    def __init__(self, path, max_size):
+        self.path = path
+        self.max_size = max_size
+
+    def make_key(self, *parts):
+        """Make a key from all the parts that affect the generated content.
+        """
+        key = hashlib.sha1()
+        for part in parts:
+            key.update(part.encode('utf-8'))
+            # Separate parts so that ('ab', 'c') and ('a', 'bc') differ.
+            key.update(b'\0')
+        return key.hexdigest()
+
+    def get(self, key):
+        """Get the content for the key or ``None`` if it is missing."""
+        entry = self._get_entry_path(key)
+        try:
+            with io.open(entry, 'r', encoding='utf-8') as f:
+                content = f.read()
+        except (IOError, OSError):
+            return None
+
+        try:
+            os.utime(entry, None)
+        except OSError:
+            # Another process may have pruned the entry. The content is fine.
+            pass
+        return content
+
+    def set(self, key, content):
+        """Store the content for the key."""
+        entry = self._get_entry_path(key)
+        dirname = os.path.dirname(entry)
+        os.makedirs(dirname, exist_ok=True)
+
+        # Worker processes may store the same entry at the same time
+        # so write to a unique file and move it into place.
+        fd, temporary_path = tempfile.mkstemp(dir=dirname)
+        with io.open(fd, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(temporary_path, entry)
+
+    def prune(self):
+        """Remove the least recently used entries until the cache fits."""
+        if not os.path.exists(self.path):
+            return
+
+        entries = []
+        size = 0
+        for dirpath, dirnames, filenames in os.walk(self.path):
+            for filename in filenames:
+                entry = os.path.join(dirpath, filename)
+                stat = os.stat(entry)
+                entries.append((stat.st_mtime, stat.st_size, entry))
+                size += stat.st_size
+
+        if size <= self.max_size:
+            return
+
+        logger.info(_('Pruning the content cache ...'))
+        entries.sort()
+        for mtime, entry_size, entry in entries:
+            os.remove(entry)
+            size -= entry_size
+            if size <= self.max_size:
+                break
+
+    def _get_entry_path(self, key):
+        # Spread the entries out so no single directory gets huge.
+        return os.path.join(self.path, key[:2], key)
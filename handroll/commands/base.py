@@ -3,13 +3,16 @@
 import sys
 
 from handroll.configuration import build_config
-from handroll.director import Director
 from handroll.extensions.loader import ExtensionLoader
 from handroll.i18n import _
 
 
 def prepare_director(args, site):
     """Prepare the director to produce a site."""
+    # The director imports everything that a build needs.
+    # Wait for a command to run so that startup (e.g., --help) stays fast.
+    from handroll.director import Director
+
     loader = ExtensionLoader()
     loader.load()
     config = build_config(site.config_file, args)
@@ -2,9 +2,19 @@
 
 from handroll.commands.base import Command, prepare_director
 from handroll.i18n import _
-from handroll.server import serve
 from handroll.site import Site
 
+# These match the server defaults. The server is not imported for them
+# because its web server and file watching libraries are slow to import.
+PORT = 8000
+BIND = ''
+
+
+def serve(site, director, **kwargs):
+    """Run the development server."""
+    from handroll import server
+    server.serve(site, director, **kwargs)
+
 
 class WatchCommand(Command):
 
@@ -21,9 +31,17 @@ class WatchCommand(Command):
         parser.add_argument('outdir', nargs='?', help=_(
             'an optional output directory to create or'
             ' update if it already exists'))
+        parser.add_argument(
+            '-p', '--port', type=int, default=PORT,
+            help=_('the port for the web server (default: {port})').format(
+                port=PORT))
+        parser.add_argument(
+            '-b', '--bind', default=BIND, metavar='ADDRESS',
+            help=_('the address for the web server to bind to'
+                   ' (default: all interfaces)'))
 
     def run(self, args):
         site = Site.build(args)
         director = prepare_director(args, site)
         director.produce()
-        serve(site, director)
+        serve(site, director, port=args.port, bind=args.bind)
@@ -1,19 +1,35 @@
 # Copyright (c) 2017, Matt Layman
 
+from concurrent.futures import ThreadPoolExecutor
 import filecmp
 import os
-import shutil
-import warnings
-
-from pkg_resources import iter_entry_points
 
 from handroll import logger
+from handroll.assets import COPY, AssetLookup, put_asset
+from handroll.documents import DocumentStore
 from handroll.i18n import _
+from handroll.output import ADDED, MODIFIED, UNCHANGED, OutputWriter
+from handroll.plugins import get_entry_points
+from handroll.profiler import NULL_TIMER
 
 
 class Composer(object):
     """Interface for all composers"""
 
+    # The ``BuildManifest`` that records the inputs of each output.
+    manifest = None
+    # The ``ContentCache`` that stores generated content between builds.
+    content_cache = None
+    # The ``BuildProfiler`` that times the phases of composing.
+    profiler = None
+    # The ``OutputWriter`` that writes output files.
+    writer = None
+    # The ``AssetManifest`` when assets are fingerprinted.
+    assets = None
+    # A batched composer queues work in ``compose`` and finishes it
+    # in ``flush`` so it always composes in the director's process.
+    batched = False
+
     def __init__(self, config):
         """Each composer is given the configuration when instantiated."""
         self._config = config
@@ -40,33 +56,113 @@ class Composer(object):
         """Check if frontmatter is permitted for the file type."""
         raise NotImplementedError
 
+    def flush(self):
+        """Finish any work that was deferred until every file was composed.
+
+        The director calls this at the end of each build.
+        """
+
+    def get_asset_digest(self, source_file):
+        """Get a hash of the content of the asset made from the source file.
+
+        Composers that do not make assets return ``None``.
+        """
+        return None
+
+    def _fingerprint(self, source_file, **inputs):
+        """Fingerprint the inputs that make an output file.
+
+        Without a manifest, there is nothing to compare against
+        so there is no fingerprint.
+        """
+        if self.manifest is None:
+            return None
+        return self.manifest.fingerprint(self, source_file, **inputs)
+
+    def _record(self, output_file, fingerprint):
+        """Record the fingerprint of a written output file."""
+        if fingerprint is not None:
+            self.manifest.record(output_file, fingerprint)
+
+    def _get_used_assets(self, source_file):
+        """Get the source files of the assets
+        that the source file's output used in the last build."""
+        if self.assets is None or self.manifest is None:
+            return []
+        return [
+            path for path in self.manifest.get_dependencies(source_file)
+            if self.assets.has_source(path)]
+
+    def _make_asset_lookup(self):
+        """Make the helper that templates use to find assets."""
+        return AssetLookup(self.assets)
+
+    def _record_used_assets(self, source_file, dependencies, fingerprint,
+                            asset_sources):
+        """Record the assets that an output uses as dependencies
+        and add their content to the fingerprint.
+
+        When an asset changes, the outputs that use it compose again.
+        """
+        if self.manifest is not None:
+            self.manifest.record_dependencies(
+                source_file, list(dependencies) + list(asset_sources))
+        if fingerprint is not None:
+            if asset_sources:
+                fingerprint['assets'] = self.assets.get_digests(asset_sources)
+            else:
+                fingerprint.pop('assets', None)
+
+    def _write(self, output_file, content):
+        """Write the content (bytes) to the output file
+        unless the file already has the same content."""
+        writer = self.writer
+        if writer is None:
+            writer = OutputWriter()
+        with self._time('write'):
+            writer.write(output_file, content)
+
+    def _mark(self, output_file, change):
+        """Mark the change to an output file that the writer did not write.
+        """
+        if self.writer is not None:
+            self.writer.mark(output_file, change)
+
+    def _mark_written(self, output_file):
+        """Mark an output file that is about to be written without the writer.
+        """
+        self._mark(
+            output_file, MODIFIED if os.path.exists(output_file) else ADDED)
+
+    def _time(self, phase):
+        """Time a phase of composing (e.g., ``convert`` or ``write``)."""
+        if self.profiler is None:
+            return NULL_TIMER
+        return self.profiler.phase(phase)
+
 
 class Composers(object):
     """A collection of available composers"""
 
-    def __init__(self, config):
+    def __init__(self, config, manifest=None, content_cache=None,
+                 profiler=None, writer=None, assets=None,
+                 frontmatter_index=None):
         self._config = config
-        self._available_composers = {}
         self._composers = {}
+        self.manifest = manifest
+        self.content_cache = content_cache
+        self.profiler = profiler
+        self.writer = writer
+        self.assets = assets
+        self.frontmatter_index = frontmatter_index
         self.default_composer = CopyComposer(config)
+        self._attach_services(self.default_composer)
+        # Documents are shared so that a source file is parsed once per build.
+        self.documents = DocumentStore()
 
-        # pkg_resources emits an annoying message related to security that is
-        # completely irritating for an average user to address. Filter it out.
-        #
-        # For the record, the warning is:
-        #
-        # pkg_resources.py:991: UserWarning: ~/.python-eggs is writable by
-        # group/others and vulnerable to attack when used with
-        # get_resource_filename. Consider a more secure location (set with
-        # .set_extraction_path or the PYTHON_EGG_CACHE environment variable).
-        #
-        # handroll assumes a level of trust in whatever is placed in the
-        # ``handroll.composers`` entry points.
-        warnings.filterwarnings('ignore', '.*get_resource_filename.*')
-
-        for entry_point in iter_entry_points('handroll.composers'):
-            cls = entry_point.load()
-            self._available_composers[entry_point.name] = cls
+        # Composer classes are loaded on demand so that only the libraries
+        # for the site's file types are imported.
+        self._available_composers = get_entry_points('handroll.composers')
 
     def select_composer_for(self, filename):
         _, ext = os.path.splitext(filename)
@@ -78,18 +174,38 @@ class Composers(object):
         """
         if ext not in self._composers:
             if ext in self._available_composers:
-                composer_cls = self._available_composers[ext]
-                self._composers[ext] = composer_cls(self._config)
+                composer_cls = self._available_composers[ext].load()
+                composer = composer_cls(self._config)
+                self._attach_services(composer)
+                if composer.permit_frontmatter:
+                    composer.documents = self.documents
+                    composer.frontmatter_index = self.frontmatter_index
+                self._composers[ext] = composer
             else:
                 self._composers[ext] = self.default_composer
 
         return self._composers[ext]
 
+    def _attach_services(self, composer):
+        """Give the composer the services that the build shares."""
+        composer.manifest = self.manifest
+        composer.content_cache = self.content_cache
+        composer.profiler = self.profiler
+        composer.writer = self.writer
+        composer.assets = self.assets
+
     def get_output_extension(self, filename):
         """Get the output extension of a source file."""
         composer = self.select_composer_for(filename)
         return composer.get_output_extension(filename)
 
+    def flush(self):
+        """Flush every composer that was loaded."""
+        composers = set(self._composers.values())
+        composers.add(self.default_composer)
+        for composer in composers:
+            composer.flush()
+
 
 class CopyComposer(Composer):
     """Copy a source file to the destination.
@@ -97,23 +213,57 @@ class CopyComposer(Composer):
     ``CopyComposer`` is the default composer for any unrecognized file type.
     The source file will be copied to the output directory unless there is a
     file with an identical name and content already at the destination.
+
+    Files are copied in bulk with a pool of threads
+    after every other file is composed.
+    The ``copy_mode`` site option picks how a file gets to the output
+    (see ``handroll.assets.put_asset``).
+    When assets are fingerprinted,
+    there is a second copy with a hash of the file's content in its name.
+    The copy with the original name keeps relative references
+    from stylesheets (e.g., ``url(../img/logo.png)``) working.
     """
 
+    batched = True
+    # The number of threads that copy files
+    THREADS = 8
+
+    def __init__(self, config):
+        super(CopyComposer, self).__init__(config)
+        # The files waiting for the flush
+        # as (source file, destination, fingerprint) triples.
+        self._queue = []
+
     def compose(self, catalog, source_file, out_dir):
         """Copy a file to the destination if the file does not exist or was
         modified."""
         filename = os.path.basename(source_file)
+        fingerprint = self._fingerprint(source_file)
+        if fingerprint is not None and self._config.copy_mode != COPY:
+            fingerprint['copy_mode'] = self._config.copy_mode
+        self._compose_copy(source_file, out_dir, filename, fingerprint)
+
+        if self.assets is not None:
+            fingerprinted = self.assets.get_filename(source_file, filename)
+            if fingerprinted != filename:
+                self._compose_copy(
+                    source_file, out_dir, fingerprinted,
+                    None if fingerprint is None else dict(fingerprint))
+
+    def _compose_copy(self, source_file, out_dir, filename, fingerprint):
+        """Queue a copy of the file with the filename in the output."""
         # Do not copy files that are already there unless different.
         destination = os.path.join(out_dir, filename)
         if os.path.exists(destination):
             if (
                 not self._config.force and
-                filecmp.cmp(source_file, destination)
+                self._is_same(source_file, destination, fingerprint)
             ):
                 # Files are equal. Do nothing.
                 logger.debug(_('Skipping {filename} ... It is the same as '
                                '{destination}.').format(
                     filename=filename, destination=destination))
+                self._mark(destination, UNCHANGED)
                 return
             else:
                 logger.info(
@@ -122,7 +272,32 @@ class CopyComposer(Composer):
 
         logger.info(_('Copying {filename} to {out_dir} ...').format(
             filename=filename, out_dir=out_dir))
-        shutil.copy(source_file, out_dir)
+        self._mark_written(destination)
+        self._queue.append((source_file, destination, fingerprint))
+
+    def flush(self):
+        """Copy every queued file."""
+        queue, self._queue = self._queue, []
+        if not queue:
+            return
+
+        with self._time('write'):
+            if len(queue) == 1:
+                self._copy(queue[0])
+            else:
+                with ThreadPoolExecutor(self.THREADS) as executor:
+                    # Consume the results to raise any copy error.
+                    list(executor.map(self._copy, queue))
+
+        for source_file, destination, fingerprint in queue:
+            self._record(destination, fingerprint)
+
+    def get_asset_digest(self, source_file):
+        return self.manifest.hash_file(source_file)
+
+    def _copy(self, task):
+        source_file, destination, fingerprint = task
+        put_asset(source_file, destination, self._config.copy_mode)
 
     def get_output_extension(self, filename):
         _, ext = os.path.splitext(filename)
@@ -132,3 +307,24 @@ class CopyComposer(Composer):
     def permit_frontmatter(self):
         """Copied resources do not need to handle frontmatter."""
         return False
+
+    def _is_same(self, source_file, destination, fingerprint):
+        """Check if the destination is a copy of the source file.
+
+        The manifest knows the answer without reading the destination.
+        """
+        if fingerprint is None:
+            return filecmp.cmp(source_file, destination)
+
+        if self.manifest.is_current(destination, fingerprint):
+            return True
+
+        # Adopt an identical copy that was made before the manifest knew it.
+        if (
+            not self.manifest.has_record(destination) and
+            filecmp.cmp(source_file, destination)
+        ):
+            self._record(destination, fingerprint)
+            return True
+
+        return False
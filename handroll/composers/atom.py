@@ -11,6 +11,7 @@ from handroll import date, logger
 from handroll.composers import Composer
 from handroll.exceptions import AbortError
 from handroll.i18n import _
+from handroll.output import UNCHANGED
 
 
 class AtomComposer(Composer):
@@ -36,17 +37,22 @@ class AtomComposer(Composer):
         root, ext = os.path.splitext(os.path.basename(source_file))
         filename = root + self.output_extension
         output_file = os.path.join(out_dir, filename)
-        if self._needs_update(source_file, output_file):
+        fingerprint = self._fingerprint(source_file)
+        if self._needs_update(source_file, output_file, fingerprint):
             logger.info(_('Generating Atom XML for {source_file} ...').format(
                 source_file=source_file))
-            feed = self._parse_feed(source_file)
-
-            with open(output_file, 'wb') as out:
-                out.write(feed.to_string().encode('utf-8'))
-                out.write(b'<!-- handrolled for excellence -->\n')
+            with self._time('convert'):
+                feed = self._parse_feed(source_file)
+            with self._time('render'):
+                content = feed.to_string().encode('utf-8')
+            self._write(
+                output_file,
+                content + b'<!-- handrolled for excellence -->\n')
+            self._record(output_file, fingerprint)
         else:
             logger.debug(_('Skipping {filename} ... It is up to date.').format(
                 filename=filename))
+            self._mark(output_file, UNCHANGED)
 
     def get_output_extension(self, filename):
         return self.output_extension
@@ -55,12 +61,19 @@ class AtomComposer(Composer):
     def permit_frontmatter(self):
         return False
 
-    def _needs_update(self, source_file, out_file):
-        """Check if the output file needs to be updated by looking at the
-        modified times of the source file and output file."""
+    def _needs_update(self, source_file, out_file, fingerprint=None):
+        """Check if the output file needs to be updated.
+
+        Compare with the fingerprint in the manifest when there is one.
+        Otherwise, look at the modified times of the source file
+        and output file.
+        """
         if self._config.force:
             return True
 
+        if fingerprint is not None:
+            return not self.manifest.is_current(out_file, fingerprint)
+
         if os.path.exists(out_file):
             return os.path.getmtime(source_file) > os.path.getmtime(out_file)
         else:
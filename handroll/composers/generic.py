@@ -6,6 +6,7 @@ from handroll import logger
 from handroll.composers import Composer
 from handroll.composers.mixins import FrontmatterComposerMixin
 from handroll.i18n import _
+from handroll.output import UNCHANGED
 
 
 class GenericHTMLComposer(FrontmatterComposerMixin, Composer):
@@ -20,23 +21,48 @@ class GenericHTMLComposer(FrontmatterComposerMixin, Composer):
         """Compose an HTML document by generating HTML from the source
         file, merging it with a template, and write the result to output
         directory."""
-        data, source = self.get_data(source_file)
-
-        template = self.select_template(catalog, data)
-
         # Determine the output filename.
         root, ext = os.path.splitext(os.path.basename(source_file))
         filename = root + self.output_extension
         output_file = os.path.join(out_dir, filename)
 
-        if self._needs_update(template, source_file, output_file):
+        if self._is_current_without_reading(catalog, source_file, output_file):
+            logger.debug(_('Skipping {filename} ... It is up to date.').format(
+                filename=filename))
+            self._mark(output_file, UNCHANGED)
+            return
+
+        data, source = self.get_data(source_file)
+
+        template = self.select_template(catalog, data)
+
+        fingerprint = self._fingerprint(
+            source_file, template=template, frontmatter=data)
+        if fingerprint is not None:
+            info = {}
+            if 'template' in data:
+                info['template'] = data['template']
+            self.manifest.record_source_info(source_file, info)
+        self._record_used_assets(
+            source_file, template.dependencies, fingerprint,
+            self._get_used_assets(source_file))
+        if self._needs_update(
+                template, source_file, output_file, fingerprint):
             logger.info(_('Generating HTML for {source_file} ...').format(
                 source_file=source_file))
-            data['content'] = self._generate_content(source)
+            with self._time('convert'):
+                data['content'] = self._convert(source)
+            lookup = self._make_asset_lookup()
+            data['asset'] = lookup
             self._render_to_output(template, data, output_file)
+            self._record_used_assets(
+                source_file, template.dependencies, fingerprint,
+                sorted(lookup.used))
+            self._record(output_file, fingerprint)
         else:
             logger.debug(_('Skipping {filename} ... It is up to date.').format(
                 filename=filename))
+            self._mark(output_file, UNCHANGED)
 
     def get_output_extension(self, filename):
         return self.output_extension
@@ -53,16 +79,90 @@ class GenericHTMLComposer(FrontmatterComposerMixin, Composer):
         else:
             return catalog.default
 
+    def _convert(self, source):
+        """Convert the source to content.
+
+        Reuse content from the content cache when the same source was
+        converted the same way before.
+        """
+        signature = self._get_converter_signature()
+        if self.content_cache is None or signature is None:
+            return self._generate_content(source)
+
+        composer_cls = type(self)
+        key = self.content_cache.make_key(
+            composer_cls.__module__ + '.' + composer_cls.__name__,
+            signature, source)
+        content = self.content_cache.get(key)
+        if content is None:
+            content = self._generate_content(source)
+            self.content_cache.set(key, content)
+        return content
+
     def _generate_content(self, source):
         """Generate the content from the provided source data."""
         raise NotImplementedError
 
-    def _needs_update(self, template, source_file, output_file):
-        """Check if the output file needs to be updated by looking at the
-        modified times of the template, source file, and output file."""
+    def _get_converter_signature(self):
+        """Get a signature of anything besides the source that changes
+        the generated content (e.g., the converter version and options).
+
+        Content is only cached for composers that provide a signature.
+        """
+        return None
+
+    def _fingerprint(self, source_file, **inputs):
+        """Make a fingerprint that includes the converter signature
+        so that changing the converter or its options makes new content."""
+        fingerprint = super(GenericHTMLComposer, self)._fingerprint(
+            source_file, **inputs)
+        signature = self._get_converter_signature()
+        if fingerprint is not None and signature is not None:
+            fingerprint['converter'] = signature
+        return fingerprint
+
+    def _is_current_without_reading(self, catalog, source_file, output_file):
+        """Check if the output file is current from what was recorded
+        the last time that the source file was read.
+
+        While the source file's size and modified time stay the same,
+        so does its template.
+        The frontmatter comes from the document that the collection pass
+        loaded because extensions may have changed it
+        (e.g., from their configuration).
+        The body is only read when the output needs an update.
+        """
+        if self._config.force or self.manifest is None:
+            return False
+
+        info = self.manifest.get_source_info(source_file)
+        if info is None:
+            return False
+
+        template = self.select_template(catalog, info)
+        document = self.load_document(source_file, headers_only=True)
+        fingerprint = self._fingerprint(
+            source_file, template=template,
+            frontmatter=self.get_document_data(document))
+        self._record_used_assets(
+            source_file, template.dependencies, fingerprint,
+            self._get_used_assets(source_file))
+        return self.manifest.is_current(output_file, fingerprint)
+
+    def _needs_update(
+            self, template, source_file, output_file, fingerprint=None):
+        """Check if the output file needs to be updated.
+
+        Compare with the fingerprint in the manifest when there is one.
+        Otherwise, look at the modified times of the template, source file,
+        and output file.
+        """
         if self._config.force:
             return True
 
+        if fingerprint is not None:
+            return not self.manifest.is_current(output_file, fingerprint)
+
         out_modified_time = None
         if os.path.exists(output_file):
             out_modified_time = os.path.getmtime(output_file)
@@ -80,6 +180,7 @@ class GenericHTMLComposer(FrontmatterComposerMixin, Composer):
 
     def _render_to_output(self, template, data, output_file):
         """Render the template and data to the output file."""
-        with open(output_file, 'wb') as out:
-            out.write(template.render(data).encode('utf-8'))
-            out.write(b'<!-- handrolled for excellence -->\n')
+        with self._time('render'):
+            content = template.render(data).encode('utf-8')
+        self._write(
+            output_file, content + b'<!-- handrolled for excellence -->\n')
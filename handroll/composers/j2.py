@@ -2,12 +2,11 @@
 
 import os
 
-import jinja2
-
 from handroll import logger
 from handroll.composers import Composer
 from handroll.composers.mixins import FrontmatterComposerMixin
 from handroll.i18n import _
+from handroll.output import UNCHANGED
 
 
 class Jinja2Composer(FrontmatterComposerMixin, Composer):
@@ -17,6 +16,9 @@ class Jinja2Composer(FrontmatterComposerMixin, Composer):
     through the Jinja 2 renderer. The site configuration is provided
     to the context for access to global data.
 
+    Files are rendered with the same Jinja environment as the site templates
+    so they can extend or include templates from the ``templates`` directory.
+
     The output file uses the same name as the source file with
     the ``.j2`` extension removed.
     """
@@ -25,28 +27,45 @@ class Jinja2Composer(FrontmatterComposerMixin, Composer):
     def compose(self, catalog, source_file, out_dir):
         filename = os.path.basename(source_file.rstrip('.j2'))
         output_file = os.path.join(out_dir, filename)
-        if self._needs_update(source_file, output_file):
+        data, source = self.get_data(source_file)
+        template = catalog.build_jinja_page(source, source_file)
+        fingerprint = self._fingerprint(
+            source_file, template=template, frontmatter=data)
+        self._record_used_assets(
+            source_file, template.dependencies, fingerprint,
+            self._get_used_assets(source_file))
+        if self._needs_update(source_file, output_file, fingerprint):
             logger.info(_('Generating from template {source_file} ...').format(
                 source_file=source_file))
-            data, source = self.get_data(source_file)
             data['config'] = self._config
-            template = jinja2.Template(source)
-            with open(output_file, 'wb') as out:
-                out.write(template.render(data).encode('utf-8'))
-                # Frontmatter loading seems to munch the final line separator.
-                out.write(os.linesep.encode('utf-8'))
+            lookup = self._make_asset_lookup()
+            data['asset'] = lookup
+            with self._time('render'):
+                content = template.render(data).encode('utf-8')
+            # Frontmatter loading seems to munch the final line separator.
+            self._write(output_file, content + os.linesep.encode('utf-8'))
+            self._record_used_assets(
+                source_file, template.dependencies, fingerprint,
+                sorted(lookup.used))
+            self._record(output_file, fingerprint)
         else:
             logger.debug(_('Skipping {filename} ... It is up to date.').format(
                 filename=filename))
+            self._mark(output_file, UNCHANGED)
 
-    def _needs_update(self, source_file, output_file):
+    def _needs_update(self, source_file, output_file, fingerprint=None):
         """Check if the output file needs to be updated.
 
-        Look at the modified times of the source file and output file.
+        Compare with the fingerprint in the manifest when there is one.
+        Otherwise, look at the modified times of the source file
+        and output file.
         """
         if self._config.force:
             return True
 
+        if fingerprint is not None:
+            return not self.manifest.is_current(output_file, fingerprint)
+
         if not os.path.exists(output_file):
             return True
 
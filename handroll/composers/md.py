@@ -1,8 +1,13 @@
 # Copyright (c) 2017, Matt Layman
 
+import json
+import re
+
 import markdown
 
 from handroll.composers.generic import GenericHTMLComposer
+from handroll.exceptions import AbortError
+from handroll.i18n import _
 
 
 class MarkdownComposer(GenericHTMLComposer):
@@ -31,6 +36,18 @@ class MarkdownComposer(GenericHTMLComposer):
 
     The ``MarkdownComposer`` generates better typographical quotes
     by using the SmartyPants library.
+
+    The Markdown extensions and their options are configurable
+    in the ``[markdown]`` section of ``handroll.conf``.
+    Options for an extension go in a section named after the extension.
+
+    .. code-block:: ini
+
+        [markdown]
+        extensions = codehilite, fenced_code, smarty, toc
+
+        [markdown.codehilite]
+        linenums = true
     """
 
     EXTENSIONS = [
@@ -39,6 +56,68 @@ class MarkdownComposer(GenericHTMLComposer):
         'smarty',
     ]
 
+    def __init__(self, config):
+        super(MarkdownComposer, self).__init__(config)
+        self._extensions = None
+        self._extension_configs = None
+        # The converter is configured once and reset between documents.
+        # Worker processes each end up with their own copy.
+        self._markdown = None
+
+    @property
+    def extensions(self):
+        """Get the list of Markdown extensions to use."""
+        if self._extensions is None:
+            self._load_extensions()
+        return self._extensions
+
+    @property
+    def extension_configs(self):
+        """Get the options for each configured Markdown extension."""
+        if self._extension_configs is None:
+            self._load_extensions()
+        return self._extension_configs
+
+    def _load_extensions(self):
+        """Load the extensions and their options from the configuration."""
+        parser = self._config.parser
+        extensions = list(self.EXTENSIONS)
+        if parser.has_option('markdown', 'extensions'):
+            value = parser.get('markdown', 'extensions')
+            extensions = [
+                extension for extension in re.split(r'[\s,]+', value)
+                if extension]
+
+        extension_configs = {}
+        for extension in extensions:
+            section = 'markdown.' + extension
+            if parser.has_section(section):
+                extension_configs[extension] = dict(
+                    (option, parser.get(section, option))
+                    for option in parser.options(section))
+
+        self._extensions = extensions
+        self._extension_configs = extension_configs
+
+    def _get_markdown(self):
+        """Get the converter, creating it on first use."""
+        if self._markdown is None:
+            try:
+                self._markdown = markdown.Markdown(
+                    extensions=self.extensions,
+                    extension_configs=self.extension_configs,
+                    output_format='html5')
+            except (AttributeError, ImportError, KeyError, TypeError) as e:
+                raise AbortError(_(
+                    'The Markdown extensions failed to load: {error}').format(
+                        error=e))
+        return self._markdown
+
     def _generate_content(self, source):
-        return markdown.markdown(
-            source, extensions=self.EXTENSIONS, output_format='html5')
+        return self._get_markdown().reset().convert(source)
+
+    def _get_converter_signature(self):
+        return 'markdown {version} {extensions} {configs}'.format(
+            version=markdown.__version__,
+            extensions=' '.join(self.extensions),
+            configs=json.dumps(self.extension_configs, sort_keys=True))
@@ -2,12 +2,18 @@
 
 from html import escape
 import io
+import json
 import os
 
 import yaml
-from yaml.scanner import ScannerError
+try:
+    # libyaml parses much faster than the pure Python loader.
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:  # pragma: no cover
+    from yaml import SafeLoader
 
 from handroll import signals
+from handroll.documents import Document
 from handroll.exceptions import AbortError
 from handroll.i18n import _
 
@@ -16,54 +22,228 @@ class FrontmatterComposerMixin(object):
     """Mixin the ability to extract frontmatter from a source file."""
     document_marker = '---' + os.linesep
     guess_title = True
+    # Only read the first line and frontmatter of a source
+    # and leave the body to read when it is needed.
+    read_headers = False
+    # A ``DocumentStore`` shared by everything that reads documents in a build.
+    documents = None
+    # A ``FrontmatterIndex`` of the frontmatter from earlier builds.
+    frontmatter_index = None
 
     def get_data(self, source_file):
         """Get data and source from the source file."""
+        document = self.load_document(source_file)
+        data = self.get_document_data(document)
+        source = document.body
+        if document.frontmatter is None and not self.guess_title:
+            source = document.first_line + document.body
+
+        return data, source
+
+    def get_document_data(self, document):
+        """Get the data of a document without its body."""
         data = {}
+        if document.frontmatter is not None:
+            # Copy so that composer additions do not leak into the store.
+            data = dict(document.frontmatter)
+        elif self.guess_title:
+            # This is a plain file so pull title from the first line.
+            data['title'] = escape(document.first_line.strip())
+        return data
+
+    def load_document(self, source_file, headers_only=False):
+        """Load the document for the source file.
+
+        A document that was already read during the build comes from
+        the document store instead of the file system.
+        A document that did not change since an earlier build
+        comes from the frontmatter index.
+
+        :param headers_only: Leave the body to read when it is needed
+        """
+        if self.documents is None:
+            if self.read_headers or headers_only:
+                return self.read_document_header(source_file)
+            return self.read_document(source_file)
+
+        document = self.documents.get(source_file)
+        if document is None:
+            document = self._load_indexed_document(source_file)
+            if document is None and (self.read_headers or headers_only):
+                document = self.read_document_header(source_file)
+            elif document is None:
+                document = self.read_document(source_file)
+            self.documents.add(source_file, document)
+        return document
+
+    def _load_indexed_document(self, source_file):
+        """Load a document from the frontmatter index.
+
+        Only the body is left to read, and only if a composer needs it.
+        Extensions get the same ``frontmatter_loaded`` signal
+        as if the file was read.
+        """
+        if self.frontmatter_index is None:
+            return None
+        indexed = self.frontmatter_index.get(source_file)
+        if indexed is None:
+            return None
+
+        first_line, frontmatter = indexed
+        document = Document(
+            first_line, frontmatter,
+            body_loader=lambda: self._read_body(source_file))
+        if frontmatter is not None:
+            signals.frontmatter_loaded.send(
+                source_file, frontmatter=frontmatter)
+        return document
+
+    def read_document(self, source_file):
+        """Read and parse the source file into a document."""
         with io.open(source_file, 'r', encoding='utf-8') as f:
             # The first line determines whether to look for front matter.
-            first = f.readline().strip()
-            source = f.read()
+            first_line = f.readline()
+            body = f.read()
+
+        frontmatter = None
+        first = first_line.strip()
+        if self._has_frontmatter(first):
+            frontmatter, body = self._split_content_with_frontmatter(
+                first, body, source_file)
+        self._finish_loading(source_file, first_line, frontmatter)
+
+        return Document(first_line, frontmatter, body)
 
+    def read_document_header(self, source_file):
+        """Read and parse the source file into a document
+        without reading the body.
+
+        Lines are only read until the end of the frontmatter
+        so a long body (e.g., with embedded images) is not read.
+        The document reads its body the first time that it is needed.
+        """
+        with io.open(source_file, 'r', encoding='utf-8') as f:
+            first_line = f.readline()
+            frontmatter = None
+            first = first_line.strip()
             if self._has_frontmatter(first):
-                data, source = self._split_content_with_frontmatter(
-                    first, source, source_file)
-                signals.frontmatter_loaded.send(source_file, frontmatter=data)
-            elif self.guess_title:
-                # This is a plain file so pull title from the first line.
-                data['title'] = escape(first)
-            else:
-                f.seek(0)
-                source = f.read()
+                frontmatter = self._parse_frontmatter(
+                    self._read_frontmatter(first, f, source_file))
+        self._finish_loading(source_file, first_line, frontmatter)
 
-        return data, source
+        return Document(
+            first_line, frontmatter,
+            body_loader=lambda: self._read_body(source_file))
+
+    def _finish_loading(self, source_file, first_line, frontmatter):
+        """Index the frontmatter of a freshly read document
+        and tell the extensions about it."""
+        if self.frontmatter_index is not None:
+            # Record before any extension can change the frontmatter.
+            self.frontmatter_index.record(source_file, first_line, frontmatter)
+        if frontmatter is not None:
+            signals.frontmatter_loaded.send(
+                source_file, frontmatter=frontmatter)
+
+    def _read_body(self, source_file):
+        """Read the body of the source file without parsing frontmatter."""
+        with io.open(source_file, 'r', encoding='utf-8') as f:
+            first_line = f.readline()
+            body = f.read()
+
+        first = first_line.strip()
+        if self._has_frontmatter(first):
+            frontmatter, body = self._split_frontmatter(
+                first, body, source_file)
+        return body
 
     def _has_frontmatter(self, first_line):
-        """Check if the document has any front matter. handroll only supports
-        front matter from YAML documents."""
+        """Check if the document has any front matter. handroll supports
+        front matter from YAML documents and JSON objects."""
         return first_line.startswith(('%YAML', '---'))
 
     def _split_content_with_frontmatter(self, first, source, source_file):
         """Separate frontmatter from source material."""
-        max_splits = 1
+        frontmatter, source = self._split_frontmatter(
+            first, source, source_file)
+        return self._parse_frontmatter(frontmatter), source
+
+    def _parse_frontmatter(self, frontmatter):
+        """Parse the frontmatter text into a dictionary."""
+        data = self._load_frontmatter(frontmatter)
+
+        if 'title' in data:
+            data['title'] = escape(data['title'])
+
+        return data
+
+    def _count_markers(self, first):
+        """Count the document markers that end the frontmatter."""
         # With a directive present, there must be two document markers.
         if first.startswith('%YAML'):
-            max_splits = 2
+            return 2
+        return 1
+
+    def _read_frontmatter(self, first, f, source_file):
+        """Read the frontmatter text from a file
+        that is positioned after the first line.
+
+        Reading stops at the marker that ends the frontmatter.
+        """
+        markers = self._count_markers(first)
+        marker = self.document_marker
+        # The text between markers like ``str.split`` would make.
+        parts = [[]]
+        while True:
+            line = f.readline()
+            if not line:
+                raise AbortError(
+                    _('A YAML marker was missing in {source}').format(
+                        source=source_file))
+            if line.endswith(marker):
+                parts[-1].append(line[:-len(marker)])
+                if len(parts) == markers:
+                    return ''.join(parts[markers - 1])
+                parts.append([])
+            else:
+                parts[-1].append(line)
+
+    def _split_frontmatter(self, first, source, source_file):
+        """Split the frontmatter text from the source material."""
+        max_splits = self._count_markers(first)
         content = source.split(self.document_marker, max_splits)
 
         try:
-            data = yaml.load(content[max_splits - 1])
-        except ScannerError as ex:
-            raise AbortError(_(
-                'There is invalid YAML in the frontmatter: {details}').format(
-                    details=str(ex)))
-        try:
-            source = content[max_splits]
+            return content[max_splits - 1], content[max_splits]
         except IndexError:
             raise AbortError(_('A YAML marker was missing in {source}').format(
                 source=source_file))
 
-        if 'title' in data:
-            data['title'] = escape(data['title'])
+    def _load_frontmatter(self, frontmatter):
+        """Load the frontmatter into a dictionary.
 
-        return data, source
+        Frontmatter that looks like a JSON object is loaded as JSON
+        because the JSON parser is faster than any YAML loader.
+        Anything else, including JSON that is invalid, is loaded as YAML.
+        """
+        data = None
+        if frontmatter.lstrip().startswith('{'):
+            try:
+                data = json.loads(frontmatter)
+            except ValueError:
+                pass
+
+        if data is None:
+            try:
+                data = yaml.load(frontmatter, Loader=SafeLoader)
+            except yaml.YAMLError as ex:
+                raise AbortError(_(
+                    'There is invalid YAML in the frontmatter: {details}'
+                ).format(details=str(ex)))
+
+        if data is None:
+            data = {}
+        if not isinstance(data, dict):
+            raise AbortError(_(
+                'The frontmatter must be a mapping of names to values.'))
+        return data
@@ -1,5 +1,6 @@
 # Copyright (c) 2017, Matt Layman
 
+import docutils
 from docutils.core import publish_parts
 
 from handroll.composers.generic import GenericHTMLComposer
@@ -15,3 +16,6 @@ class ReStructuredTextComposer(GenericHTMLComposer):
 
     def _generate_content(self, source):
         return publish_parts(source, writer_name='html')['html_body']
+
+    def _get_converter_signature(self):
+        return 'docutils ' + docutils.__version__
@@ -1,13 +1,24 @@
 # Copyright (c) 2017, Matt Layman
 
-from distutils import spawn
 import os
+import re
+import shutil
 import subprocess
 
+try:
+    import sass as libsass
+except ImportError:  # pragma: no cover
+    libsass = None
+
 from handroll import logger
 from handroll.composers import Composer
 from handroll.exceptions import AbortError
 from handroll.i18n import _
+from handroll.output import UNCHANGED
+
+IMPORT_RULE = re.compile(r'@(?:import|use|forward)\s+([^;\n]+)')
+QUOTED = re.compile(r'''["']([^"']+)["']''')
+EXTENSIONS = ('.scss', '.sass', '.css')
 
 
 class SassComposer(Composer):
@@ -17,36 +28,105 @@ class SassComposer(Composer):
     `great documentation <http://sass-lang.com/guide>`_ to explain how to use
     it.
 
-    Because Sass is not written in the same language as handroll, it must be
-    installed separately before it can be used. Check out the `installation
-    options <http://sass-lang.com/install>`_.
+    When the `libsass <https://sass.github.io/libsass-python/>`_ package
+    is installed, stylesheets compile in the same process as handroll.
+    Otherwise, Sass must be installed separately before it can be used. Check
+    out the `installation options <http://sass-lang.com/install>`_. Every
+    stylesheet is compiled with a single run of ``sass``.
+    The ``sass`` command must be `Dart Sass <https://sass-lang.com/dart-sass>`_
+    because it takes every source and output pair in one run.
+    Ruby Sass does not support those arguments.
+    Source maps are not written.
+
+    Partials (files that start with an underscore like ``_colors.scss``) are
+    only for importing so they have no output. A stylesheet compiles again
+    when it or any file it imports changes.
+
+    When assets are fingerprinted, the CSS file's name includes a hash
+    of the stylesheet and everything it imports. The hash is known before
+    the stylesheet compiles so pages can refer to it.
     """
     output_extension = '.css'
+    batched = True
 
-    def __init__(self, path=None):
-        self.sass = spawn.find_executable('sass', path)
-        if self.sass is None:
-            raise AbortError(_('Sass is not installed.'))
+    def __init__(self, config, path=None):
+        super(SassComposer, self).__init__(config)
+        self.sass = None
+        if libsass is None:
+            self.sass = shutil.which('sass', path=path)
+            if self.sass is None:
+                raise AbortError(_('Sass is not installed.'))
+        # The stylesheets waiting for the flush
+        # as (source file, output file, fingerprint) triples.
+        self._queue = []
+        # Imports found while hashing assets so compose can reuse them
+        self._imports = {}
 
     def compose(self, catalog, source_file, out_dir):
-        root, ext = os.path.splitext(os.path.basename(source_file))
-        filename = root + self.output_extension
-        output_file = os.path.join(out_dir, filename)
+        filename = os.path.basename(source_file)
+        if filename.startswith('_'):
+            logger.debug(_('Skipping partial {filename} ...').format(
+                filename=filename))
+            return
+
+        root, ext = os.path.splitext(filename)
+        output_filename = root + self.output_extension
+        if self.assets is not None:
+            output_filename = self.assets.get_filename(
+                source_file, output_filename)
+        output_file = os.path.join(out_dir, output_filename)
+
+        imports = self._imports.pop(source_file, None)
+        if imports is None:
+            imports = self.find_imports(source_file)
+        if self.manifest is not None:
+            self.manifest.record_dependencies(source_file, imports)
+        fingerprint = self._fingerprint(source_file)
+        if fingerprint is not None:
+            fingerprint['imports'] = dict(
+                (os.path.relpath(path, self.manifest.site_path),
+                 self.manifest.hash_file(path))
+                for path in imports)
+            if (
+                not self._config.force and
+                self.manifest.is_current(output_file, fingerprint)
+            ):
+                logger.debug(
+                    _('Skipping {filename} ... It is up to date.').format(
+                        filename=filename))
+                self._mark(output_file, UNCHANGED)
+                return
 
         logger.info(_('Generating CSS for {source_file} ...').format(
             source_file=source_file))
+        if self.sass is not None:
+            # The sass command writes the file without the writer.
+            self._mark_written(output_file)
+        self._queue.append((source_file, output_file, fingerprint))
 
-        command = self.build_command(source_file, output_file)
-        process = subprocess.Popen(
-            command, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
-        (out, err) = process.communicate()
+    def flush(self):
+        """Compile every queued stylesheet."""
+        queue, self._queue = self._queue, []
+        if not queue:
+            return
 
-        if out:
-            logger.debug(_('Received output from sass:\n{0}'.format(out)))
+        if self.sass is None:
+            self._compile_in_process(queue)
+        else:
+            self._compile_with_sass(queue)
 
-        if process.returncode != 0:
-            raise AbortError(_('Sass failed to generate CSS:\n{0}').format(
-                err))
+        for source_file, output_file, fingerprint in queue:
+            self._record(output_file, fingerprint)
+
+    def get_asset_digest(self, source_file):
+        if os.path.basename(source_file).startswith('_'):
+            return None
+        imports = self.find_imports(source_file)
+        self._imports[source_file] = imports
+        return self.manifest.hash_data(
+            [self.manifest.hash_file(source_file)] +
+            [[os.path.relpath(path, self.manifest.site_path),
+              self.manifest.hash_file(path)] for path in imports])
 
     def get_output_extension(self, filename):
         return self.output_extension
@@ -55,7 +135,101 @@ class SassComposer(Composer):
     def permit_frontmatter(self):
         return False
 
-    def build_command(self, source_file, output_file):
-        command = [
-            self.sass, '--style', 'compressed', source_file, output_file]
+    def build_command(self, stylesheets):
+        """Build a command to compile the source and output file pairs."""
+        command = [self.sass, '--style', 'compressed', '--no-source-map']
+        for source_file, output_file in stylesheets:
+            command.append(source_file + ':' + output_file)
         return command
+
+    def find_imports(self, source_file):
+        """Find every file that the source file imports
+        directly or through other imports."""
+        imports = []
+        pending = [source_file]
+        seen = set(pending)
+        while pending:
+            path = pending.pop()
+            for imported in self._find_direct_imports(path):
+                if imported not in seen:
+                    seen.add(imported)
+                    imports.append(imported)
+                    pending.append(imported)
+        return sorted(imports)
+
+    def _find_direct_imports(self, path):
+        """Find the files that a stylesheet imports.
+
+        Imports that Sass does not load from a file
+        (e.g., built-in modules, URLs, or plain CSS imports) are ignored.
+        """
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                source = f.read()
+        except (IOError, OSError, UnicodeDecodeError):
+            return []
+
+        dirname = os.path.dirname(path)
+        imports = []
+        for rule in IMPORT_RULE.findall(source):
+            names = QUOTED.findall(rule)
+            # The indented syntax permits unquoted imports.
+            if not names and path.endswith('.sass'):
+                names = [name.strip() for name in rule.split(',')]
+            for name in names:
+                if (
+                    name.startswith(('sass:', 'url(')) or
+                    '://' in name or
+                    name.endswith('.css')
+                ):
+                    continue
+                imported = self._resolve_import(dirname, name)
+                if imported is not None:
+                    imports.append(imported)
+        return imports
+
+    def _resolve_import(self, dirname, name):
+        """Resolve an import name to a file the way Sass does."""
+        base = os.path.join(dirname, *name.split('/'))
+        candidates = []
+        for module in (base, os.path.join(base, 'index')):
+            head, tail = os.path.split(module)
+            if tail.endswith(EXTENSIONS):
+                extensions = ('',)
+            else:
+                extensions = EXTENSIONS
+            for extension in extensions:
+                candidates.append(os.path.join(head, '_' + tail + extension))
+                candidates.append(module + extension)
+        for candidate in candidates:
+            if os.path.isfile(candidate):
+                return candidate
+        return None
+
+    def _compile_in_process(self, queue):
+        for source_file, output_file, fingerprint in queue:
+            try:
+                with self._time('convert'):
+                    css = libsass.compile(
+                        filename=source_file, output_style='compressed')
+            except libsass.CompileError as ex:
+                raise AbortError(
+                    _('Sass failed to generate CSS:\n{0}').format(ex))
+            self._write(output_file, css.encode('utf-8'))
+
+    def _compile_with_sass(self, queue):
+        command = self.build_command(
+            (source_file, output_file)
+            for source_file, output_file, fingerprint in queue)
+        with self._time('convert'):
+            process = subprocess.Popen(
+                command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE)
+            (out, err) = process.communicate()
+
+        if out:
+            logger.debug(_('Received output from sass:\n{0}').format(out))
+
+        if process.returncode != 0:
+            raise AbortError(_('Sass failed to generate CSS:\n{0}').format(
+                err))
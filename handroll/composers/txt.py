@@ -15,3 +15,6 @@ class TextileComposer(GenericHTMLComposer):
 
     def _generate_content(self, source):
         return textile.textile(source)
+
+    def _get_converter_signature(self):
+        return 'textile ' + textile.__version__
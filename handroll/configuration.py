@@ -3,6 +3,7 @@
 from configparser import ConfigParser
 import os
 
+from handroll.assets import COPY, COPY_MODES
 from handroll.exceptions import AbortError
 from handroll.i18n import _
 
@@ -12,11 +13,25 @@ class Configuration(object):
 
     def __init__(self):
         self.active_extensions = set()
+        # The cache directory holds data that speeds up later builds.
+        self.cache_dir = None
+        # The file to write the outputs that a build changed
+        self.change_list = None
+        # The content cache size is in megabytes.
+        self.content_cache_size = 100
+        # How static assets get to the output
+        self.copy_mode = COPY
+        # Put a hash of each asset's content in its output name.
+        self.fingerprint_assets = False
         self.force = False
         # The output directory should be absolute. That constraint will make it
         # easy to check if a filepath is in the output directory.
         self.outdir = None
+        # The file paths for profiling output
+        self.cprofile = None
+        self.profile = None
         self.timing = None
+        self.workers = 1
 
         # Keep the parser to allow extensions to get configuration file data.
         self.parser = ConfigParser()
@@ -43,6 +58,15 @@ class Configuration(object):
         if args.timing is not None:
             self.timing = args.timing
 
+        if args.profile is not None:
+            self.profile = os.path.abspath(args.profile)
+
+        if args.cprofile is not None:
+            self.cprofile = os.path.abspath(args.cprofile)
+
+        if args.jobs is not None:
+            self.workers = self._validate_workers(args.jobs)
+
     def load_from_file(self, config_file):
         """Load any configuration attributes from the provided config file."""
         with open(config_file, 'r') as f:
@@ -51,15 +75,82 @@ class Configuration(object):
                 self._domain = self.parser.get('site', 'domain')
 
             if self.parser.has_option('site', 'outdir'):
-                outdir = os.path.expanduser(self.parser.get('site', 'outdir'))
-                if not os.path.isabs(outdir):
-                    path = os.path.dirname(config_file)
-                    outdir = os.path.abspath(os.sep.join([path, outdir]))
-                self.outdir = outdir
+                self.outdir = self._get_path(config_file, 'outdir')
+
+            if self.parser.has_option('site', 'cache_dir'):
+                self.cache_dir = self._get_path(config_file, 'cache_dir')
+
+            if self.parser.has_option('site', 'change_list'):
+                self.change_list = self._get_path(config_file, 'change_list')
+
+            if self.parser.has_option('site', 'content_cache_size'):
+                self.content_cache_size = self._get_content_cache_size()
+
+            if self.parser.has_option('site', 'copy_mode'):
+                self.copy_mode = self._get_copy_mode()
+
+            if self.parser.has_option('site', 'fingerprint_assets'):
+                self.fingerprint_assets = self._get_fingerprint_assets()
+
+            if self.parser.has_option('site', 'workers'):
+                self.workers = self._validate_workers(
+                    self.parser.get('site', 'workers'))
 
             if self.parser.has_section('site'):
                 self._find_extensions(self.parser)
 
+    def _get_path(self, config_file, option):
+        """Get an absolute path from a site option.
+
+        Relative paths are anchored to the directory of the config file.
+        """
+        path = os.path.expanduser(self.parser.get('site', option))
+        if not os.path.isabs(path):
+            config_dir = os.path.dirname(config_file)
+            path = os.path.abspath(os.sep.join([config_dir, path]))
+        return path
+
+    def _get_content_cache_size(self):
+        """Get the content cache size. Zero turns the cache off."""
+        try:
+            size = self.parser.getint('site', 'content_cache_size')
+        except ValueError:
+            size = -1
+
+        if size < 0:
+            raise AbortError(_(
+                'The content cache size must be a number of megabytes.'))
+        return size
+
+    def _get_copy_mode(self):
+        """Get the way to put static assets in the output."""
+        copy_mode = self.parser.get('site', 'copy_mode').strip().lower()
+        if copy_mode not in COPY_MODES:
+            raise AbortError(_(
+                'The copy mode must be one of: {copy_modes}.').format(
+                    copy_modes=', '.join(COPY_MODES)))
+        return copy_mode
+
+    def _get_fingerprint_assets(self):
+        """Get if assets are fingerprinted from the site section."""
+        try:
+            return self.parser.getboolean('site', 'fingerprint_assets')
+        except ValueError:
+            raise AbortError(_(
+                'Cannot determine if assets are fingerprinted.'))
+
+    def _validate_workers(self, workers):
+        """Check that the number of workers is a positive integer."""
+        try:
+            workers = int(workers)
+        except ValueError:
+            workers = 0
+
+        if workers < 1:
+            raise AbortError(_(
+                'The number of workers must be a positive integer.'))
+        return workers
+
     def _find_extensions(self, parser):
         """Check if the site options have extensions to enable."""
         for option in parser.options('site'):
@@ -1,16 +1,49 @@
 # Copyright (c) 2017, Matt Layman
 
+import multiprocessing
 import os
-import time
+import shutil
 
 from handroll import logger, signals
+from handroll.assets import AssetManifest
+from handroll.cache import ContentCache
 from handroll.composers import Composers
-from handroll.frontmatter import FrontmatterExtractor
+from handroll.exceptions import AbortError
+from handroll.frontmatter import FrontmatterExtractor, FrontmatterIndex
 from handroll.i18n import _
+from handroll.manifest import BuildManifest
+from handroll.output import OutputWriter
+from handroll.profiler import BuildProfiler
 from handroll.resolver import FileResolver
 from handroll.site import Site
 from handroll.template import catalog
 
+# Worker processes are forked from the director so that the catalog,
+# composers, and extension state never need to be pickled.
+_worker_director = None
+
+
+def _compose_in_worker(task):
+    """Compose a single file in a worker process.
+
+    Return the manifest updates, timings, and output counts
+    so the parent can record them.
+    """
+    filepath, output_dirpath = task
+    try:
+        _worker_director._process_file(filepath, output_dirpath)
+        return (
+            _worker_director.manifest.drain(),
+            _worker_director.profiler.drain(),
+            _worker_director.writer.drain())
+    except AbortError:
+        raise
+    except Exception as ex:
+        # Not every exception survives the trip back to the parent process
+        # so report the failure in a way that always does.
+        raise AbortError(_('Failed to compose {filepath}: {error}').format(
+            filepath=filepath, error=repr(ex)))
+
 
 class Director(object):
     """The director is responsible for producing the generated content from the
@@ -28,14 +61,48 @@ class Director(object):
     SKIP_FILES = (
         Site.CONFIG,
     )
+    CONTENT_CACHE = 'content'
+    FRONTMATTER_INDEX = 'frontmatter.sqlite'
+    JINJA_CACHE = 'jinja'
+    MANIFEST = 'manifest.json'
 
     def __init__(self, config, site, extensions):
         self.config = config
         self.site = site
         self.extensions = extensions
-        self.catalog = catalog.TemplateCatalog(site.path)
-        self.composers = Composers(config)
-        self.extractor = FrontmatterExtractor()
+        # A configured output or cache directory or change list
+        # may be in the site.
+        site.exclude(self.outdir)
+        site.exclude(self.cache_dir)
+        if config.change_list is not None:
+            site.exclude(config.change_list)
+        self.catalog = catalog.TemplateCatalog(
+            site.path,
+            bytecode_cache_path=os.path.join(self.cache_dir, self.JINJA_CACHE))
+        self.profiler = BuildProfiler(
+            config.profile, config.cprofile, bool(config.timing))
+        for extension in extensions:
+            extension.profiler = self.profiler
+        self.manifest = BuildManifest(
+            os.path.join(self.cache_dir, self.MANIFEST), site.path,
+            self.outdir)
+        self.writer = OutputWriter(self.manifest)
+        self.content_cache = None
+        if config.content_cache_size > 0:
+            self.content_cache = ContentCache(
+                os.path.join(self.cache_dir, self.CONTENT_CACHE),
+                config.content_cache_size * 1024 * 1024)
+        self.assets = None
+        if config.fingerprint_assets:
+            self.assets = AssetManifest()
+        self.frontmatter_index = FrontmatterIndex(
+            os.path.join(self.cache_dir, self.FRONTMATTER_INDEX), site.path)
+        self.composers = Composers(
+            config, manifest=self.manifest, content_cache=self.content_cache,
+            profiler=self.profiler, writer=self.writer, assets=self.assets,
+            frontmatter_index=self.frontmatter_index)
+        self.extractor = FrontmatterExtractor(
+            self.composers.documents, self.frontmatter_index)
         self.resolver = FileResolver(site.path, self.composers, config)
 
     @property
@@ -49,6 +116,16 @@ class Director(object):
         else:
             return self.config.outdir
 
+    @property
+    def cache_dir(self):
+        """Look up the cache directory based on what configuration is
+        available.
+        """
+        if self.config.cache_dir is None:
+            return self.site.cache_root
+        else:
+            return self.config.cache_dir
+
     def process_file(self, filepath):
         """Process a site source file, determine its output location, and
         trigger its composer.
@@ -56,38 +133,140 @@ class Director(object):
         This is primarily used for the watchdog handler and would be slow if
         used in the main ``produce`` method.
         """
-        if self._should_skip(filepath):
-            return
-        # Skip files in the output directory.
-        if self.is_in_output(filepath):
-            return
-        # Skip templates.
-        if self.catalog.is_template(filepath):
-            return
-
-        signals.pre_composition.send(self)
-        dirname = os.path.dirname(filepath)
-        output_dirpath = self._get_output_dirpath(dirname, self.outdir)
-        self._process_file(filepath, output_dirpath)
-        signals.post_composition.send(self)
+        self.process_changes([filepath])
 
     def process_directory(self, directory):
         """Process a site directory by creating its equivalent in output.
 
         This is used by the watchdog.
         """
-        # Skip files in the output directory.
-        if self.is_in_output(directory):
-            return
-        # Skip templates.
-        if self.catalog.is_template(directory):
+        self.process_changes([directory])
+
+    def process_changes(self, paths):
+        """Process a batch of changed site files and directories.
+
+        The whole batch runs in a single composition cycle so extensions
+        do their site-wide work (e.g., writing a feed) once per batch
+        instead of once per changed file.
+
+        Paths that are gone (e.g., a deleted file or the old path
+        of a renamed file) have their outputs removed,
+        and the files that used them compose again.
+
+        A batch always composes in this process. Watch mode runs threads
+        (e.g., the file observer and the development server)
+        so forking a pool of workers for each batch is not safe.
+        """
+        directories = []
+        removed = []
+        tasks = []
+        sources = set()
+        reset_catalog = True
+        for path in paths:
+            if not self._is_processable(path):
+                continue
+
+            if os.path.isdir(path):
+                # Templates have no output so neither do their directories.
+                if not self.catalog.is_template(path):
+                    directories.append(path)
+                continue
+
+            if self.catalog.is_template(path):
+                # Templates have no output, but the files that use them do.
+                if reset_catalog:
+                    self.catalog.reset()
+                    reset_catalog = False
+                changed_files = self._get_template_dependents(path)
+            elif not os.path.exists(path):
+                removed.append(path)
+                continue
+            else:
+                # Other sources may include the file (e.g., a Sass partial).
+                changed_files = [path] + self._get_dependents(path)
+
+            for source_file in changed_files:
+                self._add_task(tasks, sources, source_file)
+
+        removed_sources = []
+        removed_directories = []
+        for path in removed:
+            removed_sources.extend(self.manifest.get_sources(path))
+            output_dirpath = self._get_output_dirpath(path, self.outdir)
+            if output_dirpath != self.outdir and os.path.isdir(output_dirpath):
+                removed_directories.append(output_dirpath)
+        for source_file in removed_sources:
+            for dependent in self._get_dependents(source_file):
+                self._add_task(tasks, sources, dependent)
+
+        if self.assets is not None:
+            # A changed asset has a new name
+            # so the pages that use it must compose again.
+            for source_file, output_dirpath in tasks:
+                if self._add_asset(source_file):
+                    for dependent in self._get_dependents(source_file):
+                        self._add_task(tasks, sources, dependent)
+
+        if (
+            not directories and not tasks and
+            not removed_sources and not removed_directories
+        ):
             return
 
-        signals.pre_composition.send(self)
-        dirname, basedir = os.path.split(directory)
-        output_dirpath = self._get_output_dirpath(dirname, self.outdir)
-        os.mkdir(os.path.join(output_dirpath, basedir))
-        signals.post_composition.send(self)
+        with self.profiler.build():
+            signals.pre_composition.send(self)
+            try:
+                for source_file in removed_sources:
+                    self._remove_source(source_file)
+                for output_dirpath in removed_directories:
+                    logger.info(_('Removing {output_dirpath} ...').format(
+                        output_dirpath=output_dirpath))
+                    shutil.rmtree(output_dirpath)
+                # Sorting puts parents first so nested directories have
+                # a place.
+                for directory in sorted(directories):
+                    dirname, basedir = os.path.split(directory)
+                    output_dirpath = self._get_output_dirpath(
+                        dirname, self.outdir)
+                    self._create_output_directories([basedir], output_dirpath)
+                self._process_tasks(tasks)
+                self._write_asset_manifest()
+                signals.post_composition.send(self)
+            finally:
+                self._finish_build()
+
+    def _remove_source(self, source_file):
+        """Remove the output of a source file that is gone
+        and tell extensions to forget the source."""
+        output_file = self.resolver.as_output_file(source_file, self.outdir)
+        output_files = [output_file]
+        if self.assets is not None:
+            # Copied assets are under their original and fingerprinted names.
+            dirname, filename = os.path.split(output_file)
+            output_files.append(os.path.join(
+                dirname, self.assets.get_filename(source_file, filename)))
+            self.assets.remove(source_file)
+        for output_file in output_files:
+            # A linked copy is removed without following the link.
+            if (
+                os.path.lexists(output_file) and
+                not os.path.isdir(output_file)
+            ):
+                logger.info(_('Removing {output_file} ...').format(
+                    output_file=output_file))
+                os.remove(output_file)
+            self.manifest.remove_output(output_file)
+        self.manifest.remove_source(source_file)
+        signals.source_removed.send(source_file)
+
+    def _add_task(self, tasks, sources, source_file):
+        """Add a task to compose the source file unless there is one."""
+        if source_file in sources:
+            return
+        sources.add(source_file)
+        output_dirpath = self._get_output_dirpath(
+            os.path.dirname(source_file), self.outdir)
+        tasks.append((source_file, output_dirpath))
 
     def is_in_output(self, path):
         """Check if the file or directory path is in the output directory.
@@ -105,11 +284,22 @@ class Director(object):
 
         return path.startswith(outdir)
 
+    def is_in_cache(self, path):
+        """Check if the file or directory path is in the cache directory."""
+        return path.startswith(self.cache_dir)
+
     def produce(self):
         """Walk the site tree and generate the output."""
-        signals.pre_composition.send(self)
-        self._generate_output(self.outdir)
-        signals.post_composition.send(self)
+        with self.profiler.build():
+            signals.pre_composition.send(self)
+            try:
+                self._generate_output(self.outdir)
+                # Extensions may record outputs in the manifest
+                # so the build finishes after them.
+                signals.post_composition.send(self)
+                self._write_change_list()
+            finally:
+                self._finish_build()
 
     def _generate_output(self, outdir):
         if os.path.exists(outdir):
@@ -118,20 +308,34 @@ class Director(object):
             logger.info(_('Creating {outdir} ...').format(outdir=outdir))
             os.mkdir(outdir)
 
-        self._collect_frontmatter()
+        # Every phase uses a single scan of the site.
+        with self.profiler.phase('walk'):
+            inventory = self.site.scan()
+        self.manifest.stats = inventory.stats
+        self.frontmatter_index.stats = inventory.stats
 
-        for dirpath, dirnames, filenames in self.site.walk():
-            output_dirpath = self._get_output_dirpath(dirpath, outdir)
-            logger.info(_('Populating {dirpath} ...').format(
-                dirpath=output_dirpath))
+        with self.profiler.phase('frontmatter'):
+            self._collect_frontmatter(inventory)
 
-            self._create_output_directories(dirnames, output_dirpath)
+        # Create the whole directory tree first so that files can be composed
+        # in any order.
+        tasks = []
+        with self.profiler.phase('walk'):
+            for dirpath, dirnames, filenames in inventory.walk():
+                output_dirpath = self._get_output_dirpath(dirpath, outdir)
+                logger.info(_('Populating {dirpath} ...').format(
+                    dirpath=output_dirpath))
 
-            for filename in filenames:
-                filepath = os.path.join(dirpath, filename)
-                self._process_file(filepath, output_dirpath)
+                self._create_output_directories(dirnames, output_dirpath)
+
+                for filename in filenames:
+                    filepath = os.path.join(dirpath, filename)
+                    tasks.append((filepath, output_dirpath))
 
-    def _collect_frontmatter(self):
+        self._process_tasks(tasks, parallel=True)
+        self._write_asset_manifest()
+
+    def _collect_frontmatter(self, inventory):
         """Collect all the frontmatter.
 
         Including a single walk to collect frontmatter gives extensions
@@ -139,13 +343,170 @@ class Director(object):
 
         Extensions can use this information to factor in relationships
         between files *before* output rendering occurs.
+
+        The parsed documents are kept in the document store
+        so composers do not need to read the files again.
+        Files that did not change since the last build
+        come from the frontmatter index without being read.
+
+        When assets are fingerprinted, the walk also hashes every asset
+        so that pages can refer to an asset before it is in the output.
         """
-        for dirpath, dirnames, filenames in self.site.walk():
+        source_files = []
+        for dirpath, dirnames, filenames in inventory.walk():
             for filename in filenames:
                 composer = self.composers.select_composer_for(filename)
                 if composer.permit_frontmatter:
                     filepath = os.path.join(dirpath, filename)
                     self.extractor.extract(filepath)
+                    source_files.append(filepath)
+                elif self.assets is not None:
+                    self._add_asset(os.path.join(dirpath, filename))
+        self.frontmatter_index.retain(source_files)
+
+    def _add_asset(self, filepath):
+        """Add the asset from the source file to the asset manifest.
+
+        Return ``True`` when the asset is new or changed.
+        """
+        composer = self.composers.select_composer_for(filepath)
+        root, ext = os.path.splitext(os.path.relpath(filepath, self.site.path))
+        name = (root + composer.get_output_extension(filepath)).replace(
+            os.sep, '/')
+        if not self.assets.is_asset_name(name):
+            return False
+        digest = composer.get_asset_digest(filepath)
+        if digest is None:
+            return False
+        return self.assets.add(filepath, name, digest)
+
+    def _write_change_list(self):
+        """Write the outputs that the build added, modified, left unchanged,
+        or orphaned so a deploy can upload only the changes."""
+        if self.config.change_list is None:
+            return
+        self.writer.write_change_list(
+            self.config.change_list, self.outdir, self._is_build_file)
+
+    def _is_build_file(self, path):
+        """Check if the path is a file of the build itself
+        rather than a site output."""
+        return path == self.config.change_list or self.is_in_cache(path)
+
+    def _write_asset_manifest(self):
+        """Write the asset manifest for anything that deploys the output."""
+        if self.assets is None:
+            return
+        self.writer.write(
+            os.path.join(self.outdir, AssetManifest.FILENAME),
+            self.assets.to_json().encode('utf-8'))
+
+    def _is_processable(self, path):
+        """Check if a changed path is a site source that may have output
+        or may have had output before it was removed."""
+        if self._should_skip(path):
+            return False
+        # Skip files in the output directory.
+        if self.is_in_output(path):
+            return False
+        # Skip files in the cache directory.
+        if self.is_in_cache(path):
+            return False
+        # Skip the change list that a build writes.
+        return path != self.config.change_list
+
+    def _get_template_dependents(self, template_path):
+        """Get every file that depends on the template.
+
+        The manifest knows which files used the template directly
+        or through the template's inheritance chain.
+        """
+        dependents = self._get_dependents(template_path)
+        if dependents:
+            logger.info(_('Updating files that use {template} ...').format(
+                template=template_path))
+        return dependents
+
+    def _get_dependents(self, path):
+        """Get the existing source files that depend on the path."""
+        return [
+            source_file
+            for source_file in self.manifest.get_dependents(path)
+            if os.path.exists(source_file)]
+
+    def _process_tasks(self, tasks, parallel=False):
+        """Process each file and output directory pair.
+
+        The files are only composed in parallel when ``parallel`` is set
+        and there is more than one worker.
+        Composers that batch their work finish it once every file is composed.
+        """
+        if parallel and self.config.workers > 1:
+            self._process_files_in_parallel(tasks)
+        else:
+            for filepath, output_dirpath in tasks:
+                self._process_file(filepath, output_dirpath)
+        self.composers.flush()
+
+    def _process_files_in_parallel(self, tasks):
+        """Compose the files with a pool of worker processes.
+
+        Each file is independent of the others by this point because the
+        frontmatter is already collected and the output directories exist.
+        """
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            logger.warning(_(
+                'Parallel composition is not available on this platform. '
+                'Composing with a single process ...'))
+            for filepath, output_dirpath in tasks:
+                self._process_file(filepath, output_dirpath)
+            return
+
+        # The work of batched composers must stay in this process
+        # to be flushed.
+        parallel_tasks = []
+        for filepath, output_dirpath in tasks:
+            composer = self.composers.select_composer_for(filepath)
+            if composer.batched:
+                self._process_file(filepath, output_dirpath)
+            else:
+                parallel_tasks.append((filepath, output_dirpath))
+        tasks = parallel_tasks
+
+        global _worker_director
+        _worker_director = self
+        workers = self.config.workers
+        # Hand out work in chunks to limit the messages between processes,
+        # but keep the chunks small enough to balance the load.
+        chunksize = max(1, len(tasks) // (workers * 4))
+        try:
+            context = multiprocessing.get_context('fork')
+            with context.Pool(workers) as pool:
+                for updates, timings, counts in pool.imap_unordered(
+                        _compose_in_worker, tasks, chunksize):
+                    self.manifest.merge(updates)
+                    self.profiler.merge(timings)
+                    self.writer.merge(counts)
+        finally:
+            _worker_director = None
+
+    def _finish_build(self):
+        """Report the written outputs, save the manifest
+        and frontmatter index, prune the content cache,
+        and forget the parsed documents.
+
+        The documents are only valid for a single build because the sources
+        may change before the next one (e.g., in the development server).
+        """
+        self.writer.report()
+        # The stat results from the scan are stale after the build.
+        self.manifest.stats = {}
+        self.frontmatter_index.stats = {}
+        self.manifest.save()
+        self.frontmatter_index.save()
+        if self.content_cache is not None:
+            self.content_cache.prune()
+        self.composers.documents.clear()
 
     def _get_output_dirpath(self, dirpath, outdir):
         """Convert an input directory path rooted at the site path into the
@@ -174,16 +535,10 @@ class Director(object):
         if self._should_skip(filename):
             return
 
-        if self.config.timing:
-            start = time.time()
-
         composer = self.composers.select_composer_for(filename)
-        composer.compose(self.catalog, filepath, output_dirpath)
-
-        if self.config.timing:
-            end = time.time()
-            # Put at warn level to be independent of the verbose option.
-            logger.warn('[{0:.3f}s]'.format(end - start))
+        source_file = os.path.relpath(filepath, self.site.path)
+        with self.profiler.file(source_file, composer):
+            composer.compose(self.catalog, filepath, output_dirpath)
 
     def _should_skip(self, filename):
         """Determine if the file type should be skipped."""
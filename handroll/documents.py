@@ -0,0 +1,55 @@
+# Copyright (c) 2017, Matt Layman
+"""Parsed source documents"""
+
+
+class Document(object):
+    """A source document that is split into its parts.
+
+    :param first_line: The raw first line of the source file
+    :param frontmatter: Dictionary of parsed frontmatter
+        or ``None`` if the document has no frontmatter
+    :param body: The source that follows the first line or the frontmatter
+    :param body_loader: A function to get the body
+        the first time it is needed when the body is not given
+    """
+
+    def __init__(self, first_line, frontmatter, body=None, body_loader=None):
+        self.first_line = first_line
+        self.frontmatter = frontmatter
+        self._body = body
+        self._body_loader = body_loader
+
+    @property
+    def body(self):
+        if self._body is None and self._body_loader is not None:
+            self._body = self._body_loader()
+            self._body_loader = None
+        return self._body
+
+
+class DocumentStore(object):
+    """A store of parsed documents that lasts for a single build.
+
+    The frontmatter collection pass reads every document
+    before any output is composed.
+    Keeping those documents lets the composers skip a second read
+    and a second parse of the same source file.
+    """
+
+    def __init__(self):
+        self._documents = {}
+
+    def __len__(self):
+        return len(self._documents)
+
+    def add(self, source_file, document):
+        """Add a parsed document for the source file."""
+        self._documents[source_file] = document
+
+    def get(self, source_file):
+        """Get the parsed document for the source file or ``None``."""
+        return self._documents.get(source_file)
+
+    def clear(self):
+        """Forget all documents so the next build reads fresh sources."""
+        self._documents.clear()
@@ -54,10 +54,20 @@ def build_parser():
         '-d', '--debug', action='store_true',
         help=_('show debug level messages'))
     parser.add_argument(
-        '-t', '--timing', action='store_true', help=_('time the execution'))
+        '-t', '--timing', action='store_true',
+        help=_('log a summary of where the build time went'))
+    parser.add_argument(
+        '--profile', metavar='REPORT',
+        help=_('write a JSON report of where the build time went'))
+    parser.add_argument(
+        '--cprofile', metavar='DUMP',
+        help=_('write cProfile statistics of the build'))
     parser.add_argument(
         '-f', '--force', action='store_true',
         help=_('force composers to write output'))
+    parser.add_argument(
+        '-j', '--jobs', type=int,
+        help=_('compose files with this many worker processes'))
 
     subparsers = parser.add_subparsers(title=_('available commands'))
     [command.register(subparsers) for command in COMMANDS]
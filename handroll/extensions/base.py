@@ -1,6 +1,7 @@
 # Copyright (c) 2017, Matt Layman
 
 from handroll import signals
+from handroll.profiler import NULL_TIMER
 
 
 class Extension(object):
@@ -9,6 +10,9 @@ class Extension(object):
     handle_frontmatter_loaded = False
     handle_pre_composition = False
     handle_post_composition = False
+    handle_source_removed = False
+    # The ``BuildProfiler`` that times the signal handlers.
+    profiler = None
 
     def __init__(self, config):
         self._config = config
@@ -18,22 +22,39 @@ class Extension(object):
 
         if self.handle_frontmatter_loaded:
             def _handle_frontmatter_loaded(source_file, **kwargs):
-                self.on_frontmatter_loaded(source_file, kwargs['frontmatter'])
+                with self._time('frontmatter_loaded'):
+                    self.on_frontmatter_loaded(
+                        source_file, kwargs['frontmatter'])
             self._handlers['frontmatter_loaded'] = _handle_frontmatter_loaded
             signals.frontmatter_loaded.connect(_handle_frontmatter_loaded)
 
         if self.handle_post_composition:
             def _handle_post_composition(director, **kwargs):
-                self.on_post_composition(director)
+                with self._time('post_composition'):
+                    self.on_post_composition(director)
             self._handlers['post_composition'] = _handle_post_composition
             signals.post_composition.connect(_handle_post_composition)
 
         if self.handle_pre_composition:
             def _handle_pre_composition(director, **kwargs):
-                self.on_pre_composition(director)
+                with self._time('pre_composition'):
+                    self.on_pre_composition(director)
             self._handlers['pre_composition'] = _handle_pre_composition
             signals.pre_composition.connect(_handle_pre_composition)
 
+        if self.handle_source_removed:
+            def _handle_source_removed(source_file, **kwargs):
+                with self._time('source_removed'):
+                    self.on_source_removed(source_file)
+            self._handlers['source_removed'] = _handle_source_removed
+            signals.source_removed.connect(_handle_source_removed)
+
+    def _time(self, hook):
+        """Time a handler of a signal."""
+        if self.profiler is None:
+            return NULL_TIMER
+        return self.profiler.extension(self, hook)
+
     def on_frontmatter_loaded(self, source_file, frontmatter):
         """Handle the ``frontmatter_loaded`` signal.
 
@@ -64,3 +85,13 @@ class Extension(object):
         :param director: The director instance
         """
         raise NotImplementedError()
+
+    def on_source_removed(self, source_file):
+        """Handle the ``source_removed`` signal.
+
+        Activate this handler by setting ``handle_source_removed``
+        to ``True`` in the extension subclass.
+
+        :param source_file: Absolute path of the removed source file
+        """
+        raise NotImplementedError()
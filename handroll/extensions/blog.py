@@ -1,20 +1,25 @@
 # Copyright (c) 2017, Matt Layman
 
 import bisect
+import collections.abc
 import configparser
 import os
 
 import smartypants
 from werkzeug.contrib.atom import AtomFeed, FeedEntry
 
-from handroll import logger
+from handroll import __version__, logger
 from handroll.exceptions import AbortError
 from handroll.extensions.base import Extension
 from handroll.i18n import _
+from handroll.output import UNCHANGED, OutputWriter
 
 
 class BlogPost(object):
 
+    __slots__ = (
+        'date', 'source_file', 'summary', 'title', 'route', 'url', '_posts')
+
     def __init__(self, **kwargs):
         self.date = kwargs['date']
         self.source_file = kwargs['source_file']
@@ -26,12 +31,13 @@ class BlogPost(object):
         self._posts = kwargs['posts']
 
     def __eq__(self, other):
-        if other is None:
+        if not isinstance(other, BlogPost):
             return False
-        return self.__dict__ == other.__dict__
+        # The shared posts are not part of a post's identity.
+        return self._fields == other._fields
 
     def __lt__(self, other):
-        return self.date < other.date
+        return self.sort_key < other.sort_key
 
     def __ne__(self, other):
         return not self.__eq__(other)
@@ -39,27 +45,98 @@ class BlogPost(object):
     def __repr__(self):
         return 'BlogPost({}, {})'.format(self.source_file, self.date)
 
+    @property
+    def _fields(self):
+        return (
+            self.date, self.source_file, self.summary, self.title,
+            self.route, self.url)
+
+    @property
+    def sort_key(self):
+        """Get the key that orders posts chronologically.
+
+        The source file breaks ties between posts with the same date.
+        """
+        return (self.date, self.source_file)
+
     @property
     def next(self):
         """Get the next chronological blog post."""
-        posts_by_date = self.posts_by_date
-        index = bisect.bisect_left(posts_by_date, self)
-        if index + 1 == len(posts_by_date):
-            return None
-        return posts_by_date[index + 1]
+        return self._posts.next_post(self)
 
     @property
     def previous(self):
         """Get the previous chronological blog post."""
-        posts_by_date = self.posts_by_date
-        index = bisect.bisect_left(posts_by_date, self)
-        if index == 0:
-            return None
-        return posts_by_date[index - 1]
+        return self._posts.previous_post(self)
 
     @property
     def posts_by_date(self):
-        return sorted(self._posts.values(), key=lambda p: p.date)
+        return self._posts.by_date()
+
+
+class PostIndex(collections.abc.MutableMapping):
+    """A mapping of source files to blog posts
+    that keeps the posts in chronological order.
+
+    Adding or updating a post keeps the order
+    so finding the next or previous post is a binary search
+    instead of a sort of every post.
+    """
+
+    def __init__(self):
+        self._posts = {}
+        # The sort keys of every post in chronological order
+        self._keys = []
+
+    def __getitem__(self, source_file):
+        return self._posts[source_file]
+
+    def __setitem__(self, source_file, post):
+        if source_file in self._posts:
+            self._remove_key(self._posts[source_file])
+        self._posts[source_file] = post
+        bisect.insort(self._keys, post.sort_key)
+
+    def __delitem__(self, source_file):
+        post = self._posts.pop(source_file)
+        self._remove_key(post)
+
+    def __iter__(self):
+        return iter(self._posts)
+
+    def __len__(self):
+        return len(self._posts)
+
+    def by_date(self, reverse=False):
+        """Get the posts in chronological order."""
+        keys = reversed(self._keys) if reverse else self._keys
+        return [self._posts[source_file] for date, source_file in keys]
+
+    def latest(self, count):
+        """Get the newest posts, newest first, without sorting every post."""
+        if count <= 0:
+            return []
+        keys = self._keys[-count:]
+        return [
+            self._posts[source_file] for date, source_file in reversed(keys)]
+
+    def next_post(self, post):
+        """Get the post after the post or ``None`` for the latest."""
+        index = bisect.bisect_right(self._keys, post.sort_key)
+        if index == len(self._keys):
+            return None
+        return self._posts[self._keys[index][1]]
+
+    def previous_post(self, post):
+        """Get the post before the post or ``None`` for the earliest."""
+        index = bisect.bisect_left(self._keys, post.sort_key)
+        if index == 0:
+            return None
+        return self._posts[self._keys[index - 1][1]]
+
+    def _remove_key(self, post):
+        index = bisect.bisect_left(self._keys, post.sort_key)
+        del self._keys[index]
 
 
 class BlogExtension(Extension):
@@ -68,6 +145,7 @@ class BlogExtension(Extension):
     handle_frontmatter_loaded = True
     handle_pre_composition = True
     handle_post_composition = True
+    handle_source_removed = True
 
     required_metadata = {
         'author': 'atom_author',
@@ -78,9 +156,11 @@ class BlogExtension(Extension):
 
     def __init__(self, config):
         super(BlogExtension, self).__init__(config)
-        self.posts = {}
+        self.posts = PostIndex()
         self.atom_metadata = {}
         self.atom_output = ''
+        self.feed_limit = None
+        self.feed_archive_output = None
         self.list_template = None
         self.list_output = None
         self._resolver = None
@@ -96,6 +176,10 @@ class BlogExtension(Extension):
         for metadata, option in self.required_metadata.items():
             self._add_atom_metadata(metadata, option)
         self.atom_output = self._get_option('atom_output')
+        if self._config.parser.has_option('blog', 'feed_limit'):
+            self.feed_limit = self._get_feed_limit()
+        if self._config.parser.has_option('blog', 'feed_archive_output'):
+            self.feed_archive_output = self._get_feed_archive_output()
 
         # Collect HTML listing configuration.
         if self._config.parser.has_option('blog', 'list_template'):
@@ -124,15 +208,20 @@ class BlogExtension(Extension):
             self.posts[source_file] = post
             self._should_generate = True
 
+    def on_source_removed(self, source_file):
+        """Drop the post of a removed source file."""
+        if source_file in self.posts:
+            del self.posts[source_file]
+            self._should_generate = True
+
     def on_post_composition(self, director):
         """Generate blog output."""
         if not self._should_generate:
             return
-        blog_posts = sorted(
-            self.posts.values(), key=lambda p: p.date, reverse=True)
-        self._generate_atom_feed(director, blog_posts)
+        self._generate_atom_feed(director)
         if self.list_template is not None:
-            self._generate_list_page(director, blog_posts)
+            self._generate_list_page(
+                director, self.posts.by_date(reverse=True))
         self._should_generate = False
 
     def _is_post(self, frontmatter):
@@ -158,13 +247,97 @@ class BlogExtension(Extension):
                 'is missing required fields: {missing_fields}'.format(
                     filename=source_file, missing_fields=', '.join(missing))))
 
-    def _generate_atom_feed(self, director, blog_posts):
-        """Generate the atom feed."""
+    def _generate_atom_feed(self, director):
+        """Generate the atom feed and any archive feeds.
+
+        With a feed limit, the feed only has the newest posts.
+        The older posts go to archive feeds
+        (see `RFC 5005 <https://tools.ietf.org/html/rfc5005>`_)
+        when there is an archive output.
+        The first archive has the oldest posts
+        so an archive only changes when a post in its window changes.
+        """
+        if self.feed_limit is None:
+            feed_posts = self.posts.by_date(reverse=True)
+        else:
+            feed_posts = self.posts.latest(self.feed_limit)
+
+        archives = []
+        if self.feed_archive_output is not None:
+            archived = self.posts.by_date()[:-self.feed_limit]
+            archives = [
+                archived[start:start + self.feed_limit]
+                for start in range(0, len(archived), self.feed_limit)]
+
+        links = []
+        if archives:
+            links.append({
+                'rel': 'prev-archive',
+                'href': self._get_archive_url(len(archives)),
+            })
         logger.info(_('Generating Atom XML feed ...'))
-        builder = FeedBuilder(self.atom_metadata)
-        builder.add(blog_posts)
-        output_file = os.path.join(director.outdir, self.atom_output)
-        builder.write_to(output_file)
+        self._write_feed(
+            director, FeedBuilder(self.atom_metadata, links), feed_posts,
+            self.atom_output)
+
+        for number, posts in enumerate(archives, 1):
+            links = [
+                {'rel': 'current', 'href': self._get_url(self.atom_output)}]
+            if number > 1:
+                links.append({
+                    'rel': 'prev-archive',
+                    'href': self._get_archive_url(number - 1),
+                })
+            if number < len(archives):
+                links.append({
+                    'rel': 'next-archive',
+                    'href': self._get_archive_url(number + 1),
+                })
+            metadata = dict(
+                self.atom_metadata, feed_url=self._get_archive_url(number))
+            builder = ArchiveFeedBuilder(metadata, links)
+            self._write_feed(
+                director, builder, list(reversed(posts)),
+                self._get_archive_output(number))
+
+    def _write_feed(self, director, builder, posts, output):
+        """Write a feed unless the manifest shows that its posts
+        and links are the same as the last time it was written."""
+        output_file = os.path.join(director.outdir, output)
+        fingerprint = {
+            'extension': 'handroll.extensions.blog.BlogExtension',
+            'handroll': __version__,
+            'feed': director.manifest.hash_data({
+                'links': builder.links,
+                'metadata': self.atom_metadata,
+                'posts': [post._fields for post in posts],
+            }),
+        }
+        if director.manifest.is_current(output_file, fingerprint):
+            logger.debug(_('Skipping {filename} ... It is up to date.').format(
+                filename=output))
+            director.writer.mark(output_file, UNCHANGED)
+            return
+
+        dirname = os.path.dirname(output_file)
+        if not os.path.exists(dirname):
+            os.makedirs(dirname)
+        builder.add(posts)
+        builder.write_to(output_file, director.writer)
+        director.manifest.record(output_file, fingerprint)
+
+    def _get_archive_output(self, number):
+        """Get the output path of an archive feed."""
+        return self.feed_archive_output.format(number=number)
+
+    def _get_archive_url(self, number):
+        return self._get_url(self._get_archive_output(number))
+
+    def _get_url(self, output):
+        """Get the URL of an output path."""
+        return '{domain}/{path}'.format(
+            domain=self._config.domain.rstrip('/'),
+            path=output.replace(os.sep, '/').lstrip('/'))
 
     def _generate_list_page(self, director, blog_posts):
         """Generate the list page."""
@@ -173,7 +346,31 @@ class BlogExtension(Extension):
         builder = ListPageBuilder(template)
         builder.add(blog_posts)
         output_file = os.path.join(director.outdir, self.list_output)
-        builder.write_to(output_file)
+        builder.write_to(output_file, director.writer)
+
+    def _get_feed_limit(self):
+        """Get the maximum number of posts in the feed."""
+        try:
+            feed_limit = self._config.parser.getint('blog', 'feed_limit')
+        except ValueError:
+            feed_limit = 0
+
+        if feed_limit < 1:
+            raise AbortError(
+                _('The feed limit must be a positive integer.'))
+        return feed_limit
+
+    def _get_feed_archive_output(self):
+        """Get the output path pattern of archive feeds."""
+        if self.feed_limit is None:
+            raise AbortError(
+                _('Archive feeds require the feed_limit option.'))
+        feed_archive_output = self._get_option('feed_archive_output')
+        if '{number}' not in feed_archive_output:
+            raise AbortError(_(
+                'The feed_archive_output option must include {number} '
+                'for the archive number.'))
+        return feed_archive_output
 
     def _add_atom_metadata(self, name, option):
         """Add atom metadata from the config parser."""
@@ -199,20 +396,26 @@ class BlogBuilder(object):
         """
         raise NotImplementedError()
 
-    def write_to(self, filepath):
-        """Write the output to the provided filepath."""
+    def write_to(self, filepath, writer=None):
+        """Write the output to the provided filepath.
+
+        :param writer: the ``OutputWriter`` that skips unchanged output
+        """
+        if writer is None:
+            writer = OutputWriter()
         output = self._generate_output()
-        with open(filepath, 'wb') as out:
-            out.write(output.encode('utf-8'))
-            out.write(b'<!-- handrolled for excellence -->\n')
+        writer.write(
+            filepath,
+            output.encode('utf-8') + b'<!-- handrolled for excellence -->\n')
 
 
 class FeedBuilder(BlogBuilder):
     """Transform blog metadata and posts into an Atom feed."""
 
-    def __init__(self, metadata):
+    def __init__(self, metadata, links=None):
         self.metadata = metadata
-        self._feed = AtomFeed(**metadata)
+        self.links = links or []
+        self._feed = AtomFeed(links=self.links, **metadata)
 
     def add(self, posts):
         """Add blog posts to the feed."""
@@ -229,6 +432,22 @@ class FeedBuilder(BlogBuilder):
         return self._feed.to_string()
 
 
+class ArchiveFeedBuilder(FeedBuilder):
+    """Transform blog metadata and older posts into an archive feed
+    as described in RFC 5005."""
+
+    FEED = '<feed xmlns="http://www.w3.org/2005/Atom">'
+    ARCHIVE_FEED = (
+        '<feed xmlns="http://www.w3.org/2005/Atom"'
+        ' xmlns:fh="http://purl.org/syndication/history/1.0">\n'
+        '  <fh:archive />')
+
+    def _generate_output(self):
+        output = super(ArchiveFeedBuilder, self)._generate_output()
+        # The Atom feed has no way to add the archive marker element.
+        return output.replace(self.FEED, self.ARCHIVE_FEED, 1)
+
+
 class ListPageBuilder(BlogBuilder):
     """Transform blog posts into a list page."""
 
@@ -1,6 +1,6 @@
 # Copyright (c) 2017, Matt Layman
 
-from pkg_resources import iter_entry_points
+from handroll.plugins import get_entry_points
 
 
 class ExtensionLoader(object):
@@ -10,16 +10,18 @@ class ExtensionLoader(object):
         self._available_extensions = {}
 
     def load(self):
-        """Load all available extensions from ``handroll.extensions``."""
-        for entry_point in iter_entry_points('handroll.extensions'):
-            cls = entry_point.load()
-            self._available_extensions[entry_point.name] = cls
+        """Find all available extensions from ``handroll.extensions``.
+
+        An extension's class is only loaded when the extension is active.
+        """
+        self._available_extensions = get_entry_points('handroll.extensions')
 
     def get_active_extensions(self, config):
         """Get instances of active extensions."""
         extensions = []
         for extension in config.active_extensions:
-            extension_cls = self._available_extensions.get(extension)
-            if extension_cls is not None:
+            entry_point = self._available_extensions.get(extension)
+            if entry_point is not None:
+                extension_cls = entry_point.load()
                 extensions.append(extension_cls(config))
         return extensions
@@ -13,6 +13,7 @@ class SitemapExtension(Extension):
     handle_frontmatter_loaded = True
     handle_pre_composition = True
     handle_post_composition = True
+    handle_source_removed = True
 
     def __init__(self, config):
         super(SitemapExtension, self).__init__(config)
@@ -34,12 +35,17 @@ class SitemapExtension(Extension):
                 self.urls.add(url)
                 self._dirty = True
 
+    def on_source_removed(self, source_file):
+        url = self._resolver.as_url(source_file)
+        if url in self.urls:
+            self.urls.remove(url)
+            self._dirty = True
+
     def on_post_composition(self, director):
         if not self._dirty:
             return
         logger.info(_('Generating sitemap ...'))
         sitemap_path = os.path.join(director.outdir, 'sitemap.txt')
-        with open(sitemap_path, 'w') as sitemap:
-            for url in sorted(self.urls):
-                sitemap.write(url + '\n')
+        content = ''.join(url + '\n' for url in sorted(self.urls))
+        director.writer.write(sitemap_path, content.encode('utf-8'))
         self._dirty = False
@@ -1,9 +1,230 @@
+import datetime
+import json
+import os
+import sqlite3
+
+from handroll import __version__, logger
 from handroll.composers.mixins import FrontmatterComposerMixin
+from handroll.i18n import _
 
 
 class FrontmatterExtractor(FrontmatterComposerMixin):
-    """Extract frontmatter from a source file."""
+    """Extract frontmatter from a source file.
+
+    Only the frontmatter is read. The bodies are left
+    for the composers that need them.
+    """
+    read_headers = True
+
+    def __init__(self, documents=None, frontmatter_index=None):
+        self.documents = documents
+        self.frontmatter_index = frontmatter_index
 
     def extract(self, source_file):
-        data, source = self.get_data(source_file)
-        return data
+        return self.get_document_data(self.load_document(source_file))
+
+
+class FrontmatterIndex(object):
+    """A frontmatter index keeps the parsed frontmatter of every source
+    between builds.
+
+    Collecting frontmatter reads and parses every source at the start
+    of a build. With the index, only the sources that changed are parsed.
+    The rest come from the index.
+
+    An entry is only used while the source has the same size
+    and modified time and handroll is the same version.
+    The index is a SQLite database.
+    Entries are JSON (with dates) instead of pickles
+    because a restored cache directory should not be able to run code.
+    Frontmatter that JSON cannot hold exactly is not indexed.
+    Entries are written in a single transaction when the build finishes.
+
+    :param path: The file of the SQLite database
+    :param site_path: The site that the sources are in
+    """
+
+    def __init__(self, path, site_path):
+        self.path = path
+        self.site_path = site_path
+        # Stat results of source files from a site scan by path.
+        # A build sets them so that files are not stat'd again.
+        self.stats = {}
+        self._entries = None
+        self._updates = {}
+        self._removals = set()
+
+    def get(self, source_file):
+        """Get the first line and frontmatter of an unchanged source file.
+
+        The result is ``None`` when the source file is not in the index
+        or changed since it was indexed.
+        The frontmatter is ``None`` for a source file without any.
+        """
+        entry = self._load().get(self._key(source_file))
+        if entry is None:
+            return None
+        try:
+            signature = self._get_signature(source_file)
+        except OSError:
+            return None
+        if list(entry[:3]) != signature:
+            return None
+
+        try:
+            first_line, frontmatter = json.loads(
+                entry[3], object_hook=_decode_value)
+        except (TypeError, ValueError):
+            # A bad entry is only a miss. The source is parsed again.
+            return None
+        return first_line, frontmatter
+
+    def record(self, source_file, first_line, frontmatter):
+        """Record the first line and frontmatter of a parsed source file."""
+        try:
+            signature = self._get_signature(source_file)
+        except OSError:
+            return
+        key = self._key(source_file)
+        data = _encode(first_line, frontmatter)
+        if data is None:
+            # The frontmatter is parsed every build instead.
+            self._forget(key)
+            return
+        entry = tuple(signature) + (data,)
+        self._load()[key] = entry
+        self._updates[key] = entry
+        self._removals.discard(key)
+
+    def retain(self, source_files):
+        """Remove every source file that is not one of the source files
+        (e.g., a deleted source)."""
+        keep = set(self._key(source_file) for source_file in source_files)
+        for key in list(self._load()):
+            if key not in keep:
+                self._forget(key)
+
+    def _forget(self, key):
+        """Remove an entry from the index."""
+        if self._load().pop(key, None) is not None:
+            self._removals.add(key)
+        self._updates.pop(key, None)
+
+    def save(self):
+        """Save the changes since the last save."""
+        if not self._updates and not self._removals:
+            return
+
+        dirname = os.path.dirname(self.path)
+        if not os.path.exists(dirname):
+            os.makedirs(dirname)
+
+        try:
+            connection = sqlite3.connect(self.path)
+            try:
+                with connection:
+                    self._create_table(connection)
+                    connection.executemany(
+                        'INSERT OR REPLACE INTO frontmatter '
+                        '(path, size, mtime_ns, handroll, data) '
+                        'VALUES (?, ?, ?, ?, ?)',
+                        [(key,) + entry
+                         for key, entry in self._updates.items()])
+                    connection.executemany(
+                        'DELETE FROM frontmatter WHERE path = ?',
+                        [(key,) for key in self._removals])
+            finally:
+                connection.close()
+        except sqlite3.Error as ex:
+            logger.warning(_(
+                'Unable to save the frontmatter index at {path}: {error}'
+            ).format(path=self.path, error=ex))
+        self._updates = {}
+        self._removals = set()
+
+    def _load(self):
+        """Load the index from the last build the first time it is needed."""
+        if self._entries is not None:
+            return self._entries
+
+        self._entries = {}
+        if not os.path.exists(self.path):
+            return self._entries
+
+        try:
+            connection = sqlite3.connect(self.path)
+            try:
+                self._create_table(connection)
+                rows = connection.execute(
+                    'SELECT path, size, mtime_ns, handroll, data '
+                    'FROM frontmatter WHERE handroll = ?', (__version__,))
+                for row in rows:
+                    # The version is part of the signature of an entry.
+                    self._entries[row[0]] = (row[1], row[2], row[3], row[4])
+            finally:
+                connection.close()
+        except sqlite3.Error:
+            logger.warning(_(
+                'The frontmatter index at {path} is unreadable. '
+                'Starting a new one ...').format(path=self.path))
+            os.remove(self.path)
+        return self._entries
+
+    def _create_table(self, connection):
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS frontmatter ('
+            'path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, '
+            'handroll TEXT, data BLOB)')
+
+    def _get_signature(self, source_file):
+        stat = self.stats.get(source_file)
+        if stat is None:
+            stat = os.stat(source_file)
+        return [stat.st_size, stat.st_mtime_ns, __version__]
+
+    def _key(self, source_file):
+        return os.path.relpath(source_file, self.site_path)
+
+
+def _encode(first_line, frontmatter):
+    """Encode a first line and frontmatter as JSON.
+
+    Return ``None`` when the frontmatter would not decode to an equal value
+    (e.g., YAML sets or a mapping with number keys).
+    """
+    try:
+        data = json.dumps([first_line, frontmatter], default=_encode_value)
+    except (TypeError, ValueError):
+        return None
+    if json.loads(data, object_hook=_decode_value) != [
+            first_line, frontmatter]:
+        return None
+    return data
+
+
+def _encode_value(value):
+    """Encode the dates that YAML makes."""
+    if isinstance(value, datetime.datetime):
+        offset = value.utcoffset()
+        return {
+            '__datetime__': [
+                value.year, value.month, value.day, value.hour,
+                value.minute, value.second, value.microsecond],
+            'utcoffset': None if offset is None else offset.total_seconds(),
+        }
+    if isinstance(value, datetime.date):
+        return {'__date__': [value.year, value.month, value.day]}
+    raise TypeError(repr(value))
+
+
+def _decode_value(value):
+    """Decode the dates from ``_encode_value``."""
+    if '__datetime__' in value:
+        tzinfo = None
+        if value['utcoffset'] is not None:
+            tzinfo = datetime.timezone(
+                datetime.timedelta(seconds=value['utcoffset']))
+        return datetime.datetime(*value['__datetime__'], tzinfo=tzinfo)
+    if '__date__' in value:
+        return datetime.date(*value['__date__'])
+    return value
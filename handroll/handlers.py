@@ -1,30 +1,142 @@
 # Copyright (c) 2017, Matt Layman
 
+from collections import OrderedDict
+import threading
+import time
+
 from watchdog.events import FileSystemEventHandler
 
+from handroll import logger
+from handroll.exceptions import AbortError
+from handroll.i18n import _
+
+
+class RebuildQueue(object):
+    """A queue of changed paths that the director processes in batches.
+
+    A single save in an editor can produce several file system events
+    and a ``git checkout`` can produce hundreds.
+    The queue waits until no event arrives for the ``delay`` (in seconds),
+    drops duplicate paths, and hands the batch to the director
+    from a worker thread.
+
+    :param director: The director that processes the changes
+    :param delay: The quiet time to wait for before processing a batch
+    """
+
+    def __init__(self, director, delay):
+        self.director = director
+        self.delay = delay
+        # The ordered dictionary keeps the order of paths and drops duplicates.
+        self._paths = OrderedDict()
+        self._last_change = 0
+        self._condition = threading.Condition()
+        # Only one batch may be processed at a time.
+        self._build_lock = threading.Lock()
+        self._stopped = False
+        self._thread = None
+
+    def put(self, path):
+        """Add a changed path to the queue."""
+        with self._condition:
+            self._paths[path] = None
+            self._last_change = time.monotonic()
+            self._condition.notify()
+
+    def start(self):
+        """Start processing batches on a worker thread."""
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Stop the worker thread after any batch in progress finishes."""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def flush(self):
+        """Process any queued paths immediately on the calling thread."""
+        with self._condition:
+            paths = self._take_paths()
+        self._process(paths)
+
+    def _run(self):
+        while True:
+            paths = self._wait_for_batch()
+            if paths is None:
+                return
+            self._process(paths)
+
+    def _wait_for_batch(self):
+        """Wait for the queue to be quiet and take its paths.
+
+        Return ``None`` when the queue is stopped.
+        """
+        with self._condition:
+            while not self._paths and not self._stopped:
+                self._condition.wait()
+            # Debounce by waiting until the events stop arriving.
+            while not self._stopped:
+                remaining = self._last_change + self.delay - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            if self._stopped:
+                return None
+            return self._take_paths()
+
+    def _take_paths(self):
+        paths = list(self._paths)
+        self._paths.clear()
+        return paths
+
+    def _process(self, paths):
+        if not paths:
+            return
+        with self._build_lock:
+            try:
+                self.director.process_changes(paths)
+            except AbortError as abort:
+                # Keep watching so that the next save can fix the problem.
+                logger.error(str(abort))
+            except Exception:
+                logger.exception(_('Failed to process the site changes.'))
+
 
 class SiteHandler(FileSystemEventHandler):
     """The ``SiteHandler`` listens for file systems events and passes
     information to the director to generate the appropriate output based on
     changes.
+
+    Changes go through a ``RebuildQueue`` so that a burst of events
+    causes a single rebuild.
+    Deleted and moved files remove their stale output.
     """
 
-    def __init__(self, director):
+    # The seconds to wait for more events before rebuilding.
+    DELAY = 0.2
+
+    def __init__(self, director, delay=DELAY):
         self.director = director
+        self.queue = RebuildQueue(director, delay)
 
     def on_created(self, event):
-        if event.is_directory:
-            self.director.process_directory(event.src_path)
-        else:
-            self.director.process_file(event.src_path)
+        self.queue.put(event.src_path)
 
     def on_modified(self, event):
         # Only pay attention to modified files, not directories.
         if not event.is_directory:
-            self.director.process_file(event.src_path)
+            self.queue.put(event.src_path)
+
+    def on_deleted(self, event):
+        self.queue.put(event.src_path)
 
     def on_moved(self, event):
-        if event.is_directory:
-            self.director.process_directory(event.dest_path)
-        else:
-            self.director.process_file(event.dest_path)
+        # The old path is gone so its output goes with it.
+        self.queue.put(event.src_path)
+        self.queue.put(event.dest_path)
@@ -0,0 +1,359 @@
+# Copyright (c) 2017, Matt Layman
+"""The record of what produced each output file"""
+
+import hashlib
+import json
+import os
+
+from handroll import __version__, logger
+from handroll.i18n import _
+
+
+def hash_bytes(content):
+    """Get the hex digest of some bytes."""
+    return hashlib.sha1(content).hexdigest()
+
+
+class BuildManifest(object):
+    """A build manifest records the inputs of every output file.
+
+    Each output has a fingerprint made from the hashes of its source,
+    template, and frontmatter, the composer that made it,
+    and the handroll version.
+    An output is current when its recorded fingerprint matches
+    the fingerprint of the present inputs.
+
+    Unlike modified times, content hashes survive a fresh checkout
+    or a restored CI cache so those builds only compose what really changed.
+    The manifest also keeps the dependency graph
+    of which sources used which templates.
+    When a template changes, the graph finds the sources to compose again.
+
+    The manifest also records a hash of what was written to each output
+    so that writing the same content again can be skipped.
+    What a composer learned from reading a source (e.g., its template)
+    is kept with the source's stat signature
+    so an unchanged source can be checked without reading it.
+
+    Paths are stored relative to the site and output directories
+    so the manifest still applies when the site moves.
+    The records of outputs only apply to the output directory
+    that they were made in.
+    A build to another output directory starts them over.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path, site_path, outdir):
+        self.path = path
+        self.site_path = site_path
+        self.outdir = outdir
+        self._outputs = {}
+        self._dependencies = {}
+        # The content hashes of written outputs by stat signature
+        self._contents = {}
+        # What composers learned from reading sources by stat signature
+        self._source_info = {}
+        # Source hashes are cached by stat signature to avoid reading files
+        # that did not change.
+        self._hashes = {}
+        # Stat results of source files from a site scan by path.
+        # A build sets them so that files are not stat'd again.
+        self.stats = {}
+        # Keep track of updates so worker processes can send them back.
+        self._updated_outputs = set()
+        self._updated_hashes = set()
+        self._updated_dependencies = set()
+        self._updated_contents = set()
+        self._updated_source_info = set()
+        self._dirty = False
+        self._load()
+
+    def fingerprint(self, composer, source_file, template=None,
+                    frontmatter=None):
+        """Make a fingerprint from the inputs of an output file.
+
+        :param composer: the composer that makes the output
+        :param source_file: the filename of the source
+        :param template: an optional template with a ``digest``
+        :param frontmatter: an optional dictionary of frontmatter
+        """
+        composer_cls = type(composer)
+        fingerprint = {
+            'composer': composer_cls.__module__ + '.' + composer_cls.__name__,
+            'handroll': __version__,
+            'source': self.hash_file(source_file),
+        }
+        if template is not None:
+            fingerprint['template'] = template.digest
+        if frontmatter is not None:
+            fingerprint['frontmatter'] = self.hash_data(frontmatter)
+        return fingerprint
+
+    def hash_file(self, path):
+        """Get the hash of a file's content.
+
+        The hash is only computed again when the file's size or modified time
+        changed since the last time it was hashed.
+        """
+        key = os.path.relpath(path, self.site_path)
+        signature = self._get_signature(path)
+        cached = self._hashes.get(key)
+        if cached is not None and cached[:2] == signature:
+            return cached[2]
+
+        with open(path, 'rb') as f:
+            digest = hash_bytes(f.read())
+        self._hashes[key] = signature + [digest]
+        self._updated_hashes.add(key)
+        self._dirty = True
+        return digest
+
+    def hash_data(self, data):
+        """Get the hash of some data like a frontmatter dictionary."""
+        serialized = json.dumps(data, sort_keys=True, default=repr)
+        return hash_bytes(serialized.encode('utf-8'))
+
+    def is_current(self, output_file, fingerprint):
+        """Check if the output file exists and came from the same inputs."""
+        if not os.path.exists(output_file):
+            return False
+        return self._outputs.get(self._output_key(output_file)) == fingerprint
+
+    def has_record(self, output_file):
+        """Check if the output file has any recorded fingerprint."""
+        return self._output_key(output_file) in self._outputs
+
+    def record(self, output_file, fingerprint):
+        """Record the fingerprint of a freshly written output file."""
+        key = self._output_key(output_file)
+        self._outputs[key] = fingerprint
+        self._updated_outputs.add(key)
+        self._dirty = True
+
+    def get_content_digest(self, output_file):
+        """Get the hash of the content that was written to the output file.
+
+        The hash is ``None`` when the output is missing,
+        was never recorded, or changed since it was written.
+        """
+        key = self._output_key(output_file)
+        recorded = self._contents.get(key)
+        if recorded is None:
+            return None
+        try:
+            stat = os.stat(output_file)
+        except OSError:
+            return None
+        if recorded[:2] != [stat.st_size, stat.st_mtime_ns]:
+            return None
+        return recorded[2]
+
+    def record_content(self, output_file, digest):
+        """Record the hash of the content in a freshly written output file."""
+        key = self._output_key(output_file)
+        stat = os.stat(output_file)
+        self._contents[key] = [stat.st_size, stat.st_mtime_ns, digest]
+        self._updated_contents.add(key)
+        self._dirty = True
+
+    def get_source_info(self, source_file):
+        """Get the information that was recorded from reading the source file.
+
+        The information is ``None`` when the source changed
+        since it was recorded.
+        """
+        key = os.path.relpath(source_file, self.site_path)
+        recorded = self._source_info.get(key)
+        if recorded is None:
+            return None
+        try:
+            signature = self._get_signature(source_file)
+        except OSError:
+            return None
+        if recorded[:2] != signature:
+            return None
+        return recorded[2]
+
+    def record_source_info(self, source_file, info):
+        """Record information from reading the source file
+        (e.g., its template and a hash of its frontmatter)."""
+        key = os.path.relpath(source_file, self.site_path)
+        recorded = self._get_signature(source_file) + [info]
+        if self._source_info.get(key) != recorded:
+            self._source_info[key] = recorded
+            self._updated_source_info.add(key)
+            self._dirty = True
+
+    def record_dependencies(self, source_file, dependencies):
+        """Record the files (e.g., templates) that the source file uses."""
+        key = os.path.relpath(source_file, self.site_path)
+        dependencies = sorted(
+            os.path.relpath(dependency, self.site_path)
+            for dependency in dependencies)
+        if self._dependencies.get(key) != dependencies:
+            self._dependencies[key] = dependencies
+            self._updated_dependencies.add(key)
+            self._dirty = True
+
+    def get_dependencies(self, source_file):
+        """Get the files that the source file used when it was recorded."""
+        key = os.path.relpath(source_file, self.site_path)
+        return [
+            os.path.join(self.site_path, dependency)
+            for dependency in self._dependencies.get(key, [])]
+
+    def get_dependents(self, path):
+        """Get the source files that depend on the path."""
+        dependency = os.path.relpath(path, self.site_path)
+        return sorted(
+            os.path.join(self.site_path, source)
+            for source, dependencies in self._dependencies.items()
+            if dependency in dependencies)
+
+    def get_sources(self, path):
+        """Get the recorded source files at the path
+        or in the directory at the path."""
+        key = os.path.relpath(path, self.site_path)
+        prefix = key + os.sep
+        sources = set(self._hashes)
+        sources.update(self._dependencies)
+        sources.update(self._source_info)
+        return sorted(
+            os.path.join(self.site_path, source)
+            for source in sources
+            if source == key or source.startswith(prefix))
+
+    def remove_source(self, source_file):
+        """Remove every record of a source file that is gone."""
+        key = os.path.relpath(source_file, self.site_path)
+        for records, updated in (
+            (self._hashes, self._updated_hashes),
+            (self._dependencies, self._updated_dependencies),
+            (self._source_info, self._updated_source_info),
+        ):
+            if records.pop(key, None) is not None:
+                self._dirty = True
+            updated.discard(key)
+
+    def remove_output(self, output_file):
+        """Remove the records of an output file that was deleted."""
+        key = self._output_key(output_file)
+        for records, updated in (
+            (self._outputs, self._updated_outputs),
+            (self._contents, self._updated_contents),
+        ):
+            if records.pop(key, None) is not None:
+                self._dirty = True
+            updated.discard(key)
+
+    def drain(self):
+        """Remove and return the updates since the last drain."""
+        updates = {
+            'hashes': dict(
+                (key, self._hashes[key]) for key in self._updated_hashes),
+            'outputs': dict(
+                (key, self._outputs[key]) for key in self._updated_outputs),
+            'dependencies': dict(
+                (key, self._dependencies[key])
+                for key in self._updated_dependencies),
+            'contents': dict(
+                (key, self._contents[key]) for key in self._updated_contents),
+            'source_info': dict(
+                (key, self._source_info[key])
+                for key in self._updated_source_info),
+        }
+        self._updated_hashes = set()
+        self._updated_outputs = set()
+        self._updated_dependencies = set()
+        self._updated_contents = set()
+        self._updated_source_info = set()
+        return updates
+
+    def merge(self, updates):
+        """Merge updates that were drained from another manifest."""
+        if any(updates.values()):
+            self._hashes.update(updates['hashes'])
+            self._outputs.update(updates['outputs'])
+            self._dependencies.update(updates['dependencies'])
+            self._contents.update(updates['contents'])
+            self._source_info.update(updates['source_info'])
+            self._dirty = True
+
+    def save(self):
+        """Save the manifest if anything changed."""
+        if not self._dirty:
+            return
+
+        dirname = os.path.dirname(self.path)
+        if not os.path.exists(dirname):
+            os.makedirs(dirname)
+
+        manifest = {
+            'version': self.VERSION,
+            'outdir': self._get_outdir_key(),
+            'contents': self._contents,
+            'dependencies': self._dependencies,
+            'hashes': self._hashes,
+            'outputs': self._outputs,
+            'source_info': self._source_info,
+        }
+        # Write to a temporary file first so that an interrupted save
+        # never leaves a corrupt manifest behind.
+        temporary_path = self.path + '.tmp'
+        with open(temporary_path, 'w') as f:
+            json.dump(manifest, f, sort_keys=True)
+        os.replace(temporary_path, self.path)
+        self._dirty = False
+
+    def _load(self):
+        """Load the manifest from the last build if there is one."""
+        if not os.path.exists(self.path):
+            return
+
+        try:
+            with open(self.path, 'r') as f:
+                manifest = json.load(f)
+        except ValueError:
+            logger.warning(_(
+                'The build manifest at {path} is unreadable. '
+                'Starting a new one ...').format(path=self.path))
+            return
+
+        if manifest.get('version') != self.VERSION:
+            return
+
+        self._dependencies = manifest.get('dependencies', {})
+        self._hashes = manifest.get('hashes', {})
+        self._source_info = manifest.get('source_info', {})
+        if manifest.get('outdir') == self._get_outdir_key():
+            self._contents = manifest.get('contents', {})
+            self._outputs = manifest.get('outputs', {})
+        else:
+            # The outputs were made in another output directory.
+            self._dirty = True
+
+    def _get_outdir_key(self):
+        """Get the output directory as it is stored in the manifest.
+
+        An output directory in the site is relative
+        so that it still matches when the site moves.
+        """
+        outdir = os.path.abspath(self.outdir)
+        site_path = os.path.abspath(self.site_path)
+        if outdir.startswith(site_path + os.sep):
+            return os.path.relpath(outdir, site_path)
+        return outdir
+
+    def _get_signature(self, path):
+        """Get the size and modified time of a source file.
+
+        The stat result comes from the build's site scan when there is one.
+        """
+        stat = self.stats.get(path)
+        if stat is None:
+            stat = os.stat(path)
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def _output_key(self, output_file):
+        return os.path.relpath(output_file, self.outdir)
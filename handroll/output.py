@@ -0,0 +1,165 @@
+# Copyright (c) 2017, Matt Layman
+"""The writer of output files"""
+
+import json
+import os
+
+from handroll import logger
+from handroll.i18n import _
+from handroll.manifest import hash_bytes
+
+ADDED = 'added'
+MODIFIED = 'modified'
+UNCHANGED = 'unchanged'
+ORPHANED = 'orphaned'
+CHANGES = (ADDED, MODIFIED, UNCHANGED, ORPHANED)
+
+
+class OutputWriter(object):
+    """An output writer only writes a file when its content changes.
+
+    Rewriting a file with identical bytes changes its modified time.
+    Tools that sync the output (e.g., rsync or a CDN upload)
+    would then send files that did not really change.
+
+    The new content is compared with the hash that the manifest recorded
+    when the file was last written.
+    Without a recorded hash, the content is compared with the file itself.
+
+    The writer also keeps the change to every output of a build
+    (added, modified, or unchanged) for the build's change list.
+    Outputs that are made without the writer (e.g., copies)
+    or that are skipped because they are current are marked.
+
+    :param manifest: The ``BuildManifest`` or ``None``
+    """
+
+    def __init__(self, manifest=None):
+        self.manifest = manifest
+        self.written = 0
+        self.unchanged = 0
+        # The change to each output file since the last drain
+        self.changes = {}
+
+    def write(self, output_file, content):
+        """Write the content (bytes) to the output file if it differs.
+
+        Return ``True`` when the file was written.
+        """
+        digest = hash_bytes(content)
+        if self._is_unchanged(output_file, content, digest):
+            logger.debug(_('Leaving {output_file} alone ... '
+                           'Its content is the same.').format(
+                output_file=output_file))
+            self.unchanged += 1
+            self.mark(output_file, UNCHANGED)
+            return False
+
+        self.mark(
+            output_file, MODIFIED if os.path.exists(output_file) else ADDED)
+        with open(output_file, 'wb') as out:
+            out.write(content)
+        if self.manifest is not None:
+            self.manifest.record_content(output_file, digest)
+        self.written += 1
+        return True
+
+    def mark(self, output_file, change):
+        """Mark the change to an output file for the change list."""
+        self.changes[output_file] = change
+
+    def drain(self):
+        """Remove and return the counts since the last drain."""
+        counts = {
+            'written': self.written,
+            'unchanged': self.unchanged,
+            'changes': self.changes,
+        }
+        self.written = 0
+        self.unchanged = 0
+        self.changes = {}
+        return counts
+
+    def merge(self, counts):
+        """Merge counts that were drained from another writer."""
+        self.written += counts['written']
+        self.unchanged += counts['unchanged']
+        self.changes.update(counts['changes'])
+
+    def get_change_list(self, outdir, ignore=None):
+        """Get the outputs by their change since the last drain.
+
+        Files in the output directory that the build did not make
+        are orphaned (e.g., the output of a deleted source).
+        Paths are relative to the output directory
+        and use ``/`` separators.
+
+        :param outdir: the output directory
+        :param ignore: an optional function to check if a path is ignored
+        """
+        change_list = dict((change, []) for change in CHANGES)
+        for output_file, change in self.changes.items():
+            change_list[change].append(self._relpath(output_file, outdir))
+
+        for dirpath, dirnames, filenames in os.walk(outdir):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                if path in self.changes:
+                    continue
+                if ignore is not None and ignore(path):
+                    continue
+                change_list[ORPHANED].append(self._relpath(path, outdir))
+
+        for paths in change_list.values():
+            paths.sort()
+        return change_list
+
+    def write_change_list(self, path, outdir, ignore=None):
+        """Write the change list to a file.
+
+        A ``.json`` file gets a JSON object of paths by change.
+        Any other file gets a line for each output
+        with the change and path separated by a space.
+        """
+        change_list = self.get_change_list(outdir, ignore)
+        if path.endswith('.json'):
+            content = json.dumps(change_list, indent=2, sort_keys=True)
+        else:
+            content = ''.join(
+                '{0} {1}\n'.format(change, output)
+                for change in CHANGES
+                for output in change_list[change])
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        logger.info(_('Wrote the change list to {path}.').format(path=path))
+
+    def _relpath(self, path, outdir):
+        return os.path.relpath(path, outdir).replace(os.sep, '/')
+
+    def report(self):
+        """Log the counts and start counting again."""
+        counts = self.drain()
+        if counts['written'] or counts['unchanged']:
+            logger.info(_('Wrote {written} files. '
+                          '{unchanged} files were unchanged.').format(
+                **counts))
+
+    def _is_unchanged(self, output_file, content, digest):
+        if self.manifest is not None:
+            recorded = self.manifest.get_content_digest(output_file)
+            if recorded is not None:
+                return recorded == digest
+
+        try:
+            size = os.path.getsize(output_file)
+        except OSError:
+            return False
+        if size != len(content):
+            return False
+
+        with open(output_file, 'rb') as f:
+            unchanged = f.read() == content
+        if unchanged and self.manifest is not None:
+            # Remember the hash so the next build does not read the file.
+            self.manifest.record_content(output_file, digest)
+        return unchanged
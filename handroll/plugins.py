@@ -0,0 +1,70 @@
+# Copyright (c) 2017, Matt Layman
+"""Discovery of the plugins in handroll's entry point groups"""
+
+# The entry point groups of handroll's plugins
+GROUPS = ('handroll.composers', 'handroll.extensions')
+
+# Tables of entry points for each group, built once per process
+_tables = None
+
+
+def get_entry_points(group):
+    """Get a table of names to entry points for the group.
+
+    Entry points are only found, not loaded,
+    so a plugin's module is imported when the plugin is first needed.
+    """
+    global _tables
+    if _tables is None:
+        _tables = _find_entry_points()
+    return _tables.get(group, {})
+
+
+def _find_entry_points():
+    """Find the entry points of every handroll group in one pass."""
+    try:
+        from importlib import metadata
+    except ImportError:  # pragma: no cover
+        return _find_entry_points_with_pkg_resources()
+
+    found = metadata.entry_points()
+    tables = {}
+    for group in GROUPS:
+        if hasattr(found, 'select'):
+            # Python 3.10 and newer select the entry points of a group.
+            entry_points = found.select(group=group)
+        else:  # pragma: no cover
+            # Python 3.8 and 3.9 group the entry points in a dictionary.
+            entry_points = found.get(group, ())
+        table = tables.setdefault(group, {})
+        for entry_point in entry_points:
+            # The first entry point with a name wins like imports do.
+            table.setdefault(entry_point.name, entry_point)
+    return tables
+
+
+def _find_entry_points_with_pkg_resources():  # pragma: no cover
+    """Find the entry points on Pythons without ``importlib.metadata``."""
+    import warnings
+    import pkg_resources
+
+    # pkg_resources emits an annoying message related to security that is
+    # completely irritating for an average user to address. Filter it out.
+    #
+    # For the record, the warning is:
+    #
+    # pkg_resources.py:991: UserWarning: ~/.python-eggs is writable by
+    # group/others and vulnerable to attack when used with
+    # get_resource_filename. Consider a more secure location (set with
+    # .set_extraction_path or the PYTHON_EGG_CACHE environment variable).
+    #
+    # handroll assumes a level of trust in whatever is placed in
+    # its entry points.
+    warnings.filterwarnings('ignore', '.*get_resource_filename.*')
+
+    tables = {}
+    for group in GROUPS:
+        table = tables.setdefault(group, {})
+        for entry_point in pkg_resources.iter_entry_points(group):
+            table.setdefault(entry_point.name, entry_point)
+    return tables
@@ -0,0 +1,242 @@
+# Copyright (c) 2017, Matt Layman
+"""The build profiler"""
+
+import cProfile
+import json
+import os
+import time
+
+from handroll import __version__, logger
+from handroll.i18n import _
+
+
+class _NullTimer(object):
+    """A timer that does nothing for when profiling is off."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+NULL_TIMER = _NullTimer()
+
+
+class _Timer(object):
+    """Time a block and hand the elapsed seconds to a callback."""
+
+    def __init__(self, callback):
+        self._callback = callback
+        self._start = None
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._callback(time.perf_counter() - self._start)
+        return False
+
+
+class BuildProfiler(object):
+    """A build profiler measures where the time of a build goes.
+
+    Time is divided into phases.
+    The ``walk`` phase finds the site files,
+    ``frontmatter`` collects the frontmatter of every source,
+    ``convert`` turns sources into content (e.g., Markdown to HTML),
+    ``render`` merges content with a template,
+    ``write`` puts output on disk,
+    and ``extensions`` runs the extension signal handlers.
+    Extension handlers that run during another phase (e.g., handlers of
+    ``frontmatter_loaded``) count toward both phases.
+
+    Timings are kept for each file, each composer, and each extension.
+    Worker processes send their timings back to the parent
+    with ``drain`` and ``merge``.
+
+    :param report_path: The file for the JSON report or ``None``
+    :param cprofile_path: The file for the ``cProfile`` statistics or ``None``
+    :param log_summary: Log a summary after each build
+    """
+
+    PHASES = (
+        'walk', 'frontmatter', 'convert', 'render', 'write', 'extensions')
+    # The number of slowest files to include in a report.
+    TOP_FILES = 25
+
+    def __init__(self, report_path=None, cprofile_path=None,
+                 log_summary=False):
+        self.report_path = report_path
+        self.cprofile_path = cprofile_path
+        self.log_summary = log_summary
+        self.enabled = bool(report_path or cprofile_path or log_summary)
+        self._cprofile = None
+        self._start = None
+        self._current_file = None
+        self._reset()
+
+    def _reset(self):
+        self._phases = dict((phase, 0.0) for phase in self.PHASES)
+        self._composers = {}
+        self._extensions = {}
+        self._files = []
+
+    def build(self):
+        """Time a whole build.
+
+        The report is written when the build finishes.
+        """
+        if not self.enabled:
+            return NULL_TIMER
+        return _BuildTimer(self)
+
+    def file(self, source_file, composer):
+        """Time the composition of a source file."""
+        if not self.enabled:
+            return NULL_TIMER
+        record = {
+            'path': source_file,
+            'composer': type(composer).__name__,
+            'seconds': 0.0,
+            'phases': {},
+        }
+        self._current_file = record
+
+        def finish(elapsed):
+            record['seconds'] = elapsed
+            self._current_file = None
+            self._add_file(record)
+        return _Timer(finish)
+
+    def phase(self, phase):
+        """Time a phase of the build."""
+        if not self.enabled:
+            return NULL_TIMER
+        record = self._current_file
+
+        def finish(elapsed):
+            self._phases[phase] += elapsed
+            if record is not None:
+                phases = record['phases']
+                phases[phase] = phases.get(phase, 0.0) + elapsed
+        return _Timer(finish)
+
+    def extension(self, extension, hook):
+        """Time an extension's handler of a signal."""
+        if not self.enabled:
+            return NULL_TIMER
+        name = type(extension).__name__
+
+        def finish(elapsed):
+            self._phases['extensions'] += elapsed
+            hooks = self._extensions.setdefault(name, {})
+            stats = hooks.setdefault(hook, {'calls': 0, 'seconds': 0.0})
+            stats['calls'] += 1
+            stats['seconds'] += elapsed
+        return _Timer(finish)
+
+    def drain(self):
+        """Remove and return the timings since the last drain."""
+        timings = {
+            'phases': self._phases,
+            'extensions': self._extensions,
+            'files': self._files,
+        }
+        self._reset()
+        return timings
+
+    def merge(self, timings):
+        """Merge timings that were drained from another profiler."""
+        for phase, seconds in timings['phases'].items():
+            self._phases[phase] += seconds
+        for record in timings['files']:
+            self._add_file(record)
+        for name, hooks in timings['extensions'].items():
+            for hook, stats in hooks.items():
+                merged = self._extensions.setdefault(name, {}).setdefault(
+                    hook, {'calls': 0, 'seconds': 0.0})
+                merged['calls'] += stats['calls']
+                merged['seconds'] += stats['seconds']
+
+    def report(self, elapsed):
+        """Make the report of the build."""
+        files = sorted(
+            self._files, key=lambda record: record['seconds'], reverse=True)
+        return {
+            'handroll': __version__,
+            'elapsed': elapsed,
+            'file_count': len(self._files),
+            'phases': self._phases,
+            'composers': self._composers,
+            'extensions': self._extensions,
+            'slowest_files': files[:self.TOP_FILES],
+        }
+
+    def _add_file(self, record):
+        self._files.append(record)
+        stats = self._composers.setdefault(
+            record['composer'], {'files': 0, 'seconds': 0.0, 'phases': {}})
+        stats['files'] += 1
+        stats['seconds'] += record['seconds']
+        for phase, seconds in record['phases'].items():
+            stats['phases'][phase] = stats['phases'].get(phase, 0.0) + seconds
+
+    def _start_build(self):
+        self._reset()
+        self._start = time.perf_counter()
+        if self.cprofile_path:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+
+    def _finish_build(self, succeeded):
+        elapsed = time.perf_counter() - self._start
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            if succeeded:
+                self._cprofile.dump_stats(self.cprofile_path)
+            self._cprofile = None
+
+        if succeeded:
+            report = self.report(elapsed)
+            if self.report_path:
+                self._write_report(report)
+            if self.log_summary:
+                self._log_summary(report)
+        self._reset()
+
+    def _write_report(self, report):
+        dirname = os.path.dirname(os.path.abspath(self.report_path))
+        if not os.path.exists(dirname):
+            os.makedirs(dirname)
+        with open(self.report_path, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        logger.info(_('Wrote the profile report to {path}.').format(
+            path=self.report_path))
+
+    def _log_summary(self, report):
+        # Use the warning level to be independent of the verbose option.
+        logger.warning(_('Built {count} files in {elapsed:.3f}s.').format(
+            count=report['file_count'], elapsed=report['elapsed']))
+        for phase in self.PHASES:
+            logger.warning('  {phase:<12} {seconds:.3f}s'.format(
+                phase=phase, seconds=report['phases'][phase]))
+        for record in report['slowest_files'][:10]:
+            logger.warning('  [{seconds:.3f}s] {path} ({composer})'.format(
+                **record))
+
+
+class _BuildTimer(object):
+    """Start and finish a build with a profiler."""
+
+    def __init__(self, profiler):
+        self._profiler = profiler
+
+    def __enter__(self):
+        self._profiler._start_build()
+        return self._profiler
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._profiler._finish_build(exc_type is None)
+        return False
@@ -20,6 +20,11 @@ class FileResolver(object):
         """Resolve the output URL of the provided source path."""
         return self.config.domain + self.as_route(source_path)
 
+    def as_output_file(self, source_path, outdir):
+        """Resolve the output file of the provided source path."""
+        path = os.path.relpath(source_path, self.site_path)
+        return os.path.join(outdir, self._convert_to_url(path))
+
     def _convert_to_url(self, path):
         """"Convert the path to a URL path by swapping the extension."""
         composer = self.composers.select_composer_for(path)
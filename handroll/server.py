@@ -1,9 +1,14 @@
 # Copyright (c) 2017, Matt Layman
 
-from http.server import SimpleHTTPRequestHandler
+import datetime
+import email.utils
+from http.server import HTTPServer, SimpleHTTPRequestHandler
 import logging
 import os
+import posixpath
+import shutil
 import socketserver
+import urllib.parse
 
 from watchdog.observers import Observer
 
@@ -11,11 +16,163 @@ from handroll import logger
 from handroll.handlers import SiteHandler
 from handroll.i18n import _
 
-# Maybe the port should be configurable later. For now, go with a static value.
 PORT = 8000
+# An empty address binds to every interface.
+BIND = ''
 
 
-def serve(site, director):
+class SiteRequestHandler(SimpleHTTPRequestHandler):
+    """Serve files from the server's output directory.
+
+    The handler speaks HTTP/1.1 so browsers can reuse a connection
+    for every asset on a page.
+    Responses include an ``ETag`` and ``Last-Modified`` header
+    so a browser that revalidates an unchanged file gets a short
+    ``304 Not Modified`` response.
+    Large files go straight from the file to the socket with ``sendfile``.
+    """
+
+    protocol_version = 'HTTP/1.1'
+    # Close idle keep-alive connections so their threads can finish.
+    timeout = 30
+    # Files at least this size (in bytes) are sent with sendfile.
+    SENDFILE_SIZE = 64 * 1024
+    INDEX_FILES = ('index.html', 'index.htm')
+
+    def do_GET(self):
+        self._serve(send_body=True)
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def translate_path(self, path):
+        """Translate a URL path to a file path in the output directory.
+
+        Unlike the standard handler, the path is not rooted
+        at the current working directory.
+        """
+        path = path.split('?', 1)[0].split('#', 1)[0]
+        trailing_slash = path.rstrip().endswith('/')
+        path = posixpath.normpath(urllib.parse.unquote(path))
+        translated = self.server.outdir
+        for word in path.split('/'):
+            # Drop any part that could escape the output directory.
+            if not word or os.path.dirname(word) or word in (
+                    os.curdir, os.pardir):
+                continue
+            translated = os.path.join(translated, word)
+        if trailing_slash:
+            translated += '/'
+        return translated
+
+    def _serve(self, send_body):
+        path = self.translate_path(self.path)
+        if os.path.isdir(path):
+            url_path = urllib.parse.urlsplit(self.path).path
+            if not url_path.endswith('/'):
+                self._redirect_to_directory()
+                return
+            for index in self.INDEX_FILES:
+                index_path = os.path.join(path, index)
+                if os.path.isfile(index_path):
+                    path = index_path
+                    break
+            else:
+                listing = self.list_directory(path)
+                if listing is not None:
+                    with listing:
+                        if send_body:
+                            self.copyfile(listing, self.wfile)
+                return
+
+        try:
+            f = open(path, 'rb')
+        except (IOError, OSError):
+            self.send_error(404, _('File not found'))
+            return
+
+        with f:
+            stat = os.fstat(f.fileno())
+            etag = '"{mtime:x}-{size:x}"'.format(
+                mtime=stat.st_mtime_ns, size=stat.st_size)
+            last_modified = self.date_time_string(stat.st_mtime)
+            if self._is_not_modified(etag, stat.st_mtime):
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.send_header('Last-Modified', last_modified)
+                self.end_headers()
+                return
+
+            self.send_response(200)
+            self.send_header('Content-Type', self.guess_type(path))
+            self.send_header('Content-Length', str(stat.st_size))
+            self.send_header('ETag', etag)
+            self.send_header('Last-Modified', last_modified)
+            # The site changes while developing so always revalidate.
+            self.send_header('Cache-Control', 'no-cache')
+            self.end_headers()
+            if send_body:
+                self._send_file(f, stat.st_size)
+
+    def _redirect_to_directory(self):
+        """Redirect to the directory URL with a trailing slash
+        like the standard handler does."""
+        parts = urllib.parse.urlsplit(self.path)
+        location = urllib.parse.urlunsplit(
+            (parts[0], parts[1], parts[2] + '/', parts[3], parts[4]))
+        self.send_response(301)
+        self.send_header('Location', location)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def _is_not_modified(self, etag, mtime):
+        """Check the conditional request headers against the file."""
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match is not None:
+            # The ETag takes precedence over the modified time.
+            tags = [tag.strip() for tag in if_none_match.split(',')]
+            return '*' in tags or etag in tags or 'W/' + etag in tags
+
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if if_modified_since is None:
+            return False
+        try:
+            since = email.utils.parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError, IndexError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=datetime.timezone.utc)
+        # HTTP dates have a resolution of one second.
+        return int(mtime) <= since.timestamp()
+
+    def _send_file(self, f, size):
+        """Send the file body to the client."""
+        sendfile = getattr(self.connection, 'sendfile', None)
+        if size >= self.SENDFILE_SIZE and sendfile is not None:
+            # The socket falls back to regular sends
+            # when the platform has no zero-copy support.
+            sendfile(f)
+        else:
+            shutil.copyfileobj(f, self.wfile)
+
+
+class DevelopmentServer(socketserver.ThreadingMixIn, HTTPServer):
+    """A web server that handles each connection in its own thread
+    and serves the files in an output directory.
+
+    :param address: The host and port pair to bind to
+    :param outdir: The directory to serve
+    """
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, address, outdir):
+        self.outdir = outdir
+        HTTPServer.__init__(self, address, SiteRequestHandler)
+
+
+def serve(site, director, port=PORT, bind=BIND):
     """Run a simple web server that serve the output directory and watches for
     changes to the site. When something is changed, it should be generated.
     """
@@ -25,25 +182,25 @@ def serve(site, director):
 
     # Start the watchdog.
     event_handler = SiteHandler(director)
+    event_handler.queue.start()
     observer = Observer()
     observer.schedule(event_handler, site.path, recursive=True)
     observer.start()
 
-    # The simple HTTP server is pretty dumb and does not even take a path to
-    # serve. The only way to serve the right path is to change the directory.
     outdir = director.outdir
-    os.chdir(outdir)
-
-    socketserver.TCPServer.allow_reuse_address = True
-    httpd = socketserver.TCPServer(('', PORT), SimpleHTTPRequestHandler)
+    httpd = DevelopmentServer((bind, port), outdir)
 
     logger.info(
-        _('Serving {outdir} at http://localhost:{port}/.'
-          '\nPress Ctrl-C to quit.').format(outdir=outdir, port=PORT))
+        _('Serving {outdir} at http://{host}:{port}/.'
+          '\nPress Ctrl-C to quit.').format(
+              outdir=outdir, host=bind or 'localhost', port=port))
     try:
         httpd.serve_forever()
     except KeyboardInterrupt:
         logger.info(_('\nBye.'))
         observer.stop()
+    finally:
+        httpd.server_close()
 
     observer.join()
+    event_handler.queue.stop()
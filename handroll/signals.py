@@ -6,3 +6,4 @@ from blinker import signal
 frontmatter_loaded = signal('frontmatter_loaded')
 pre_composition = signal('pre_composition')
 post_composition = signal('post_composition')
+source_removed = signal('source_removed')
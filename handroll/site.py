@@ -3,6 +3,11 @@
 
 import os
 
+try:
+    from os import scandir
+except ImportError:  # pragma: no cover
+    scandir = None
+
 from handroll import template
 from handroll.exceptions import AbortError
 from handroll.i18n import _
@@ -15,6 +20,7 @@ class Site(object):
     is a valid handroll site.
     """
 
+    CACHE = '.handroll'
     CONFIG = 'handroll.conf'
     OUTPUT = 'output'
 
@@ -30,6 +36,9 @@ class Site(object):
         # Make sure that the path is absolute.
         if os.path.isdir(self.path):
             self.path = os.path.abspath(self.path)
+        # Paths in the site that are not site source (e.g., a configured
+        # output or cache directory)
+        self._excluded = set()
 
     @classmethod
     def build(cls, args):
@@ -44,6 +53,11 @@ class Site(object):
     def config_file(self):
         return os.path.join(self.path, self.CONFIG)
 
+    @property
+    def cache_root(self):
+        """The default cache directory"""
+        return os.path.join(self.path, self.CACHE)
+
     @property
     def output_root(self):
         """The default output root directory"""
@@ -56,23 +70,100 @@ class Site(object):
 
         return True, ''
 
+    def exclude(self, path):
+        """Exclude a file or directory from the site source."""
+        self._excluded.add(os.path.abspath(path))
+
+    def is_excluded(self, path):
+        """Check if the path is excluded from the site source."""
+        return os.path.abspath(path) in self._excluded
+
     def walk(self):
         """Walk the site source, skipping items that should be skipped."""
         for dirpath, dirnames, filenames in os.walk(self.path):
-            # Prevent work on the output or templates directory.
-            # Skip the template.
-            if dirpath == self.path:
-                if self.OUTPUT in dirnames:
-                    dirnames.remove(self.OUTPUT)
-                if template.TEMPLATES_DIR in dirnames:
-                    dirnames.remove(template.TEMPLATES_DIR)
-                if template.DEFAULT_TEMPLATE in filenames:
-                    filenames.remove(template.DEFAULT_TEMPLATE)
-
-            self._prune_skip_directories(dirnames)
-
+            self._prune(dirpath, dirnames, filenames)
             yield dirpath, dirnames, filenames
 
+    def scan(self):
+        """Scan the site source into an inventory.
+
+        The scan has the same directories and files as ``walk``,
+        but it also keeps the stat result of every file.
+        A build uses the inventory for every phase
+        so the site is only listed and stat'd once.
+        This matters most when the site is on a slow (e.g., network) disk.
+        """
+        inventory = SiteInventory()
+        pending = [self.path]
+        while pending:
+            dirpath = pending.pop()
+            dirnames, filenames, links = self._scan_directory(
+                dirpath, inventory.stats)
+            self._prune(dirpath, dirnames, filenames)
+            inventory.add(dirpath, dirnames, filenames)
+            # Like ``os.walk``, do not follow links to directories.
+            # The stack is filled in reverse to go through them in order.
+            for dirname in reversed(dirnames):
+                if dirname not in links:
+                    pending.append(os.path.join(dirpath, dirname))
+        return inventory
+
+    def _scan_directory(self, dirpath, stats):
+        """List a directory and stat its files into the stats.
+
+        Return the directory names, file names,
+        and the names of directories that are links.
+        """
+        dirnames = []
+        filenames = []
+        links = set()
+        try:
+            entries = list(_list_entries(dirpath))
+        except OSError:
+            # Like ``os.walk``, skip what cannot be listed.
+            return dirnames, filenames, links
+
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            if is_dir:
+                dirnames.append(entry.name)
+                if entry.is_symlink():
+                    links.add(entry.name)
+                continue
+
+            filenames.append(entry.name)
+            try:
+                stats[entry.path] = entry.stat()
+            except OSError:
+                # A broken link has nothing to stat.
+                pass
+        return dirnames, filenames, links
+
+    def _prune(self, dirpath, dirnames, filenames):
+        """Prune the directories and files that a build should not visit."""
+        # Prevent work on the output, cache, or templates directory.
+        # Skip the template.
+        if dirpath == self.path:
+            if self.OUTPUT in dirnames:
+                dirnames.remove(self.OUTPUT)
+            if self.CACHE in dirnames:
+                dirnames.remove(self.CACHE)
+            if template.TEMPLATES_DIR in dirnames:
+                dirnames.remove(template.TEMPLATES_DIR)
+            if template.DEFAULT_TEMPLATE in filenames:
+                filenames.remove(template.DEFAULT_TEMPLATE)
+
+        if self._excluded:
+            for names in (dirnames, filenames):
+                names[:] = [
+                    name for name in names
+                    if os.path.join(dirpath, name) not in self._excluded]
+
+        self._prune_skip_directories(dirnames)
+
     def _prune_skip_directories(self, dirnames):
         """Prune out any directories that should be skipped from the provided
         list of directories.
@@ -112,3 +203,53 @@ class Site(object):
             return True
 
         return False
+
+
+class SiteInventory(object):
+    """A site inventory is the result of scanning a site source.
+
+    It has every directory with its directory and file names
+    in the order that ``Site.walk`` would go through them,
+    and the stat result of every file by path.
+    """
+
+    def __init__(self):
+        self.stats = {}
+        self._directories = []
+
+    def add(self, dirpath, dirnames, filenames):
+        """Add a directory and its directory and file names."""
+        self._directories.append((dirpath, dirnames, filenames))
+
+    def walk(self):
+        """Walk the inventory like ``Site.walk`` walks the site."""
+        for dirpath, dirnames, filenames in self._directories:
+            yield dirpath, list(dirnames), list(filenames)
+
+    def stat(self, path):
+        """Get the stat result of a file from the scan or ``None``."""
+        return self.stats.get(path)
+
+
+class _Entry(object):
+    """A directory entry for Pythons without ``os.scandir``"""
+
+    def __init__(self, dirpath, name):
+        self.name = name
+        self.path = os.path.join(dirpath, name)
+
+    def is_dir(self):
+        return os.path.isdir(self.path)
+
+    def is_symlink(self):
+        return os.path.islink(self.path)
+
+    def stat(self):
+        return os.stat(self.path)
+
+
+def _list_entries(dirpath):
+    """List the entries of a directory."""
+    if scandir is not None:
+        return scandir(dirpath)
+    return [_Entry(dirpath, name) for name in os.listdir(dirpath)]
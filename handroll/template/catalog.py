@@ -2,11 +2,14 @@
 """The catalog of available templates"""
 
 import os
+import re
 import string
 
 from handroll.exceptions import AbortError
 from handroll.i18n import _
-from handroll.template.j2 import JinjaTemplateBuilder
+from handroll.manifest import hash_bytes
+
+ASSET_PLACEHOLDER = re.compile(r'\$\{asset:([^}]+)\}')
 
 
 class Template(object):
@@ -20,44 +23,77 @@ class Template(object):
         """Get the the last modified time of the source of the template."""
         raise NotImplementedError
 
+    @property
+    def digest(self):
+        """Get a hash of the template source and anything it depends on."""
+        raise NotImplementedError
+
+    @property
+    def dependencies(self):
+        """Get the paths of the template and any template it depends on."""
+        raise NotImplementedError
+
 
 class StringTemplate(Template):
     """This template class is a thin wrapper around ``string.Template`` to
-    conform to the standard handroll template API."""
+    conform to the standard handroll template API.
+
+    A placeholder like ``${asset:css/site.css}``
+    is replaced with the asset's URL.
+    """
 
     def __init__(self, template_path):
+        self._template_path = template_path
         self._last_modified = os.path.getmtime(template_path)
 
         with open(template_path, 'r') as t:
-            self._template = string.Template(t.read())
+            source = t.read()
+            self._template = string.Template(source)
+        self._digest = hash_bytes(source.encode('utf-8'))
+        self._has_assets = ASSET_PLACEHOLDER.search(source) is not None
 
     def render(self, context):
-        return self._template.safe_substitute(context)
+        template = self._template
+        lookup = context.get('asset')
+        if self._has_assets and lookup is not None:
+            template = string.Template(ASSET_PLACEHOLDER.sub(
+                lambda match: lookup(match.group(1).strip()),
+                template.template))
+        return template.safe_substitute(context)
 
     @property
     def last_modified(self):
         return self._last_modified
 
+    @property
+    def digest(self):
+        return self._digest
+
+    @property
+    def dependencies(self):
+        return [self._template_path]
+
 
 class TemplateCatalog(object):
 
     DEFAULT_TEMPLATE = 'template.html'
     TEMPLATES_DIR = 'templates'
 
-    def __init__(self, site_path, builders=None):
+    def __init__(self, site_path, builders=None, bytecode_cache_path=None):
         self.site_path = site_path
+        self.bytecode_cache_path = bytecode_cache_path
         self._default_template_path = os.path.join(site_path,
                                                    self.DEFAULT_TEMPLATE)
         self._default = None
         self.templates_path = os.path.join(site_path, self.TEMPLATES_DIR)
         self._templates = {}
         self._builders = builders
+        self._jinja_builder = None
         if builders is None:
             # Set default builders.
-            self._jinja_builder = JinjaTemplateBuilder(self.templates_path)
             self._builders = {
                 '.html': StringTemplate,
-                '.j2': self._jinja_builder.build
+                '.j2': self._build_jinja_template,
             }
 
     @property
@@ -81,6 +117,34 @@ class TemplateCatalog(object):
         self._templates[template_name] = template
         return template
 
+    def reset(self):
+        """Forget all built templates so that changed templates are rebuilt.
+        """
+        self._default = None
+        self._templates = {}
+        if self._jinja_builder is not None:
+            self._jinja_builder.reset()
+
+    def build_jinja_page(self, source, source_path):
+        """Build a Jinja template from the source of a page (e.g., a ``.j2``
+        file) with the same environment as the site's Jinja templates."""
+        return self._get_jinja_builder().build_page(source, source_path)
+
+    def _build_jinja_template(self, template_path):
+        """Build a Jinja template."""
+        return self._get_jinja_builder().build(template_path)
+
+    def _get_jinja_builder(self):
+        """Get the Jinja template builder.
+
+        Jinja is only imported for sites that use Jinja templates.
+        """
+        if self._jinja_builder is None:
+            from handroll.template.j2 import JinjaTemplateBuilder
+            self._jinja_builder = JinjaTemplateBuilder(
+                self.templates_path, self.bytecode_cache_path)
+        return self._jinja_builder
+
     def _abort_if_missing(self, template_path):
         if not os.path.exists(template_path):
             raise AbortError(_('No template found at {template_path}.').format(
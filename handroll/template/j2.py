@@ -7,16 +7,34 @@ from jinja2 import meta
 
 from handroll.exceptions import AbortError
 from handroll.i18n import _
+from handroll.manifest import hash_bytes
 
 
 class JinjaTemplateBuilder(object):
+    """Build Jinja templates from one environment.
 
-    def __init__(self, templates_path):
+    The environment is shared by the site templates and the ``.j2`` pages
+    so a page can extend or include a site template
+    that is only compiled once.
+    When there is a bytecode cache path, compiled templates are stored there
+    so later builds skip compiling templates that did not change.
+    """
+
+    def __init__(self, templates_path, bytecode_cache_path=None):
         self.templates_path = templates_path
         loader = jinja2.FileSystemLoader(templates_path)
+        bytecode_cache = None
+        if bytecode_cache_path is not None:
+            if not os.path.exists(bytecode_cache_path):
+                os.makedirs(bytecode_cache_path)
+            bytecode_cache = jinja2.FileSystemBytecodeCache(
+                bytecode_cache_path)
         self._env = jinja2.Environment(
-            loader=loader, trim_blocks=True, auto_reload=False)
+            loader=loader, trim_blocks=True, auto_reload=False,
+            bytecode_cache=bytecode_cache)
         self._templates_modified_times = {}
+        self._templates_digests = {}
+        self._templates_references = {}
 
     def build(self, template_path):
         """Build a Jinja template from the file path."""
@@ -27,12 +45,80 @@ class JinjaTemplateBuilder(object):
             template = self._env.get_template(template_name)
             template.last_modified = self._get_last_modified(template_name,
                                                              template_path)
+            template.digest = self._get_digest(template_name, template_path)
+            template.dependencies = [
+                os.path.join(self.templates_path, name)
+                for name in self._get_chain(template_name, template_path)]
             return template
         except jinja2.exceptions.TemplateSyntaxError as e:
             raise AbortError(
                 _('An error exists in the Jinja template at {template}:'
                   ' {error}').format(template=template_path, error=str(e)))
 
+    def build_page(self, source, source_path):
+        """Build a Jinja template from the source of a page.
+
+        The page's digest and dependencies cover the site templates
+        that the page extends or includes.
+        """
+        try:
+            template = self._load_page(source, source_path)
+            references = self._find_references(source, None, source_path)
+        except jinja2.exceptions.TemplateSyntaxError as e:
+            raise AbortError(
+                _('An error exists in the Jinja template at {template}:'
+                  ' {error}').format(template=source_path, error=str(e)))
+
+        for name in references:
+            template_path = os.path.join(self.templates_path, name)
+            if not os.path.exists(template_path):
+                raise AbortError(
+                    _('No template found at {template_path}.').format(
+                        template_path=template_path))
+
+        digests = [self._get_digest(name) for name in references]
+        template.digest = hash_bytes(' '.join(digests).encode('utf-8'))
+        chain = set()
+        for name in references:
+            chain.update(self._get_chain(name))
+        template.dependencies = [
+            os.path.join(self.templates_path, name) for name in chain]
+        return template
+
+    def _load_page(self, source, source_path):
+        """Load a page's template through the bytecode cache
+        the way a Jinja loader does."""
+        bytecode_cache = self._env.bytecode_cache
+        if bytecode_cache is None:
+            return self._env.from_string(source)
+
+        bucket = bytecode_cache.get_bucket(
+            self._env, source_path, source_path, source)
+        if bucket.code is None:
+            bucket.code = self._env.compile(source, None, source_path)
+            bytecode_cache.set_bucket(bucket)
+        return self._env.template_class.from_code(
+            self._env, bucket.code, self._env.make_globals(None), None)
+
+    def reset(self):
+        """Forget every template so that changes are picked up."""
+        self._env.cache.clear()
+        self._templates_modified_times = {}
+        self._templates_digests = {}
+        self._templates_references = {}
+
+    def _get_chain(self, template_name, template_path=None):
+        """Get the names of the template and every template that it extends
+        or includes, directly or indirectly.
+        """
+        if template_path is None:
+            template_path = os.path.join(self.templates_path, template_name)
+
+        chain = set([template_name])
+        for parent in self._get_references(template_name, template_path):
+            chain.update(self._get_chain(parent))
+        return chain
+
     def _get_last_modified(self, template_name, template_path=None):
         """Get the last modified time of the template.
 
@@ -49,15 +135,7 @@ class JinjaTemplateBuilder(object):
         last_modified = os.path.getmtime(template_path)
 
         # Check for any parents and then check their modified times.
-        with open(template_path, 'r') as f:
-            source = f.read()
-        ast = self._env.parse(source, template_name, template_path)
-        templates = meta.find_referenced_templates(ast)
-        for parent in templates:
-            if parent is None:
-                # Nothing helpful can be done with None, but it may show up.
-                continue
-
+        for parent in self._get_references(template_name, template_path):
             parent_last_modified = self._get_last_modified(parent)
             if parent_last_modified > last_modified:
                 # The template should look at least as recent as its parent.
@@ -65,3 +143,46 @@ class JinjaTemplateBuilder(object):
 
         self._templates_modified_times[template_name] = last_modified
         return last_modified
+
+    def _get_digest(self, template_name, template_path=None):
+        """Get a digest of the template.
+
+        Like the last modified time, the digest covers the inheritance chain
+        so that a change to any parent changes the digest.
+        """
+        if template_name in self._templates_digests:
+            return self._templates_digests[template_name]
+
+        if template_path is None:
+            template_path = os.path.join(self.templates_path, template_name)
+
+        with open(template_path, 'rb') as f:
+            digests = [hash_bytes(f.read())]
+        for parent in self._get_references(template_name, template_path):
+            digests.append(self._get_digest(parent))
+
+        digest = hash_bytes(' '.join(digests).encode('utf-8'))
+        self._templates_digests[template_name] = digest
+        return digest
+
+    def _get_references(self, template_name, template_path):
+        """Get the names of templates that the template extends or includes.
+        """
+        if template_name in self._templates_references:
+            return self._templates_references[template_name]
+
+        with open(template_path, 'r') as f:
+            source = f.read()
+        references = self._find_references(
+            source, template_name, template_path)
+
+        self._templates_references[template_name] = references
+        return references
+
+    def _find_references(self, source, name, path):
+        """Find the names of templates that the source refers to."""
+        ast = self._env.parse(source, name, path)
+        # Nothing helpful can be done with None, but it may show up.
+        return sorted(
+            template for template in meta.find_referenced_templates(ast)
+            if template is not None)
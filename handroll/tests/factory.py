@@ -6,7 +6,7 @@ import tempfile
 
 from handroll.configuration import Configuration
 from handroll.director import Director
-from handroll.extensions.blog import BlogPost
+from handroll.extensions.blog import BlogPost, PostIndex
 from handroll.site import Site
 
 
@@ -21,7 +21,7 @@ class Factory(object):
             'title': 'A Blog Post',
             'route': '/a_source_file.html',
             'url': 'http://www.example.com/a_source_file.html',
-            'posts': {},
+            'posts': PostIndex(),
         }
         parameters.update(kwargs)
         return BlogPost(**parameters)
@@ -0,0 +1,168 @@
+# Copyright (c) 2017, Matt Layman
+
+import errno
+import json
+import os
+import stat
+import tempfile
+
+import mock
+
+from handroll.assets import (
+    AssetLookup, AssetManifest, copy_file, put_asset)
+from handroll.exceptions import AbortError
+from handroll.tests import TestCase
+
+
+class TestPutAsset(TestCase):
+
+    def setUp(self):
+        self.source_file = os.path.join(tempfile.mkdtemp(), 'photo.png')
+        with open(self.source_file, 'wb') as f:
+            f.write(b'pixels')
+        self.destination = os.path.join(tempfile.mkdtemp(), 'photo.png')
+
+    def _read(self, path):
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def test_copies(self):
+        os.chmod(self.source_file, 0o640)
+
+        put_asset(self.source_file, self.destination)
+
+        self.assertEqual(b'pixels', self._read(self.destination))
+        self.assertFalse(os.path.samefile(self.source_file, self.destination))
+        self.assertEqual(
+            0o640, stat.S_IMODE(os.stat(self.destination).st_mode))
+
+    def test_hardlinks(self):
+        put_asset(self.source_file, self.destination, 'hardlink')
+        self.assertTrue(os.path.samefile(self.source_file, self.destination))
+
+    @mock.patch('handroll.assets.os.link')
+    def test_hardlink_falls_back_to_copy(self, link):
+        link.side_effect = OSError(errno.EXDEV, 'Cross-device link')
+
+        put_asset(self.source_file, self.destination, 'hardlink')
+
+        self.assertEqual(b'pixels', self._read(self.destination))
+
+    def test_symlinks(self):
+        put_asset(self.source_file, self.destination, 'symlink')
+
+        self.assertTrue(os.path.islink(self.destination))
+        self.assertEqual(b'pixels', self._read(self.destination))
+
+    def test_replaces_link_without_changing_source(self):
+        put_asset(self.source_file, self.destination, 'hardlink')
+        changed = os.path.join(os.path.dirname(self.source_file), 'new.png')
+        with open(changed, 'wb') as f:
+            f.write(b'new pixels')
+
+        put_asset(changed, self.destination)
+
+        self.assertEqual(b'pixels', self._read(self.source_file))
+        self.assertEqual(b'new pixels', self._read(self.destination))
+
+
+class TestCopyFile(TestCase):
+
+    def setUp(self):
+        self.source_file = os.path.join(tempfile.mkdtemp(), 'video.mp4')
+        with open(self.source_file, 'wb') as f:
+            f.write(os.urandom(100000))
+        self.destination = os.path.join(tempfile.mkdtemp(), 'video.mp4')
+
+    def _assert_copied(self):
+        with open(self.source_file, 'rb') as source:
+            with open(self.destination, 'rb') as destination:
+                self.assertEqual(source.read(), destination.read())
+
+    @mock.patch('handroll.assets.fcntl')
+    def test_copies_without_reflink(self, fcntl):
+        fcntl.ioctl.side_effect = OSError(errno.EOPNOTSUPP, 'No reflink')
+        copy_file(self.source_file, self.destination)
+        self._assert_copied()
+
+    @mock.patch('handroll.assets.fcntl', None)
+    @mock.patch('handroll.assets.os.copy_file_range', create=True)
+    def test_copies_without_kernel_copy(self, copy_file_range):
+        copy_file_range.side_effect = OSError(errno.ENOSYS, 'No copy')
+        copy_file(self.source_file, self.destination)
+        self._assert_copied()
+
+
+class TestAssetManifest(TestCase):
+
+    def test_fingerprints_name(self):
+        assets = AssetManifest()
+        assets.add('/site/css/site.css', 'css/site.css', 'abcdef0123456789')
+        self.assertEqual('/css/site.abcdef01.css', assets.url('css/site.css'))
+        self.assertEqual('/css/site.abcdef01.css', assets.url('/css/site.css'))
+
+    def test_add_reports_change(self):
+        assets = AssetManifest()
+        self.assertTrue(assets.add('/site/app.js', 'app.js', 'aaaaaaaaaa'))
+        self.assertFalse(assets.add('/site/app.js', 'app.js', 'aaaaaaaaaa'))
+        self.assertTrue(assets.add('/site/app.js', 'app.js', 'bbbbbbbbbb'))
+        self.assertEqual('/app.bbbbbbbb.js', assets.url('app.js'))
+
+    def test_unknown_asset_aborts(self):
+        assets = AssetManifest()
+        with self.assertRaises(AbortError):
+            assets.url('missing.css')
+
+    def test_is_asset_name(self):
+        assets = AssetManifest()
+        self.assertTrue(assets.is_asset_name('css/site.CSS'))
+        self.assertFalse(assets.is_asset_name('robots.txt'))
+
+    def test_get_filename(self):
+        assets = AssetManifest()
+        assets.add('/site/css/site.scss', 'css/site.css', '1234567890')
+        self.assertEqual(
+            'site.12345678.css',
+            assets.get_filename('/site/css/site.scss', 'site.css'))
+        self.assertEqual(
+            'robots.txt',
+            assets.get_filename('/site/robots.txt', 'robots.txt'))
+
+    def test_remove(self):
+        assets = AssetManifest()
+        assets.add('/site/app.js', 'app.js', '1234567890')
+
+        assets.remove('/site/app.js')
+        assets.remove('/site/missing.js')
+
+        self.assertFalse(assets.has_source('/site/app.js'))
+        self.assertIsNone(assets.get_source('app.js'))
+        self.assertEqual({}, json.loads(assets.to_json()))
+
+    def test_to_json(self):
+        assets = AssetManifest()
+        assets.add('/site/app.js', 'app.js', '1234567890')
+        self.assertEqual(
+            {'app.js': 'app.12345678.js'}, json.loads(assets.to_json()))
+
+
+class TestAssetLookup(TestCase):
+
+    def test_remembers_used_sources(self):
+        assets = AssetManifest()
+        assets.add('/site/app.js', 'app.js', '1234567890')
+        lookup = AssetLookup(assets)
+
+        url = lookup('app.js')
+
+        self.assertEqual('/app.12345678.js', url)
+        self.assertEqual(set(['/site/app.js']), lookup.used)
+
+    def test_usual_name_without_fingerprints(self):
+        lookup = AssetLookup(None)
+
+        url = lookup('css/site.css')
+
+        self.assertEqual('/css/site.css', lookup('/css/site.css'))
+        self.assertEqual('/css/site.css', url)
+        self.assertEqual(set(), lookup.used)
@@ -8,7 +8,7 @@ import mock
 from handroll import signals
 from handroll.exceptions import AbortError
 from handroll.extensions.blog import (
-    BlogExtension, BlogBuilder, FeedBuilder, ListPageBuilder)
+    BlogExtension, BlogBuilder, FeedBuilder, ListPageBuilder, PostIndex)
 from handroll.resolver import FileResolver
 from handroll.tests import TestCase
 
@@ -21,6 +21,7 @@ class TestBlogExtension(TestCase):
         signals.frontmatter_loaded.receivers.clear()
         signals.pre_composition.receivers.clear()
         signals.post_composition.receivers.clear()
+        signals.source_removed.receivers.clear()
 
     def _add_blog_section(self, parser, exclude=None):
         parser.add_section('blog')
@@ -66,6 +67,30 @@ class TestBlogExtension(TestCase):
         extension = BlogExtension(None)
         self.assertTrue(extension.handle_post_composition)
 
+    def test_handles_source_removed(self):
+        extension = BlogExtension(None)
+        self.assertTrue(extension.handle_source_removed)
+
+    def test_removes_post_of_removed_source(self):
+        extension = self._make_preprocessed_one()
+        frontmatter = self._make_blog_post_frontmatter()
+        extension.on_frontmatter_loaded('thundercats.md', frontmatter)
+        extension._should_generate = False
+
+        extension.on_source_removed('thundercats.md')
+
+        self.assertNotIn('thundercats.md', extension.posts)
+        self.assertEqual([], extension.posts.by_date())
+        self.assertTrue(extension._should_generate)
+
+    def test_ignores_removed_source_without_post(self):
+        extension = self._make_preprocessed_one()
+        extension._should_generate = False
+
+        extension.on_source_removed('thundercats.md')
+
+        self.assertFalse(extension._should_generate)
+
     def test_registers_blog_post(self):
         extension = self._make_preprocessed_one()
         frontmatter = self._make_blog_post_frontmatter()
@@ -230,6 +255,125 @@ class TestBlogExtension(TestCase):
         self.assertEqual(current, posts[0])
         self.assertEqual(older, posts[1])
 
+    def _make_feed_extension(self, options, dates):
+        """Make an extension with feed options and posts on the dates."""
+        director = self.factory.make_director()
+        os.mkdir(director.outdir)
+        self._add_blog_section(director.config.parser, 'list_template')
+        for option, value in options.items():
+            director.config.parser.set('blog', option, value)
+        extension = BlogExtension(director.config)
+        extension.on_pre_composition(director)
+        for number, date in enumerate(dates):
+            source_file = 'post{0}.md'.format(number)
+            extension.posts[source_file] = self.factory.make_blog_post(
+                date=date, source_file=source_file, posts=extension.posts,
+                url='http://www.example.com/post{0}.html'.format(number))
+        return director, extension
+
+    def _read(self, director, output):
+        with open(os.path.join(director.outdir, output), 'r') as f:
+            return f.read()
+
+    def _make_dates(self, count):
+        start = datetime.datetime(2017, 1, 1)
+        return [start + datetime.timedelta(days=day) for day in range(count)]
+
+    def test_feed_limit(self):
+        director = self.factory.make_director()
+        self._add_blog_section(director.config.parser)
+        director.config.parser.set('blog', 'feed_limit', '2')
+        extension = BlogExtension(director.config)
+        extension.on_pre_composition(director)
+        self.assertEqual(2, extension.feed_limit)
+
+    def test_invalid_feed_limit_aborts(self):
+        director = self.factory.make_director()
+        self._add_blog_section(director.config.parser)
+        director.config.parser.set('blog', 'feed_limit', 'many')
+        extension = BlogExtension(director.config)
+        with self.assertRaises(AbortError):
+            extension.on_pre_composition(director)
+
+    def test_archive_requires_feed_limit(self):
+        director = self.factory.make_director()
+        self._add_blog_section(director.config.parser)
+        director.config.parser.set(
+            'blog', 'feed_archive_output', 'archive{number}.xml')
+        extension = BlogExtension(director.config)
+        with self.assertRaises(AbortError):
+            extension.on_pre_composition(director)
+
+    def test_archive_requires_number(self):
+        director = self.factory.make_director()
+        self._add_blog_section(director.config.parser)
+        director.config.parser.set('blog', 'feed_limit', '2')
+        director.config.parser.set(
+            'blog', 'feed_archive_output', 'archive.xml')
+        extension = BlogExtension(director.config)
+        with self.assertRaises(AbortError):
+            extension.on_pre_composition(director)
+
+    def test_feed_has_newest_posts(self):
+        director, extension = self._make_feed_extension(
+            {'feed_limit': '2'}, self._make_dates(3))
+
+        extension.on_post_composition(director)
+
+        feed = self._read(director, 'feed.xml')
+        self.assertNotIn('post0.html', feed)
+        self.assertIn('post1.html', feed)
+        self.assertIn('post2.html', feed)
+        self.assertLess(feed.index('post2.html'), feed.index('post1.html'))
+
+    def test_archive_feeds(self):
+        director, extension = self._make_feed_extension({
+            'feed_limit': '2',
+            'feed_archive_output': 'archive/feed{number}.xml',
+        }, self._make_dates(5))
+
+        extension.on_post_composition(director)
+
+        feed = self._read(director, 'feed.xml')
+        self.assertIn(
+            'rel="prev-archive" href="http://www.example.com/archive/'
+            'feed2.xml"', feed)
+        first = self._read(director, os.path.join('archive', 'feed1.xml'))
+        self.assertIn('<fh:archive />', first)
+        self.assertIn('post0.html', first)
+        self.assertIn('post1.html', first)
+        self.assertIn(
+            'rel="current" href="http://www.example.com/feed.xml"', first)
+        self.assertIn(
+            'rel="next-archive" href="http://www.example.com/archive/'
+            'feed2.xml"', first)
+        self.assertNotIn('prev-archive', first)
+        second = self._read(director, os.path.join('archive', 'feed2.xml'))
+        self.assertIn('post2.html', second)
+        self.assertNotIn('post3.html', second)
+        self.assertIn(
+            'rel="prev-archive" href="http://www.example.com/archive/'
+            'feed1.xml"', second)
+        self.assertNotIn('next-archive', second)
+
+    def test_only_changed_feeds_are_written(self):
+        director, extension = self._make_feed_extension({
+            'feed_limit': '2',
+            'feed_archive_output': 'archive/feed{number}.xml',
+        }, self._make_dates(5))
+        extension.on_post_composition(director)
+        newest = extension.posts['post4.md']
+        extension.posts['post4.md'] = self.factory.make_blog_post(
+            date=newest.date, source_file='post4.md', posts=extension.posts,
+            title='A New Title')
+        extension._should_generate = True
+
+        with mock.patch.object(FeedBuilder, 'write_to') as write_to:
+            extension.on_post_composition(director)
+
+        write_to.assert_called_once_with(
+            os.path.join(director.outdir, 'feed.xml'), director.writer)
+
     def test_list_template_not_required(self):
         director = self.factory.make_director()
         self._add_blog_section(director.config.parser, exclude='list_template')
@@ -266,7 +410,7 @@ class TestBlogExtension(TestCase):
         extension = self._make_preprocessed_one(director=director)
         extension.on_post_composition(director)
         expected_output = os.path.join(director.outdir, 'archive.html')
-        write_to.assert_called_once_with(expected_output)
+        write_to.assert_called_once_with(expected_output, director.writer)
 
     @mock.patch.object(ListPageBuilder, 'write_to')
     def test_skip_list_page_building_when_no_template_exists(self, write_to):
@@ -449,7 +593,7 @@ class TestBlogPost(TestCase):
         self.assertIn(post.source_file, repr(post))
 
     def test_previous(self):
-        posts = {}
+        posts = PostIndex()
         post = self.factory.make_blog_post(posts=posts)
         older_date = post.date - datetime.timedelta(days=1)
         older_post = self.factory.make_blog_post(
@@ -459,13 +603,13 @@ class TestBlogPost(TestCase):
         self.assertEqual(older_post, post.previous)
 
     def test_no_previous(self):
-        posts = {}
+        posts = PostIndex()
         post = self.factory.make_blog_post(posts=posts)
         posts[post.source_file] = post
         self.assertIsNone(post.previous)
 
     def test_next(self):
-        posts = {}
+        posts = PostIndex()
         post = self.factory.make_blog_post(posts=posts)
         older_date = post.date - datetime.timedelta(days=1)
         older_post = self.factory.make_blog_post(
@@ -475,7 +619,93 @@ class TestBlogPost(TestCase):
         self.assertEqual(post, older_post.next)
 
     def test_no_next(self):
-        posts = {}
+        posts = PostIndex()
         post = self.factory.make_blog_post(posts=posts)
         posts[post.source_file] = post
         self.assertIsNone(post.next)
+
+    def test_equal_with_other_posts(self):
+        post = self.factory.make_blog_post(posts=PostIndex())
+        same = self.factory.make_blog_post(date=post.date)
+        self.assertEqual(post, same)
+
+    def test_not_equal_with_other_field(self):
+        post = self.factory.make_blog_post()
+        other = self.factory.make_blog_post(date=post.date, title='Other')
+        self.assertNotEqual(post, other)
+
+    def test_not_equal_to_none(self):
+        post = self.factory.make_blog_post()
+        self.assertNotEqual(post, None)
+
+    def test_has_no_instance_dictionary(self):
+        post = self.factory.make_blog_post()
+        self.assertFalse(hasattr(post, '__dict__'))
+
+
+class TestPostIndex(TestCase):
+
+    def _add_post(self, posts, source_file, days):
+        date = datetime.datetime(2017, 1, 1) + datetime.timedelta(days=days)
+        post = self.factory.make_blog_post(
+            date=date, source_file=source_file, posts=posts)
+        posts[source_file] = post
+        return post
+
+    def test_keeps_posts_by_date(self):
+        posts = PostIndex()
+        middle = self._add_post(posts, 'middle.md', 1)
+        latest = self._add_post(posts, 'latest.md', 2)
+        earliest = self._add_post(posts, 'earliest.md', 0)
+
+        self.assertEqual([earliest, middle, latest], posts.by_date())
+        self.assertEqual(
+            [latest, middle, earliest], posts.by_date(reverse=True))
+
+    def test_update_moves_post(self):
+        posts = PostIndex()
+        first = self._add_post(posts, 'first.md', 0)
+        second = self._add_post(posts, 'second.md', 1)
+
+        first = self._add_post(posts, 'first.md', 2)
+
+        self.assertEqual(2, len(posts))
+        self.assertEqual([second, first], posts.by_date())
+        self.assertEqual(first, second.next)
+        self.assertIsNone(first.next)
+
+    def test_delete(self):
+        posts = PostIndex()
+        first = self._add_post(posts, 'first.md', 0)
+        self._add_post(posts, 'second.md', 1)
+
+        del posts['second.md']
+
+        self.assertEqual([first], posts.by_date())
+        self.assertNotIn('second.md', posts)
+
+    def test_same_date_ordered_by_source_file(self):
+        posts = PostIndex()
+        b_post = self._add_post(posts, 'b.md', 0)
+        a_post = self._add_post(posts, 'a.md', 0)
+
+        self.assertEqual(b_post, a_post.next)
+        self.assertEqual(a_post, b_post.previous)
+
+    def test_is_mapping(self):
+        posts = PostIndex()
+        post = self._add_post(posts, 'post.md', 0)
+
+        self.assertEqual(post, posts.get('post.md'))
+        self.assertIsNone(posts.get('missing.md'))
+        self.assertEqual(['post.md'], list(posts))
+
+    def test_latest(self):
+        posts = PostIndex()
+        first = self._add_post(posts, 'first.md', 0)
+        second = self._add_post(posts, 'second.md', 1)
+        third = self._add_post(posts, 'third.md', 2)
+
+        self.assertEqual([third, second], posts.latest(2))
+        self.assertEqual([third, second, first], posts.latest(5))
+        self.assertEqual([], posts.latest(0))
@@ -0,0 +1,73 @@
+# Copyright (c) 2017, Matt Layman
+
+import os
+import tempfile
+
+from handroll.cache import ContentCache
+from handroll.tests import TestCase
+
+
+class TestContentCache(TestCase):
+
+    def _make_one(self, max_size=1024):
+        path = os.path.join(tempfile.mkdtemp(), 'content')
+        return ContentCache(path, max_size)
+
+    def test_make_key_separates_parts(self):
+        cache = self._make_one()
+        self.assertNotEqual(
+            cache.make_key('ab', 'c'), cache.make_key('a', 'bc'))
+
+    def test_gets_stored_content(self):
+        cache = self._make_one()
+        key = cache.make_key('source')
+
+        cache.set(key, 'ØMQ content')
+
+        self.assertEqual('ØMQ content', cache.get(key))
+
+    def test_missing_content(self):
+        cache = self._make_one()
+        self.assertIsNone(cache.get(cache.make_key('source')))
+
+    def test_prunes_least_recently_used(self):
+        cache = self._make_one(max_size=10)
+        old_key = cache.make_key('old')
+        cache.set(old_key, 'x' * 6)
+        entry = cache._get_entry_path(old_key)
+        past = os.path.getmtime(entry) - 100
+        os.utime(entry, (past, past))
+        new_key = cache.make_key('new')
+        cache.set(new_key, 'y' * 6)
+
+        cache.prune()
+
+        self.assertIsNone(cache.get(old_key))
+        self.assertEqual('y' * 6, cache.get(new_key))
+
+    def test_hit_refreshes_entry(self):
+        cache = self._make_one(max_size=10)
+        used_key = cache.make_key('used')
+        cache.set(used_key, 'x' * 6)
+        entry = cache._get_entry_path(used_key)
+        past = os.path.getmtime(entry) - 100
+        os.utime(entry, (past, past))
+        unused_key = cache.make_key('unused')
+        cache.set(unused_key, 'y' * 6)
+        entry = cache._get_entry_path(unused_key)
+        os.utime(entry, (past + 1, past + 1))
+
+        cache.get(used_key)
+        cache.prune()
+
+        self.assertIsNone(cache.get(unused_key))
+        self.assertEqual('x' * 6, cache.get(used_key))
+
+    def test_prune_keeps_cache_within_size(self):
+        cache = self._make_one()
+        key = cache.make_key('source')
+        cache.set(key, 'content')
+
+        cache.prune()
+
+        self.assertEqual('content', cache.get(key))
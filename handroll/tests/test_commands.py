@@ -68,7 +68,9 @@ class TestBuildCommand(TestCase):
     @mock.patch('handroll.commands.build.finish')
     def test_complete_build(self, finish):
         site = self.factory.make_site()
-        args = mock.Mock(site=site.path, outdir='.')
+        args = mock.Mock(
+            site=site.path, outdir='.', jobs=None, timing=False,
+            profile=None, cprofile=None)
         command = BuildCommand()
         command.run(args)
         self.assertTrue(finish.called)
@@ -94,13 +96,43 @@ class TestWatchCommand(TestCase):
         outdir_call = (('outdir',), {'nargs': '?', 'help': mock.ANY})
         self.assertIn(outdir_call, parser.add_argument.call_args_list)
 
+    def test_register_port(self):
+        parser = mock.Mock()
+        subparsers = mock.Mock()
+        subparsers.add_parser.return_value = parser
+        command = WatchCommand()
+        command.register(subparsers)
+        port_call = (('-p', '--port'), {
+            'type': int, 'default': 8000, 'help': mock.ANY})
+        self.assertIn(port_call, parser.add_argument.call_args_list)
+
+    def test_defaults_match_server(self):
+        from handroll import server
+        from handroll.commands import watch
+        self.assertEqual(server.PORT, watch.PORT)
+        self.assertEqual(server.BIND, watch.BIND)
+
+    def test_register_bind(self):
+        parser = mock.Mock()
+        subparsers = mock.Mock()
+        subparsers.add_parser.return_value = parser
+        command = WatchCommand()
+        command.register(subparsers)
+        bind_call = (('-b', '--bind'), {
+            'default': '', 'metavar': 'ADDRESS', 'help': mock.ANY})
+        self.assertIn(bind_call, parser.add_argument.call_args_list)
+
     @mock.patch('handroll.commands.watch.serve')
     def test_complete_watch(self, serve):
         site = self.factory.make_site()
-        args = mock.Mock(site=site.path, outdir='.')
+        args = mock.Mock(
+            site=site.path, outdir='.', jobs=None, timing=False,
+            profile=None, cprofile=None, port=8080,
+            bind='127.0.0.1')
         command = WatchCommand()
         command.run(args)
-        self.assertTrue(serve.called)
+        serve.assert_called_once_with(
+            mock.ANY, mock.ANY, port=8080, bind='127.0.0.1')
 
 
 class TestScaffoldCommand(TestCase):
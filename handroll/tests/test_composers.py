@@ -7,6 +7,8 @@ import tempfile
 
 import mock
 
+from handroll.assets import AssetManifest
+from handroll.cache import ContentCache
 from handroll.composers import Composer
 from handroll.composers import Composers
 from handroll.composers import CopyComposer
@@ -18,10 +20,20 @@ from handroll.composers.md import MarkdownComposer
 from handroll.composers.rst import ReStructuredTextComposer
 from handroll.composers.sass import SassComposer
 from handroll.composers.txt import TextileComposer
+from handroll.documents import DocumentStore
 from handroll.exceptions import AbortError
+from handroll.frontmatter import FrontmatterIndex
+from handroll.manifest import BuildManifest
+from handroll.output import ADDED, UNCHANGED, OutputWriter
+from handroll.template.catalog import TemplateCatalog
 from handroll.tests import TestCase
 
 
+def make_manifest(site, outdir):
+    path = os.path.join(tempfile.mkdtemp(), 'manifest.json')
+    return BuildManifest(path, site, outdir)
+
+
 class TestComposer(TestCase):
 
     def _make_one(self):
@@ -65,6 +77,19 @@ class TestComposers(TestCase):
         composers = Composers(config)
         self.assertEqual(config, composers._config)
 
+    def test_frontmatter_composers_share_documents(self):
+        composers = self._make_one()
+        composer = composers.select_composer_for('sample.md')
+        self.assertEqual(composers.documents, composer.documents)
+
+    def test_composers_share_manifest(self):
+        config = self.factory.make_configuration()
+        manifest = mock.Mock()
+        composers = Composers(config, manifest)
+        composer = composers.select_composer_for('sample.md')
+        self.assertEqual(manifest, composer.manifest)
+        self.assertEqual(manifest, composers.default_composer.manifest)
+
     def test_get_output_extension(self):
         composers = self._make_one()
         extension = composers.get_output_extension('sample.md')
@@ -128,6 +153,21 @@ class TestAtomComposer(TestCase):
         composer = self._make_one()
         self.assertFalse(composer.permit_frontmatter)
 
+    @mock.patch('handroll.composers.atom.json')
+    def test_manifest_skips_current_feed(self, json):
+        composer = self._make_one()
+        composer.manifest = make_manifest(
+            os.path.dirname(self.source_file), self.outdir)
+        open(self.output_file, 'w').close()
+        composer.manifest.record(
+            self.output_file, composer._fingerprint(self.source_file))
+        future = os.path.getmtime(self.output_file) + 10
+        os.utime(self.source_file, (future, future))
+
+        composer.compose(None, self.source_file, self.outdir)
+
+        self.assertFalse(json.loads.called)
+
     @mock.patch('handroll.composers.atom.json')
     def test_forces_update(self, json):
         json.loads.return_value = {
@@ -154,8 +194,8 @@ class TestCopyComposer(TestCase):
         config = self.factory.make_configuration()
         return CopyComposer(config)
 
-    @mock.patch('handroll.composers.shutil')
-    def test_skips_same_files(self, shutil):
+    @mock.patch('handroll.composers.put_asset')
+    def test_skips_same_files(self, put_asset):
         marker = 'marker.txt'
         source = tempfile.mkdtemp()
         source_file = os.path.join(source, marker)
@@ -164,10 +204,11 @@ class TestCopyComposer(TestCase):
         open(os.path.join(outdir, marker), 'w').close()
         composer = self._make_one()
         composer.compose(None, source_file, outdir)
-        self.assertFalse(shutil.copy.called)
+        composer.flush()
+        self.assertFalse(put_asset.called)
 
-    @mock.patch('handroll.composers.shutil')
-    def test_copies_when_content_differs(self, shutil):
+    @mock.patch('handroll.composers.put_asset')
+    def test_copies_when_content_differs(self, put_asset):
         marker = 'marker.txt'
         source = tempfile.mkdtemp()
         source_file = os.path.join(source, marker)
@@ -177,7 +218,26 @@ class TestCopyComposer(TestCase):
             f.write('something different')
         composer = self._make_one()
         composer.compose(None, source_file, outdir)
-        self.assertTrue(shutil.copy.called)
+        composer.flush()
+        self.assertTrue(put_asset.called)
+
+    @mock.patch('handroll.composers.put_asset')
+    def test_copies_fingerprinted_asset(self, put_asset):
+        source_file = os.path.join(tempfile.mkdtemp(), 'app.js')
+        outdir = tempfile.mkdtemp()
+        open(source_file, 'w').close()
+        composer = self._make_one()
+        composer.assets = AssetManifest()
+        composer.assets.add(source_file, 'app.js', '1234567890')
+
+        composer.compose(None, source_file, outdir)
+        composer.flush()
+
+        self.assertEqual([
+            mock.call(source_file, os.path.join(outdir, 'app.js'), 'copy'),
+            mock.call(
+                source_file, os.path.join(outdir, 'app.12345678.js'), 'copy'),
+        ], put_asset.call_args_list)
 
     def test_output_extension(self):
         """The copy composer takes the extension of the source file."""
@@ -188,8 +248,8 @@ class TestCopyComposer(TestCase):
         composer = self._make_one()
         self.assertFalse(composer.permit_frontmatter)
 
-    @mock.patch('handroll.composers.shutil')
-    def test_copies_when_forced(self, shutil):
+    @mock.patch('handroll.composers.put_asset')
+    def test_copies_when_forced(self, put_asset):
         marker = 'marker.txt'
         source = tempfile.mkdtemp()
         source_file = os.path.join(source, marker)
@@ -199,7 +259,106 @@ class TestCopyComposer(TestCase):
         composer = self._make_one()
         composer._config.force = True
         composer.compose(None, source_file, outdir)
-        self.assertTrue(shutil.copy.called)
+        composer.flush()
+        self.assertTrue(put_asset.called)
+
+    @mock.patch('handroll.composers.put_asset')
+    def test_manifest_skips_copy_without_reading(self, put_asset):
+        marker = 'marker.txt'
+        source = tempfile.mkdtemp()
+        source_file = os.path.join(source, marker)
+        outdir = tempfile.mkdtemp()
+        open(source_file, 'w').close()
+        with open(os.path.join(outdir, marker), 'w') as f:
+            f.write('something different')
+        composer = self._make_one()
+        composer.manifest = make_manifest(source, outdir)
+        composer.manifest.record(
+            os.path.join(outdir, marker),
+            composer._fingerprint(source_file))
+
+        with mock.patch('handroll.composers.filecmp') as filecmp:
+            composer.compose(None, source_file, outdir)
+        composer.flush()
+
+        self.assertFalse(filecmp.cmp.called)
+        self.assertFalse(put_asset.called)
+
+    @mock.patch('handroll.composers.put_asset')
+    def test_manifest_adopts_identical_copy(self, put_asset):
+        marker = 'marker.txt'
+        source = tempfile.mkdtemp()
+        source_file = os.path.join(source, marker)
+        outdir = tempfile.mkdtemp()
+        destination = os.path.join(outdir, marker)
+        open(source_file, 'w').close()
+        open(destination, 'w').close()
+        composer = self._make_one()
+        composer.manifest = make_manifest(source, outdir)
+
+        composer.compose(None, source_file, outdir)
+        composer.flush()
+
+        self.assertFalse(put_asset.called)
+        self.assertTrue(composer.manifest.has_record(destination))
+
+    def test_manifest_records_copy(self):
+        marker = 'marker.txt'
+        source = tempfile.mkdtemp()
+        source_file = os.path.join(source, marker)
+        outdir = tempfile.mkdtemp()
+        open(source_file, 'w').close()
+        composer = self._make_one()
+        composer.manifest = make_manifest(source, outdir)
+
+        composer.compose(None, source_file, outdir)
+        composer.flush()
+
+        fingerprint = composer._fingerprint(source_file)
+        self.assertTrue(composer.manifest.is_current(
+            os.path.join(outdir, marker), fingerprint))
+
+    def test_copies_files_in_bulk(self):
+        source = tempfile.mkdtemp()
+        outdir = tempfile.mkdtemp()
+        composer = self._make_one()
+        for number in range(20):
+            source_file = os.path.join(source, '{0}.txt'.format(number))
+            with open(source_file, 'w') as f:
+                f.write(str(number))
+            composer.compose(None, source_file, outdir)
+        self.assertEqual([], os.listdir(outdir))
+
+        composer.flush()
+
+        self.assertEqual(20, len(os.listdir(outdir)))
+        with open(os.path.join(outdir, '7.txt'), 'r') as f:
+            self.assertEqual('7', f.read())
+
+    @mock.patch('handroll.composers.put_asset')
+    def test_copies_when_copy_mode_changes(self, put_asset):
+        marker = 'marker.txt'
+        source = tempfile.mkdtemp()
+        source_file = os.path.join(source, marker)
+        outdir = tempfile.mkdtemp()
+        destination = os.path.join(outdir, marker)
+        open(source_file, 'w').close()
+        open(destination, 'w').close()
+        composer = self._make_one()
+        composer.manifest = make_manifest(source, outdir)
+        composer.manifest.record(
+            destination, composer._fingerprint(source_file))
+        composer._config.copy_mode = 'hardlink'
+
+        composer.compose(None, source_file, outdir)
+        composer.flush()
+
+        put_asset.assert_called_once_with(
+            source_file, destination, 'hardlink')
+
+    def test_is_batched(self):
+        composer = self._make_one()
+        self.assertTrue(composer.batched)
 
 
 class TestGenericHTMLComposer(TestCase):
@@ -218,6 +377,14 @@ class TestGenericHTMLComposer(TestCase):
         with self.assertRaises(NotImplementedError):
             composer.compose(catalog, source_file, outdir)
 
+    def test_does_not_cache_without_converter_signature(self):
+        composer = self._make_one()
+        composer.content_cache = mock.Mock()
+        with mock.patch.object(composer, '_generate_content') as generate:
+            generate.return_value = 'content'
+            composer._convert('source')
+        self.assertFalse(composer.content_cache.get.called)
+
     def test_selects_default_template(self):
         catalog = mock.MagicMock()
         default = mock.PropertyMock()
@@ -255,6 +422,97 @@ class TestGenericHTMLComposer(TestCase):
         self.assertFalse(
             composer._needs_update(template, source_file, output_file))
 
+    def test_needs_update_with_fingerprint(self):
+        site = tempfile.mkdtemp()
+        output_file = os.path.join(site, 'output.html')
+        open(output_file, 'w').close()
+        source_file = os.path.join(site, 'test.md')
+        open(source_file, 'w').close()
+        composer = self._make_one()
+        composer.manifest = make_manifest(site, site)
+        template = mock.MagicMock(digest='template_digest')
+        fingerprint = composer._fingerprint(source_file, template=template)
+        self.assertTrue(composer._needs_update(
+            template, source_file, output_file, fingerprint))
+
+        composer.manifest.record(output_file, fingerprint)
+        # Modified times no longer matter.
+        future = os.path.getmtime(output_file) + 10
+        os.utime(source_file, (future, future))
+        template.last_modified = future
+
+        self.assertFalse(composer._needs_update(
+            template, source_file, output_file, fingerprint))
+
+    def _compose_page(self, composer, catalog, source_file, outdir):
+        with mock.patch.object(
+                composer, '_generate_content', return_value='content'):
+            composer.compose(catalog, source_file, outdir)
+
+    def test_skips_current_output_without_reading_source(self):
+        site = tempfile.mkdtemp()
+        outdir = tempfile.mkdtemp()
+        with open(os.path.join(site, 'template.html'), 'w') as f:
+            f.write('$content')
+        source_file = os.path.join(site, 'page.generic')
+        with open(source_file, 'w') as f:
+            f.write('A Title\nThe content')
+        catalog = TemplateCatalog(site)
+        composer = self._make_one()
+        composer.manifest = make_manifest(site, outdir)
+        self._compose_page(composer, catalog, source_file, outdir)
+
+        with mock.patch.object(composer, 'get_data') as get_data:
+            self._compose_page(composer, catalog, source_file, outdir)
+
+        self.assertFalse(get_data.called)
+
+    def test_reads_changed_source(self):
+        site = tempfile.mkdtemp()
+        outdir = tempfile.mkdtemp()
+        with open(os.path.join(site, 'template.html'), 'w') as f:
+            f.write('$content')
+        source_file = os.path.join(site, 'page.generic')
+        with open(source_file, 'w') as f:
+            f.write('A Title\nThe content')
+        catalog = TemplateCatalog(site)
+        composer = self._make_one()
+        composer.manifest = make_manifest(site, outdir)
+        self._compose_page(composer, catalog, source_file, outdir)
+        with open(source_file, 'w') as f:
+            f.write('A New Title\nThe content')
+
+        with mock.patch.object(
+                composer, 'get_data',
+                wraps=composer.get_data) as get_data:
+            self._compose_page(composer, catalog, source_file, outdir)
+
+        self.assertTrue(get_data.called)
+
+    def test_reads_source_after_converter_changes(self):
+        site = tempfile.mkdtemp()
+        outdir = tempfile.mkdtemp()
+        with open(os.path.join(site, 'template.html'), 'w') as f:
+            f.write('$content')
+        source_file = os.path.join(site, 'page.generic')
+        with open(source_file, 'w') as f:
+            f.write('A Title\nThe content')
+        catalog = TemplateCatalog(site)
+        composer = self._make_one()
+        composer.manifest = make_manifest(site, outdir)
+        with mock.patch.object(
+                composer, '_get_converter_signature', return_value='old'):
+            self._compose_page(composer, catalog, source_file, outdir)
+
+        with mock.patch.object(
+                composer, '_get_converter_signature', return_value='new'):
+            with mock.patch.object(
+                    composer, 'get_data',
+                    wraps=composer.get_data) as get_data:
+                self._compose_page(composer, catalog, source_file, outdir)
+
+        self.assertTrue(get_data.called)
+
     def test_output_extension(self):
         composer = self._make_one()
         self.assertEqual('.html', composer.get_output_extension('source.rst'))
@@ -309,6 +567,98 @@ class TestMarkdownComposer(TestCase):
         composer.compose(catalog, source_file, outdir)
         self.assertFalse(template.render.called)
 
+    def test_composes_records_fingerprint(self):
+        site = tempfile.mkdtemp()
+        source_file = os.path.join(site, 'test.md')
+        with open(source_file, 'w') as f:
+            f.write('A Title\nThe content')
+        outdir = tempfile.mkdtemp()
+        template = mock.MagicMock(digest='template_digest')
+        template.render.return_value = 'rendered'
+        catalog = mock.MagicMock()
+        catalog.default = template
+        composer = self._make_one()
+        composer.manifest = make_manifest(site, outdir)
+
+        composer.compose(catalog, source_file, outdir)
+        composer.compose(catalog, source_file, outdir)
+
+        self.assertEqual(1, template.render.call_count)
+
+    def test_generates_content_from_cache(self):
+        composer = self._make_one()
+        composer.content_cache = ContentCache(tempfile.mkdtemp(), 1024)
+        html = composer._convert('**bold**')
+
+        with mock.patch.object(composer, '_generate_content') as generate:
+            cached_html = composer._convert('**bold**')
+
+        self.assertFalse(generate.called)
+        self.assertEqual(html, cached_html)
+
+    def test_cache_key_includes_extensions(self):
+        composer = self._make_one()
+        cache = ContentCache(tempfile.mkdtemp(), 1024)
+        composer.content_cache = cache
+        composer._convert('**bold**')
+        other_composer = self._make_one()
+        other_composer.content_cache = cache
+        other_composer._config.parser.add_section('markdown')
+        other_composer._config.parser.set(
+            'markdown', 'extensions', 'smarty')
+
+        with mock.patch.object(
+                other_composer, '_generate_content') as generate:
+            generate.return_value = 'content'
+            other_composer._convert('**bold**')
+
+        self.assertTrue(generate.called)
+
+    def test_reuses_converter(self):
+        composer = self._make_one()
+        converter = composer._get_markdown()
+
+        composer._generate_content('**bold**')
+
+        self.assertIs(converter, composer._get_markdown())
+
+    def test_resets_converter_between_documents(self):
+        composer = self._make_one()
+        composer._config.parser.add_section('markdown')
+        composer._config.parser.set('markdown', 'extensions', 'footnotes')
+        composer._generate_content('A note[^1]\n\n[^1]: The note')
+
+        html = composer._generate_content('No notes')
+
+        self.assertEqual('<p>No notes</p>', html)
+
+    def test_default_extensions(self):
+        composer = self._make_one()
+        self.assertEqual(MarkdownComposer.EXTENSIONS, composer.extensions)
+        self.assertEqual({}, composer.extension_configs)
+
+    def test_configured_extensions(self):
+        composer = self._make_one()
+        parser = composer._config.parser
+        parser.add_section('markdown')
+        parser.set('markdown', 'extensions', 'toc,\n  smarty')
+        parser.add_section('markdown.toc')
+        parser.set('markdown.toc', 'permalink', 'true')
+
+        self.assertEqual(['toc', 'smarty'], composer.extensions)
+        self.assertEqual(
+            {'toc': {'permalink': 'true'}}, composer.extension_configs)
+        html = composer._generate_content('# Heading')
+        self.assertIn('class="headerlink"', html)
+
+    def test_aborts_on_unknown_extension(self):
+        composer = self._make_one()
+        composer._config.parser.add_section('markdown')
+        composer._config.parser.set('markdown', 'extensions', 'nonexistent')
+
+        with self.assertRaises(AbortError):
+            composer._generate_content('**bold**')
+
     def test_uses_smartypants(self):
         source = '"quoted"'
         composer = self._make_one()
@@ -332,6 +682,7 @@ class TestReStructuredTextComposer(TestCase):
         self.assertEqual(expected, html)
 
 
+@mock.patch('handroll.composers.sass.libsass', None)
 class TestSassComposer(TestCase):
 
     def _make_fake_sass_bin(self):
@@ -343,50 +694,215 @@ class TestSassComposer(TestCase):
         os.chmod(fake_sass, st.st_mode | stat.S_IEXEC)
         return fake_bin
 
+    def _make_one(self):
+        config = self.factory.make_configuration()
+        return SassComposer(config, self._make_fake_sass_bin())
+
+    def _write(self, path, content):
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
     def test_abort_with_no_sass(self):
         """Test that handroll aborts if ``sass`` is not installed."""
+        config = self.factory.make_configuration()
         # The fake bin directory has no sass executable.
         fake_bin = tempfile.mkdtemp()
         with self.assertRaises(AbortError):
-            SassComposer(fake_bin)
+            SassComposer(config, fake_bin)
 
     def test_create(self):
-        fake_bin = self._make_fake_sass_bin()
-        composer = SassComposer(fake_bin)
+        composer = self._make_one()
         self.assertTrue(isinstance(composer, SassComposer))
 
     def test_build_command(self):
-        fake_bin = self._make_fake_sass_bin()
-        composer = SassComposer(fake_bin)
-        source_file = '/in/sassy.scss'
-        output_file = '/out/sass.css'
+        composer = self._make_one()
+        stylesheets = [
+            ('/in/sassy.scss', '/out/sassy.css'),
+            ('/in/more.sass', '/out/more.css'),
+        ]
         expected = [
-            os.path.join(fake_bin, 'sass'), '--style', 'compressed',
-            source_file, output_file]
-        actual = composer.build_command(source_file, output_file)
+            composer.sass, '--style', 'compressed', '--no-source-map',
+            '/in/sassy.scss:/out/sassy.css', '/in/more.sass:/out/more.css']
+        actual = composer.build_command(stylesheets)
         self.assertEqual(expected, actual)
 
+    @mock.patch('handroll.composers.sass.subprocess')
+    def test_compiles_stylesheets_with_one_sass_run(self, subprocess):
+        composer = self._make_one()
+        source = tempfile.mkdtemp()
+        first = self._write(os.path.join(source, 'first.scss'), '')
+        second = self._write(os.path.join(source, 'second.scss'), '')
+        subprocess.Popen.return_value.communicate.return_value = ('', '')
+        subprocess.Popen.return_value.returncode = 0
+
+        composer.compose(None, first, '/out')
+        composer.compose(None, second, '/out')
+        self.assertFalse(subprocess.Popen.called)
+        composer.flush()
+
+        self.assertEqual(1, subprocess.Popen.call_count)
+        command = subprocess.Popen.call_args[0][0]
+        self.assertIn(first + ':/out/first.css', command)
+        self.assertIn(second + ':/out/second.css', command)
+
     @mock.patch('handroll.composers.sass.subprocess')
     def test_failed_sass_aborts(self, subprocess):
-        fake_bin = self._make_fake_sass_bin()
-        composer = SassComposer(fake_bin)
-        source_file = '/in/sassy.scss'
-        output_dir = '/out'
-        subprocess.Popen.return_value.communicate.return_value = ('boom', '')
+        composer = self._make_one()
+        source_file = self._write(
+            os.path.join(tempfile.mkdtemp(), 'sassy.scss'), '')
+        subprocess.Popen.return_value.communicate.return_value = ('', 'boom')
         subprocess.Popen.return_value.returncode = 1
+        composer.compose(None, source_file, '/out')
         with self.assertRaises(AbortError):
-            composer.compose(None, source_file, output_dir)
+            composer.flush()
+
+    @mock.patch('handroll.composers.sass.subprocess')
+    def test_flush_with_nothing_queued(self, subprocess):
+        composer = self._make_one()
+        composer.flush()
+        self.assertFalse(subprocess.Popen.called)
+
+    @mock.patch('handroll.composers.sass.subprocess')
+    def test_skips_partials(self, subprocess):
+        composer = self._make_one()
+        partial = self._write(
+            os.path.join(tempfile.mkdtemp(), '_colors.scss'), '')
+
+        composer.compose(None, partial, '/out')
+        composer.flush()
+
+        self.assertFalse(subprocess.Popen.called)
+
+    def test_asset_digest_includes_imports(self):
+        composer = self._make_one()
+        source = tempfile.mkdtemp()
+        composer.manifest = make_manifest(source, tempfile.mkdtemp())
+        partial = self._write(
+            os.path.join(source, '_colors.scss'), '$red: #f00;')
+        source_file = self._write(
+            os.path.join(source, 'site.scss'), '@import "colors";')
+        digest = composer.get_asset_digest(source_file)
+        self._write(partial, '$red: #ee0000;')
+
+        self.assertNotEqual(digest, composer.get_asset_digest(source_file))
+        self.assertIsNone(composer.get_asset_digest(partial))
+
+    def test_compiles_in_process_with_libsass(self):
+        config = self.factory.make_configuration()
+        source_file = self._write(
+            os.path.join(tempfile.mkdtemp(), 'sassy.scss'), '')
+        outdir = tempfile.mkdtemp()
+        libsass = mock.Mock()
+        libsass.compile.return_value = 'a{color:red}'
+        with mock.patch('handroll.composers.sass.libsass', libsass):
+            # No sass executable is needed.
+            composer = SassComposer(config, tempfile.mkdtemp())
+            composer.compose(None, source_file, outdir)
+            composer.flush()
+
+        libsass.compile.assert_called_once_with(
+            filename=source_file, output_style='compressed')
+        with open(os.path.join(outdir, 'sassy.css'), 'r') as f:
+            self.assertEqual('a{color:red}', f.read())
+
+    def test_in_process_leaves_same_css_alone(self):
+        config = self.factory.make_configuration()
+        source_file = self._write(
+            os.path.join(tempfile.mkdtemp(), 'sassy.scss'), '')
+        outdir = tempfile.mkdtemp()
+        output_file = os.path.join(outdir, 'sassy.css')
+        libsass = mock.Mock()
+        libsass.compile.return_value = 'a{color:red}'
+        with mock.patch('handroll.composers.sass.libsass', libsass):
+            composer = SassComposer(config, tempfile.mkdtemp())
+            composer.writer = OutputWriter()
+            composer.compose(None, source_file, outdir)
+            composer.flush()
+            self.assertEqual({output_file: ADDED}, composer.writer.drain()[
+                'changes'])
+            past = os.path.getmtime(output_file) - 10
+            os.utime(output_file, (past, past))
+
+            composer.compose(None, source_file, outdir)
+            composer.flush()
+
+        counts = composer.writer.drain()
+        self.assertEqual({output_file: UNCHANGED}, counts['changes'])
+        self.assertEqual(1, counts['unchanged'])
+        self.assertEqual(past, os.path.getmtime(output_file))
+
+    def test_finds_imports(self):
+        composer = self._make_one()
+        source = tempfile.mkdtemp()
+        os.mkdir(os.path.join(source, 'theme'))
+        main = self._write(os.path.join(source, 'main.scss'), inspect.cleandoc(
+            """@use "sass:math";
+            @import 'colors', "theme/fonts";
+            @import "print.css";
+            @import url(http://example.com/reset.css);
+            """))
+        colors = self._write(
+            os.path.join(source, '_colors.scss'), '@use "theme/base";')
+        fonts = self._write(os.path.join(source, 'theme', '_fonts.scss'), '')
+        base = self._write(os.path.join(source, 'theme', '_base.scss'), '')
+        self._write(os.path.join(source, 'theme', '_index.scss'), '')
+
+        imports = composer.find_imports(main)
+
+        self.assertEqual(sorted([base, colors, fonts]), imports)
+
+    def test_finds_unquoted_imports_in_indented_syntax(self):
+        composer = self._make_one()
+        source = tempfile.mkdtemp()
+        main = self._write(
+            os.path.join(source, 'main.sass'), '@import colors\n')
+        colors = self._write(os.path.join(source, '_colors.sass'), '')
+
+        self.assertEqual([colors], composer.find_imports(main))
+
+    @mock.patch('handroll.composers.sass.subprocess')
+    def test_recompiles_when_a_partial_changes(self, subprocess):
+        composer = self._make_one()
+        source = tempfile.mkdtemp()
+        outdir = tempfile.mkdtemp()
+        composer.manifest = make_manifest(source, outdir)
+        main = self._write(
+            os.path.join(source, 'main.scss'), '@import "colors";')
+        partial = self._write(os.path.join(source, '_colors.scss'), '')
+        other = self._write(os.path.join(source, 'other.scss'), '')
+        subprocess.Popen.return_value.communicate.return_value = ('', '')
+        subprocess.Popen.return_value.returncode = 0
+        for source_file in (main, other):
+            composer.compose(None, source_file, outdir)
+            self._write(os.path.join(
+                outdir, os.path.basename(source_file)[:-5] + '.css'), '')
+        composer.flush()
+        self._write(partial, 'a { color: red; }')
+
+        for source_file in (main, other):
+            composer.compose(None, source_file, outdir)
+        composer.flush()
+
+        command = subprocess.Popen.call_args[0][0]
+        self.assertIn(main + ':' + os.path.join(outdir, 'main.css'), command)
+        self.assertNotIn(
+            other + ':' + os.path.join(outdir, 'other.css'), command)
+        self.assertEqual(
+            [main], composer.manifest.get_dependents(partial))
 
     def test_output_extension(self):
-        fake_bin = self._make_fake_sass_bin()
-        composer = SassComposer(fake_bin)
+        composer = self._make_one()
         self.assertEqual('.css', composer.get_output_extension('source.sass'))
 
     def test_permit_frontmatter(self):
-        fake_bin = self._make_fake_sass_bin()
-        composer = SassComposer(fake_bin)
+        composer = self._make_one()
         self.assertFalse(composer.permit_frontmatter)
 
+    def test_is_batched(self):
+        composer = self._make_one()
+        self.assertTrue(composer.batched)
+
 
 class TestTextileComposer(TestCase):
 
@@ -470,6 +986,169 @@ class TestFrontmatterComposerMixin(TestCase):
         with self.assertRaises(AbortError):
             mixin.get_data(f.name)
 
+    def test_gets_json_frontmatter(self):
+        source = inspect.cleandoc("""---
+        {"title": "A Fake Title", "tags": ["a", "b"]}
+        ---
+        The Content
+        """)
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            f.write(source.encode('utf-8'))
+        mixin = FrontmatterComposerMixin()
+        with mock.patch('handroll.composers.mixins.yaml') as yaml:
+            data, source = mixin.get_data(f.name)
+        self.assertFalse(yaml.load.called)
+        self.assertEqual(
+            {'title': 'A Fake Title', 'tags': ['a', 'b']}, data)
+        self.assertEqual('The Content', source)
+
+    def test_gets_yaml_flow_mapping_frontmatter(self):
+        source = inspect.cleandoc("""---
+        {title: A Fake Title}
+        ---
+        The Content
+        """)
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            f.write(source.encode('utf-8'))
+        mixin = FrontmatterComposerMixin()
+        data, source = mixin.get_data(f.name)
+        self.assertEqual({'title': 'A Fake Title'}, data)
+
+    def test_unsafe_yaml_aborts(self):
+        source = inspect.cleandoc("""---
+        title: !!python/object/apply:os.getcwd []
+        ---
+        The Content
+        """)
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            f.write(source.encode('utf-8'))
+        mixin = FrontmatterComposerMixin()
+        with self.assertRaises(AbortError):
+            mixin.get_data(f.name)
+
+    def test_non_mapping_frontmatter_aborts(self):
+        source = inspect.cleandoc("""---
+        - A list
+        ---
+        The Content
+        """)
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            f.write(source.encode('utf-8'))
+        mixin = FrontmatterComposerMixin()
+        with self.assertRaises(AbortError):
+            mixin.get_data(f.name)
+
+    def test_empty_frontmatter(self):
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            f.write(b'---\n---\nThe Content')
+        mixin = FrontmatterComposerMixin()
+        data, source = mixin.get_data(f.name)
+        self.assertEqual({}, data)
+        self.assertEqual('The Content', source)
+
+    def test_reuses_stored_document(self):
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            f.write(b'A Title\nThe Content')
+        mixin = FrontmatterComposerMixin()
+        mixin.documents = DocumentStore()
+        mixin.get_data(f.name)
+        os.remove(f.name)
+
+        data, source = mixin.get_data(f.name)
+
+        self.assertEqual('A Title', data['title'])
+        self.assertEqual('The Content', source)
+
+    def _write_source(self, content):
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            f.write(content)
+        return f.name
+
+    def test_header_matches_whole_document(self):
+        sources = [
+            b'A Title\nThe Content',
+            b'---\ntitle: A Title\n---\nThe Content\n---\nMore',
+            b'%YAML 1.1\n---\ntitle: A Title\n---\nThe Content',
+            b'---\n{"title": "A Title"}\n---\nThe Content',
+            b'---\ntitle: Ends on the line---\nThe Content',
+        ]
+        mixin = FrontmatterComposerMixin()
+        for content in sources:
+            source_file = self._write_source(content)
+            document = mixin.read_document(source_file)
+
+            header = mixin.read_document_header(source_file)
+
+            self.assertEqual(document.first_line, header.first_line)
+            self.assertEqual(document.frontmatter, header.frontmatter)
+            self.assertEqual(document.body, header.body)
+
+    def test_header_stops_at_frontmatter(self):
+        # The end of the body is not UTF-8 so reading it would fail.
+        source_file = self._write_source(
+            b'---\ntitle: A Title\n---\n' + b'a' * 100000 + b'\xff\xfe')
+        mixin = FrontmatterComposerMixin()
+
+        document = mixin.read_document_header(source_file)
+
+        self.assertEqual({'title': 'A Title'}, document.frontmatter)
+        with self.assertRaises(UnicodeDecodeError):
+            document.body
+
+    def test_header_missing_marker(self):
+        source_file = self._write_source(b'---\ntitle: A Title\n')
+        mixin = FrontmatterComposerMixin()
+        with self.assertRaises(AbortError):
+            mixin.read_document_header(source_file)
+
+    def _make_indexed_mixin(self):
+        mixin = FrontmatterComposerMixin()
+        mixin.documents = DocumentStore()
+        site = tempfile.mkdtemp()
+        mixin.frontmatter_index = FrontmatterIndex(
+            os.path.join(tempfile.mkdtemp(), 'frontmatter.sqlite'), site)
+        source_file = os.path.join(site, 'post.md')
+        with open(source_file, 'w') as f:
+            f.write('---\ntitle: A Title\n---\nThe Content')
+        return mixin, source_file
+
+    @mock.patch('handroll.composers.mixins.signals')
+    def test_indexes_frontmatter_before_extensions_change_it(self, signals):
+        def add_post(source_file, frontmatter):
+            frontmatter['post'] = 'A post'
+        signals.frontmatter_loaded.send.side_effect = add_post
+        mixin, source_file = self._make_indexed_mixin()
+
+        mixin.get_data(source_file)
+
+        first_line, frontmatter = mixin.frontmatter_index.get(source_file)
+        self.assertEqual({'title': 'A Title'}, frontmatter)
+
+    @mock.patch('handroll.composers.mixins.signals')
+    def test_loads_indexed_document_without_parsing(self, signals):
+        mixin, source_file = self._make_indexed_mixin()
+        mixin.get_data(source_file)
+        mixin.documents.clear()
+        signals.reset_mock()
+
+        with mock.patch.object(mixin, '_load_frontmatter') as load:
+            data, source = mixin.get_data(source_file)
+
+        self.assertFalse(load.called)
+        self.assertEqual({'title': 'A Title'}, data)
+        self.assertEqual('The Content', source)
+        signals.frontmatter_loaded.send.assert_called_once_with(
+            source_file, frontmatter={'title': 'A Title'})
+
+    def test_keeps_whole_source_without_guessing_title(self):
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            f.write(b'First row\nThe Content')
+        mixin = FrontmatterComposerMixin()
+        mixin.guess_title = False
+        data, source = mixin.get_data(f.name)
+        self.assertEqual({}, data)
+        self.assertEqual('First row\nThe Content', source)
+
 
 class TestJinja2Composer(TestCase):
 
@@ -478,6 +1157,9 @@ class TestJinja2Composer(TestCase):
         config.outdir = tempfile.mkdtemp()
         return Jinja2Composer(config)
 
+    def _make_catalog(self, site=None):
+        return TemplateCatalog(site or tempfile.mkdtemp())
+
     def test_get_output_extension(self):
         composer = self._make_one()
         extension = composer.get_output_extension('source.xyz.j2')
@@ -496,7 +1178,7 @@ class TestJinja2Composer(TestCase):
         composer = self._make_one()
         output_file = os.path.join(
             composer._config.outdir, os.path.basename(f.name.rstrip('.j2')))
-        composer.compose(None, f.name, composer._config.outdir)
+        composer.compose(self._make_catalog(), f.name, composer._config.outdir)
         content = open(output_file, 'r').read()
         self.assertEqual(
             'title: A Fake Title\ndomain: http://www.example.com\n',
@@ -511,11 +1193,33 @@ class TestJinja2Composer(TestCase):
         composer = self._make_one()
         output_file = os.path.join(
             composer._config.outdir, os.path.basename(f.name.rstrip('.j2')))
-        composer.compose(None, f.name, composer._config.outdir)
+        composer.compose(self._make_catalog(), f.name, composer._config.outdir)
         content = open(output_file, 'r').read()
         self.assertEqual(
             'First row\ndomain: http://www.example.com\n', content)
 
+    def test_composes_with_site_template(self):
+        site = tempfile.mkdtemp()
+        catalog = self._make_catalog(site)
+        os.mkdir(catalog.templates_path)
+        base = os.path.join(catalog.templates_path, 'base.j2')
+        with open(base, 'w') as f:
+            f.write('<p>{% block body %}{% endblock %}</p>')
+        source_file = os.path.join(site, 'page.html.j2')
+        with open(source_file, 'w') as f:
+            f.write('{% extends "base.j2" %}'
+                    '{% block body %}{{ config.domain }}{% endblock %}')
+        composer = self._make_one()
+        outdir = composer._config.outdir
+        composer.manifest = make_manifest(site, outdir)
+
+        composer.compose(catalog, source_file, outdir)
+
+        with open(os.path.join(outdir, 'page.html'), 'r') as f:
+            self.assertEqual('<p>http://www.example.com</p>\n', f.read())
+        self.assertEqual(
+            [source_file], composer.manifest.get_dependents(base))
+
     def test_needs_update(self):
         site = tempfile.mkdtemp()
         output_file = os.path.join(site, 'output.md')
@@ -544,7 +1248,7 @@ class TestJinja2Composer(TestCase):
         composer._config.force = True
         self.assertTrue(composer._needs_update(source_file, output_file))
 
-    @mock.patch('handroll.composers.j2.jinja2.Template.render')
+    @mock.patch('jinja2.Template.render')
     def test_skips_up_to_date(self, render):
         site = tempfile.mkdtemp()
         source_file = os.path.join(site, 'source.txt.j2')
@@ -552,7 +1256,7 @@ class TestJinja2Composer(TestCase):
         output_file = os.path.join(site, 'source.txt')
         open(output_file, 'w').close()
         composer = self._make_one()
-        composer.compose(None, source_file, site)
+        composer.compose(self._make_catalog(), source_file, site)
         self.assertFalse(render.called)
 
     def test_permit_frontmatter(self):
@@ -15,6 +15,9 @@ class FakeArgs(object):
         self.force = False
         self.outdir = None
         self.timing = None
+        self.profile = None
+        self.cprofile = None
+        self.jobs = None
 
 
 class TestConfiguration(unittest.TestCase):
@@ -38,6 +41,43 @@ class TestConfiguration(unittest.TestCase):
 
         self.assertTrue(config.force)
 
+    def test_loads_from_profile_argument(self):
+        config = configuration.Configuration()
+        args = FakeArgs()
+        args.profile = 'report.json'
+
+        config.load_from_arguments(args)
+
+        expected = os.path.join(os.getcwd(), args.profile)
+        self.assertEqual(expected, config.profile)
+
+    def test_loads_from_cprofile_argument(self):
+        config = configuration.Configuration()
+        args = FakeArgs()
+        args.cprofile = 'build.prof'
+
+        config.load_from_arguments(args)
+
+        expected = os.path.join(os.getcwd(), args.cprofile)
+        self.assertEqual(expected, config.cprofile)
+
+    def test_loads_from_jobs_argument(self):
+        config = configuration.Configuration()
+        args = FakeArgs()
+        args.jobs = 4
+
+        config.load_from_arguments(args)
+
+        self.assertEqual(4, config.workers)
+
+    def test_invalid_jobs_argument_aborts(self):
+        config = configuration.Configuration()
+        args = FakeArgs()
+        args.jobs = 0
+
+        with self.assertRaises(AbortError):
+            config.load_from_arguments(args)
+
     def test_build_config_from_file(self):
         conf_file = inspect.cleandoc(
             """[site]
@@ -102,3 +142,115 @@ class TestConfiguration(unittest.TestCase):
         self.assertEqual(
             os.path.dirname(os.path.dirname(f.name)),
             config.outdir)
+
+    def test_loads_workers_from_site(self):
+        conf_file = inspect.cleandoc(
+            """[site]
+            workers = 8""")
+        args = FakeArgs()
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            f.write(conf_file.encode('utf-8'))
+
+        config = configuration.build_config(f.name, args)
+
+        self.assertEqual(8, config.workers)
+
+    def test_invalid_workers_aborts(self):
+        conf_file = inspect.cleandoc(
+            """[site]
+            workers = lots""")
+        args = FakeArgs()
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            f.write(conf_file.encode('utf-8'))
+        with self.assertRaises(AbortError):
+            configuration.build_config(f.name, args)
+
+    def test_loads_copy_mode_from_site(self):
+        conf_file = inspect.cleandoc(
+            """[site]
+            copy_mode = Hardlink""")
+        args = FakeArgs()
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            f.write(conf_file.encode('utf-8'))
+
+        config = configuration.build_config(f.name, args)
+
+        self.assertEqual('hardlink', config.copy_mode)
+
+    def test_invalid_copy_mode_aborts(self):
+        conf_file = inspect.cleandoc(
+            """[site]
+            copy_mode = teleport""")
+        args = FakeArgs()
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            f.write(conf_file.encode('utf-8'))
+        with self.assertRaises(AbortError):
+            configuration.build_config(f.name, args)
+
+    def test_loads_fingerprint_assets_from_site(self):
+        conf_file = inspect.cleandoc(
+            """[site]
+            fingerprint_assets = true""")
+        args = FakeArgs()
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            f.write(conf_file.encode('utf-8'))
+
+        config = configuration.build_config(f.name, args)
+
+        self.assertTrue(config.fingerprint_assets)
+
+    def test_invalid_fingerprint_assets_aborts(self):
+        conf_file = inspect.cleandoc(
+            """[site]
+            fingerprint_assets = maybe""")
+        args = FakeArgs()
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            f.write(conf_file.encode('utf-8'))
+        with self.assertRaises(AbortError):
+            configuration.build_config(f.name, args)
+
+    def test_loads_cache_dir_from_site(self):
+        conf_file = inspect.cleandoc(
+            """[site]
+            cache_dir = .cache""")
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            f.write(conf_file.encode('utf-8'))
+        config = configuration.Configuration()
+        config.load_from_file(f.name)
+        self.assertEqual(
+            os.path.join(os.path.dirname(f.name), '.cache'),
+            config.cache_dir)
+
+    def test_loads_change_list_from_site(self):
+        conf_file = inspect.cleandoc(
+            """[site]
+            change_list = changes.json""")
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            f.write(conf_file.encode('utf-8'))
+        config = configuration.Configuration()
+        config.load_from_file(f.name)
+        self.assertEqual(
+            os.path.join(os.path.dirname(f.name), 'changes.json'),
+            config.change_list)
+
+    def test_loads_content_cache_size_from_site(self):
+        conf_file = inspect.cleandoc(
+            """[site]
+            content_cache_size = 0""")
+        args = FakeArgs()
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            f.write(conf_file.encode('utf-8'))
+
+        config = configuration.build_config(f.name, args)
+
+        self.assertEqual(0, config.content_cache_size)
+
+    def test_invalid_content_cache_size_aborts(self):
+        conf_file = inspect.cleandoc(
+            """[site]
+            content_cache_size = -1""")
+        args = FakeArgs()
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            f.write(conf_file.encode('utf-8'))
+        with self.assertRaises(AbortError):
+            configuration.build_config(f.name, args)
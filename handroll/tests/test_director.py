@@ -1,17 +1,39 @@
 # Copyright (c) 2017, Matt Layman
 
+import json
 import os
+import shutil
 import tempfile
 
 import mock
 
+from handroll import signals
+from handroll.composers.mixins import FrontmatterComposerMixin
 from handroll.configuration import Configuration
 from handroll.director import Director
+from handroll.exceptions import AbortError
+from handroll.extensions.base import Extension
+from handroll.extensions.sitemap import SitemapExtension
 from handroll.resolver import FileResolver
 from handroll.site import Site
 from handroll.tests import TestCase
 
 
+class PostCompositionExtension(Extension):
+    handle_post_composition = True
+
+    def on_post_composition(self, director):
+        pass
+
+
+class InjectingExtension(Extension):
+    handle_frontmatter_loaded = True
+    value = 'a'
+
+    def on_frontmatter_loaded(self, source_file, frontmatter):
+        frontmatter['injected'] = self.value
+
+
 class TestDirector(TestCase):
 
     def test_generates_with_user_specified_outdir(self):
@@ -63,19 +85,62 @@ class TestDirector(TestCase):
         out_templates = os.path.join(site.output_root, 'templates')
         self.assertFalse(os.path.exists(out_templates))
 
-    def test_does_timing(self):
-        mock_time = mock.Mock()
-        mock_time.return_value = 42.0  # Return float so that format works.
+    @mock.patch('handroll.profiler.logger')
+    def test_does_timing(self, logger):
         site = self.factory.make_site()
         open(os.path.join(site.path, 'fake.md'), 'w').close()
         config = Configuration()
         config.timing = True
         director = Director(config, site, [])
 
-        with mock.patch('handroll.director.time.time', mock_time):
-            director.produce()
+        director.produce()
+
+        self.assertTrue(logger.warning.called)
 
-        self.assertTrue(mock_time.called)
+    def test_writes_profile_report(self):
+        site = self.factory.make_site()
+        with open(os.path.join(site.path, 'template.html'), 'w') as f:
+            f.write('$title $content')
+        with open(os.path.join(site.path, 'page.md'), 'w') as f:
+            f.write('A Title\nThe content')
+        config = Configuration()
+        config.profile = os.path.join(tempfile.mkdtemp(), 'report.json')
+        config.cprofile = os.path.join(tempfile.mkdtemp(), 'build.prof')
+        extension = PostCompositionExtension(config)
+        director = Director(config, site, [extension])
+
+        director.produce()
+
+        with open(config.profile) as f:
+            report = json.load(f)
+        self.assertEqual(
+            ['page.md'],
+            [record['path'] for record in report['slowest_files']
+             if record['composer'] == 'MarkdownComposer'])
+        self.assertIn('MarkdownComposer', report['composers'])
+        self.assertEqual(
+            ['convert', 'render', 'write'],
+            sorted(report['composers']['MarkdownComposer']['phases']))
+        self.assertEqual(
+            1,
+            report['extensions']['PostCompositionExtension'][
+                'post_composition']['calls'])
+        self.assertTrue(os.path.exists(config.cprofile))
+
+    def test_parallel_build_merges_profile(self):
+        site = self.factory.make_site()
+        for index in range(4):
+            open(os.path.join(site.path, '{}.txt'.format(index)), 'w').close()
+        config = Configuration()
+        config.workers = 2
+        config.profile = os.path.join(tempfile.mkdtemp(), 'report.json')
+        director = Director(config, site, [])
+
+        director.produce()
+
+        with open(config.profile) as f:
+            report = json.load(f)
+        self.assertEqual(4, report['composers']['CopyComposer']['files'])
 
     def test_generates_output_directory(self):
         config = Configuration()
@@ -152,6 +217,7 @@ class TestDirector(TestCase):
         config = Configuration()
         site = self.factory.make_site()
         director = Director(config, site, [])
+        os.mkdir(director.outdir)
         marker = os.path.join(site.path, 'marker.txt')
         open(marker, 'w').close()
 
@@ -188,6 +254,7 @@ class TestDirector(TestCase):
         config = Configuration()
         site = self.factory.make_site()
         director = Director(config, site, [])
+        os.mkdir(director.outdir)
         marker = os.path.join(site.path, 'marker.txt')
         open(marker, 'w').close()
 
@@ -247,3 +314,606 @@ class TestDirector(TestCase):
         director = self.factory.make_director()
         director.process_file('fake.swp')
         self.assertFalse(signals.pre_composition.called)
+
+    def test_parallel_output_matches_serial_output(self):
+        site = self.factory.make_site()
+        with open(os.path.join(site.path, 'template.html'), 'w') as f:
+            f.write('$title $content')
+        os.mkdir(os.path.join(site.path, 'nested'))
+        for index in range(10):
+            name = os.path.join('nested' if index % 2 else '', '{}.md')
+            with open(os.path.join(site.path, name.format(index)), 'w') as f:
+                f.write('Title {0}\n**Body {0}**'.format(index))
+        open(os.path.join(site.path, 'marker.txt'), 'w').close()
+        serial_config = Configuration()
+        serial_config.outdir = tempfile.mkdtemp()
+        parallel_config = Configuration()
+        parallel_config.outdir = tempfile.mkdtemp()
+        parallel_config.workers = 2
+
+        Director(serial_config, site, []).produce()
+        Director(parallel_config, site, []).produce()
+
+        for dirpath, dirnames, filenames in os.walk(serial_config.outdir):
+            for filename in filenames:
+                serial_file = os.path.join(dirpath, filename)
+                parallel_file = os.path.join(
+                    parallel_config.outdir,
+                    os.path.relpath(serial_file, serial_config.outdir))
+                with open(serial_file, 'rb') as serial:
+                    with open(parallel_file, 'rb') as parallel:
+                        self.assertEqual(serial.read(), parallel.read())
+
+    def test_parallel_failure_aborts(self):
+        config = Configuration()
+        config.workers = 2
+        site = self.factory.make_site()
+        with open(os.path.join(site.path, 'broken.atom'), 'w') as f:
+            f.write('{"title": "A feed without entries"}')
+        director = Director(config, site, [])
+
+        with self.assertRaises(AbortError):
+            director.produce()
+
+    def test_produce_reads_each_document_once(self):
+        site = self.factory.make_site()
+        with open(os.path.join(site.path, 'page.md'), 'w') as f:
+            f.write('---\ntitle: A Page\n---\nThe content')
+        director = Director(Configuration(), site, [])
+        read_document = FrontmatterComposerMixin.read_document
+        read_document_header = FrontmatterComposerMixin.read_document_header
+        read_body = FrontmatterComposerMixin._read_body
+        collect_frontmatter = director._collect_frontmatter
+        bodies_read_in_collection = []
+
+        def collect(inventory):
+            collect_frontmatter(inventory)
+            bodies_read_in_collection.append(mock_read_body.call_count)
+
+        with mock.patch.object(
+                FrontmatterComposerMixin, 'read_document', autospec=True,
+                side_effect=read_document) as mock_read_document, \
+                mock.patch.object(
+                    FrontmatterComposerMixin, 'read_document_header',
+                    autospec=True, side_effect=read_document_header
+                ) as mock_read_document_header, \
+                mock.patch.object(
+                    FrontmatterComposerMixin, '_read_body', autospec=True,
+                    side_effect=read_body) as mock_read_body, \
+                mock.patch.object(
+                    director, '_collect_frontmatter', side_effect=collect):
+            director.produce()
+
+        self.assertEqual(0, mock_read_document.call_count)
+        self.assertEqual(1, mock_read_document_header.call_count)
+        # Only the composer reads the body.
+        self.assertEqual([0], bodies_read_in_collection)
+        self.assertEqual(1, mock_read_body.call_count)
+        self.assertEqual(0, len(director.composers.documents))
+
+    def test_warm_produce_replays_indexed_frontmatter(self):
+        site = self.factory.make_site()
+        with open(os.path.join(site.path, 'page.md'), 'w') as f:
+            f.write('---\ntitle: A Page\n---\nThe content')
+        Director(Configuration(), site, []).produce()
+        director = Director(Configuration(), site, [])
+        loaded = []
+
+        def on_frontmatter_loaded(source_file, frontmatter):
+            loaded.append(frontmatter)
+        signals.frontmatter_loaded.connect(on_frontmatter_loaded)
+        try:
+            with mock.patch.object(
+                    FrontmatterComposerMixin, 'read_document') as read:
+                director.produce()
+        finally:
+            signals.frontmatter_loaded.disconnect(on_frontmatter_loaded)
+
+        self.assertFalse(read.called)
+        self.assertEqual([{'title': 'A Page'}], loaded)
+
+    def test_produce_saves_manifest(self):
+        site = self.factory.make_site()
+        open(os.path.join(site.path, 'marker.txt'), 'w').close()
+        director = Director(Configuration(), site, [])
+
+        director.produce()
+
+        self.assertTrue(os.path.exists(director.manifest.path))
+        self.assertTrue(director.manifest.has_record(
+            os.path.join(director.outdir, 'marker.txt')))
+
+    def test_produce_scans_site_once(self):
+        site = self.factory.make_site()
+        open(os.path.join(site.path, 'marker.txt'), 'w').close()
+        director = Director(Configuration(), site, [])
+
+        with mock.patch.object(site, 'scan', wraps=site.scan) as scan, \
+                mock.patch.object(site, 'walk') as walk:
+            director.produce()
+
+        self.assertEqual(1, scan.call_count)
+        self.assertFalse(walk.called)
+        self.assertEqual({}, director.manifest.stats)
+
+    def test_produce_fingerprints_assets(self):
+        site = self.factory.make_site()
+        os.mkdir(os.path.join(site.path, 'css'))
+        with open(os.path.join(site.path, 'css', 'site.css'), 'w') as f:
+            f.write('body {}')
+        with open(os.path.join(site.path, 'template.html'), 'w') as f:
+            f.write('${asset:css/site.css} $content')
+        with open(os.path.join(site.path, 'page.md'), 'w') as f:
+            f.write('A Title\nThe content')
+        open(os.path.join(site.path, 'robots.txt'), 'w').close()
+        config = Configuration()
+        config.fingerprint_assets = True
+        director = Director(config, site, [])
+
+        director.produce()
+
+        name = director.assets.url('css/site.css')
+        self.assertRegex(name, r'^/css/site\.[0-9a-f]{8}\.css$')
+        self.assertTrue(os.path.exists(director.outdir + name))
+        self.assertTrue(
+            os.path.exists(os.path.join(director.outdir, 'robots.txt')))
+        with open(os.path.join(director.outdir, 'page.html')) as f:
+            self.assertIn(name, f.read())
+        with open(os.path.join(director.outdir, 'assets.json')) as f:
+            self.assertEqual({'css/site.css': name[1:]}, json.load(f))
+
+    def test_asset_lookup_without_fingerprints(self):
+        site = self.factory.make_site()
+        with open(os.path.join(site.path, 'template.html'), 'w') as f:
+            f.write('${asset:css/site.css} $content')
+        with open(os.path.join(site.path, 'page.md'), 'w') as f:
+            f.write('A Title\nThe content')
+        with open(os.path.join(site.path, 'page.txt.j2'), 'w') as f:
+            f.write("{{ asset('app.js') }}")
+        director = Director(Configuration(), site, [])
+
+        director.produce()
+
+        with open(os.path.join(director.outdir, 'page.html')) as f:
+            self.assertTrue(f.read().startswith('/css/site.css '))
+        with open(os.path.join(director.outdir, 'page.txt')) as f:
+            self.assertEqual('/app.js', f.read().strip())
+
+    def test_fingerprinted_images_keep_names_for_stylesheets(self):
+        site = self.factory.make_site()
+        for directory in ('css', 'img'):
+            os.mkdir(os.path.join(site.path, directory))
+        with open(os.path.join(site.path, 'css', 'site.css'), 'w') as f:
+            f.write('body { background: url(../img/logo.png); }')
+        with open(os.path.join(site.path, 'img', 'logo.png'), 'wb') as f:
+            f.write(b'a logo')
+        config = Configuration()
+        config.fingerprint_assets = True
+        director = Director(config, site, [])
+
+        director.produce()
+
+        self.assertTrue(os.path.exists(
+            os.path.join(director.outdir, 'img', 'logo.png')))
+        self.assertTrue(os.path.exists(
+            director.outdir + director.assets.url('img/logo.png')))
+
+    def test_changed_asset_rebuilds_pages_that_use_it(self):
+        site = self.factory.make_site()
+        asset = os.path.join(site.path, 'app.js')
+        with open(asset, 'w') as f:
+            f.write('old();')
+        with open(os.path.join(site.path, 'template.html'), 'w') as f:
+            f.write('${asset:app.js} $content')
+        with open(os.path.join(site.path, 'page.md'), 'w') as f:
+            f.write('A Title\nThe content')
+        config = Configuration()
+        config.fingerprint_assets = True
+        director = Director(config, site, [])
+        director.produce()
+        with open(asset, 'w') as f:
+            f.write('new();')
+
+        director.process_changes([asset])
+
+        with open(os.path.join(director.outdir, 'page.html')) as f:
+            self.assertIn(director.assets.url('app.js'), f.read())
+
+    def test_produce_writes_change_list(self):
+        site = self.factory.make_site()
+        with open(os.path.join(site.path, 'template.html'), 'w') as f:
+            f.write('$content')
+        with open(os.path.join(site.path, 'page.md'), 'w') as f:
+            f.write('A Title\nThe content')
+        open(os.path.join(site.path, 'robots.txt'), 'w').close()
+        config = Configuration()
+        config.change_list = os.path.join(tempfile.mkdtemp(), 'changes.json')
+        director = Director(config, site, [])
+        director.produce()
+        os.remove(os.path.join(site.path, 'robots.txt'))
+
+        director.produce()
+
+        with open(config.change_list) as f:
+            change_list = json.load(f)
+        self.assertEqual(['page.html'], change_list['unchanged'])
+        self.assertEqual(['robots.txt'], change_list['orphaned'])
+
+    def test_cache_dir_defaults_to_site(self):
+        director = self.factory.make_director()
+        self.assertEqual(director.site.cache_root, director.cache_dir)
+
+    def test_user_specified_cache_dir(self):
+        director = self.factory.make_director()
+        director.config.cache_dir = tempfile.mkdtemp()
+        self.assertEqual(director.config.cache_dir, director.cache_dir)
+
+    def test_produce_to_another_outdir_does_not_skip_stale_output(self):
+        site = self.factory.make_site()
+        with open(os.path.join(site.path, 'template.html'), 'w') as f:
+            f.write('$content')
+        source_file = os.path.join(site.path, 'page.md')
+        with open(source_file, 'w') as f:
+            f.write('A Title\nold')
+        first, second = tempfile.mkdtemp(), tempfile.mkdtemp()
+
+        def produce(outdir):
+            config = Configuration()
+            config.outdir = outdir
+            Director(config, site, []).produce()
+
+        produce(first)
+        with open(source_file, 'w') as f:
+            f.write('A Title\nnew content')
+        produce(second)
+
+        produce(first)
+
+        with open(os.path.join(first, 'page.html')) as f:
+            self.assertIn('new content', f.read())
+
+    def test_produce_skips_change_list_in_site(self):
+        site = self.factory.make_site()
+        open(os.path.join(site.path, 'robots.txt'), 'w').close()
+        config = Configuration()
+        config.change_list = os.path.join(site.path, 'changes.txt')
+        director = Director(config, site, [])
+        director.produce()
+
+        director.produce()
+
+        self.assertEqual(['robots.txt'], os.listdir(director.outdir))
+        with open(config.change_list) as f:
+            self.assertEqual('unchanged robots.txt\n', f.read())
+
+    def test_process_changes_composes_in_process(self):
+        config = Configuration()
+        config.workers = 2
+        site = self.factory.make_site()
+        marker = os.path.join(site.path, 'marker.txt')
+        open(marker, 'w').close()
+        director = Director(config, site, [])
+        os.mkdir(director.outdir)
+
+        with mock.patch.object(
+                director, '_process_files_in_parallel') as parallel:
+            director.process_changes([marker])
+
+        self.assertFalse(parallel.called)
+        self.assertTrue(os.path.exists(
+            os.path.join(director.outdir, 'marker.txt')))
+
+    @mock.patch('handroll.director.signals')
+    def test_process_changes_ignores_change_list(self, signals):
+        director = self.factory.make_director()
+        director.config.change_list = os.path.join(
+            director.site.path, 'changes.txt')
+        open(director.config.change_list, 'w').close()
+
+        director.process_changes([director.config.change_list])
+
+        self.assertFalse(signals.pre_composition.called)
+
+    def test_produce_skips_configured_directories_in_site(self):
+        site = self.factory.make_site()
+        open(os.path.join(site.path, 'robots.txt'), 'w').close()
+        config = Configuration()
+        config.cache_dir = os.path.join(site.path, 'buildcache')
+        config.outdir = os.path.join(site.path, 'public')
+        director = Director(config, site, [])
+        director.produce()
+
+        director.produce()
+
+        self.assertEqual(['robots.txt'], os.listdir(config.outdir))
+
+    @mock.patch('handroll.director.signals')
+    def test_process_file_ignores_cache(self, signals):
+        director = self.factory.make_director()
+        director.process_file(director.manifest.path)
+        self.assertFalse(signals.pre_composition.called)
+
+    def test_rebuild_after_checkout_skips_unchanged_files(self):
+        site = self.factory.make_site()
+        source_file = os.path.join(site.path, 'page.md')
+        with open(source_file, 'w') as f:
+            f.write('A Title\nThe content')
+        Director(Configuration(), site, []).produce()
+        # Simulate a fresh checkout where every modified time changes.
+        future = os.path.getmtime(source_file) + 100
+        os.utime(source_file, (future, future))
+        director = Director(Configuration(), site, [])
+        composer = director.composers.select_composer_for(source_file)
+
+        with mock.patch.object(composer, '_render_to_output') as render:
+            director.produce()
+
+        self.assertFalse(render.called)
+
+    def test_parallel_build_records_manifest(self):
+        config = Configuration()
+        config.workers = 2
+        site = self.factory.make_site()
+        open(os.path.join(site.path, 'marker.txt'), 'w').close()
+        director = Director(config, site, [])
+
+        director.produce()
+
+        self.assertTrue(director.manifest.has_record(
+            os.path.join(director.outdir, 'marker.txt')))
+
+    def test_process_template_rebuilds_dependents(self):
+        site = self.factory.make_site()
+        default = os.path.join(site.path, 'template.html')
+        with open(default, 'w') as f:
+            f.write('old $content')
+        source_file = os.path.join(site.path, 'page.md')
+        with open(source_file, 'w') as f:
+            f.write('A Title\nThe content')
+        director = Director(Configuration(), site, [])
+        director.produce()
+        with open(default, 'w') as f:
+            f.write('new $content')
+
+        with mock.patch.object(director, '_process_file',
+                               wraps=director._process_file) as process:
+            director.process_file(default)
+
+        process.assert_called_once_with(source_file, director.outdir)
+
+        with open(os.path.join(director.outdir, 'page.html')) as f:
+            self.assertTrue(f.read().startswith('new'))
+
+    @mock.patch('handroll.director.signals')
+    def test_process_template_without_dependents(self, signals):
+        director = self.factory.make_director()
+        default = os.path.join(director.site.path, 'template.html')
+
+        director.process_file(default)
+
+        self.assertFalse(signals.pre_composition.called)
+
+    def test_produce_composes_when_extension_changes_frontmatter(self):
+        site = self.factory.make_site()
+        with open(os.path.join(site.path, 'template.html'), 'w') as f:
+            f.write('$injected $content')
+        with open(os.path.join(site.path, 'page.md'), 'w') as f:
+            f.write('---\ntitle: A Title\n---\nThe content')
+        extension = InjectingExtension(None)
+        try:
+            Director(Configuration(), site, [extension]).produce()
+            # The source is the same, but the extension's data is not
+            # (e.g., the extension's configuration changed).
+            extension.value = 'b'
+            director = Director(Configuration(), site, [extension])
+            director.produce()
+        finally:
+            signals.frontmatter_loaded.receivers.clear()
+
+        with open(os.path.join(director.outdir, 'page.html')) as f:
+            self.assertTrue(f.read().startswith('b '))
+
+    @mock.patch('handroll.director.signals')
+    def test_process_changes_in_one_composition(self, signals):
+        director = self.factory.make_director()
+        os.mkdir(director.outdir)
+        directory = os.path.join(director.site.path, 'directory')
+        os.mkdir(directory)
+        first = os.path.join(director.site.path, 'first.txt')
+        open(first, 'w').close()
+        second = os.path.join(directory, 'second.txt')
+        open(second, 'w').close()
+
+        director.process_changes([second, first, directory, second])
+
+        signals.pre_composition.send.assert_called_once_with(director)
+        signals.post_composition.send.assert_called_once_with(director)
+        self.assertTrue(os.path.exists(
+            os.path.join(director.outdir, 'directory', 'second.txt')))
+        self.assertTrue(
+            os.path.exists(os.path.join(director.outdir, 'first.txt')))
+
+    def test_process_changes_composes_each_file_once(self):
+        site = self.factory.make_site()
+        default = os.path.join(site.path, 'template.html')
+        with open(default, 'w') as f:
+            f.write('$content')
+        source_file = os.path.join(site.path, 'page.md')
+        with open(source_file, 'w') as f:
+            f.write('A Title\nThe content')
+        director = Director(Configuration(), site, [])
+        director.produce()
+
+        with mock.patch.object(director, '_process_file') as process:
+            director.process_changes([source_file, default, source_file])
+
+        process.assert_called_once_with(source_file, director.outdir)
+
+    @mock.patch('handroll.director.signals')
+    def test_process_changes_skips_missing_files(self, signals):
+        director = self.factory.make_director()
+        missing = os.path.join(director.site.path, 'missing.md')
+
+        director.process_changes([missing])
+
+        self.assertFalse(signals.pre_composition.called)
+
+    def test_process_changes_removes_output_of_removed_file(self):
+        site = self.factory.make_site()
+        with open(os.path.join(site.path, 'template.html'), 'w') as f:
+            f.write('$content')
+        source_file = os.path.join(site.path, 'page.md')
+        with open(source_file, 'w') as f:
+            f.write('A Title\nThe content')
+        director = Director(Configuration(), site, [])
+        director.produce()
+        output_file = os.path.join(director.outdir, 'page.html')
+        os.remove(source_file)
+
+        with mock.patch('handroll.director.signals') as signals:
+            director.process_changes([source_file])
+
+        self.assertFalse(os.path.exists(output_file))
+        self.assertFalse(director.manifest.has_record(output_file))
+        self.assertEqual([], director.manifest.get_sources(source_file))
+        signals.source_removed.send.assert_called_once_with(source_file)
+        signals.post_composition.send.assert_called_once_with(director)
+
+    def test_process_changes_removes_output_of_removed_directory(self):
+        director = self.factory.make_director()
+        directory = os.path.join(director.site.path, 'directory')
+        os.mkdir(directory)
+        source_file = os.path.join(directory, 'robots.txt')
+        open(source_file, 'w').close()
+        director.produce()
+        shutil.rmtree(directory)
+
+        with mock.patch('handroll.director.signals') as signals:
+            director.process_changes([directory])
+
+        self.assertFalse(
+            os.path.exists(os.path.join(director.outdir, 'directory')))
+        signals.source_removed.send.assert_called_once_with(source_file)
+
+    def test_process_changes_composes_files_that_used_removed_file(self):
+        director = self.factory.make_director()
+        os.mkdir(director.outdir)
+        source_file = os.path.join(director.site.path, 'main.txt')
+        included = os.path.join(director.site.path, 'included.txt')
+        open(source_file, 'w').close()
+        director.manifest.record_dependencies(source_file, [included])
+        director.manifest.record_dependencies(included, [])
+
+        with mock.patch.object(director, '_process_file') as process:
+            director.process_changes([included])
+
+        process.assert_called_once_with(source_file, director.outdir)
+
+    def test_process_changes_removes_fingerprinted_asset(self):
+        site = self.factory.make_site()
+        asset = os.path.join(site.path, 'app.js')
+        with open(asset, 'w') as f:
+            f.write('app();')
+        config = Configuration()
+        config.fingerprint_assets = True
+        director = Director(config, site, [])
+        director.produce()
+        output_file = director.outdir + director.assets.url('app.js')
+        os.remove(asset)
+
+        director.process_changes([asset])
+
+        self.assertFalse(os.path.exists(output_file))
+        self.assertFalse(
+            os.path.exists(os.path.join(director.outdir, 'app.js')))
+        with open(os.path.join(director.outdir, 'assets.json')) as f:
+            self.assertEqual({}, json.load(f))
+
+    def test_process_changes_removal_updates_sitemap(self):
+        site = self.factory.make_site()
+        with open(os.path.join(site.path, 'template.html'), 'w') as f:
+            f.write('$content')
+        kept = os.path.join(site.path, 'kept.md')
+        removed = os.path.join(site.path, 'removed.md')
+        for source_file in (kept, removed):
+            with open(source_file, 'w') as f:
+                f.write('---\ntitle: A Title\n---\nThe content')
+        config = self.factory.make_configuration()
+        extension = SitemapExtension(config)
+        director = Director(config, site, [extension])
+        try:
+            director.produce()
+            os.remove(removed)
+
+            director.process_changes([removed])
+        finally:
+            signals.frontmatter_loaded.receivers.clear()
+            signals.pre_composition.receivers.clear()
+            signals.post_composition.receivers.clear()
+            signals.source_removed.receivers.clear()
+
+        with open(os.path.join(director.outdir, 'sitemap.txt')) as f:
+            self.assertEqual(config.domain + '/kept.html\n', f.read())
+
+    def test_process_changes_composes_files_that_include_the_file(self):
+        director = self.factory.make_director()
+        os.mkdir(director.outdir)
+        stylesheet = os.path.join(director.site.path, 'main.scss')
+        partial = os.path.join(director.site.path, '_colors.scss')
+        for path in (stylesheet, partial):
+            open(path, 'w').close()
+        director.manifest.record_dependencies(stylesheet, [partial])
+
+        with mock.patch.object(director, '_process_file') as process:
+            director.process_changes([partial])
+
+        self.assertEqual([
+            mock.call(partial, director.outdir),
+            mock.call(stylesheet, director.outdir),
+        ], process.call_args_list)
+
+    def test_parallel_build_flushes_batched_composers(self):
+        config = Configuration()
+        config.workers = 2
+        site = self.factory.make_site()
+        with open(os.path.join(site.path, 'main.scss'), 'w') as f:
+            f.write('a { color: red; }')
+        director = Director(config, site, [])
+        libsass = mock.Mock()
+        libsass.compile.return_value = 'a{color:red}'
+
+        with mock.patch('handroll.composers.sass.libsass', libsass):
+            director.produce()
+
+        with open(os.path.join(director.outdir, 'main.css')) as f:
+            self.assertEqual('a{color:red}', f.read())
+
+    def test_jinja_bytecode_in_cache_dir(self):
+        director = self.factory.make_director()
+        self.assertEqual(
+            os.path.join(director.cache_dir, 'jinja'),
+            director.catalog.bytecode_cache_path)
+
+    def test_forced_build_leaves_same_output_alone(self):
+        config = Configuration()
+        site = self.factory.make_site()
+        with open(os.path.join(site.path, 'template.html'), 'w') as f:
+            f.write('$content')
+        with open(os.path.join(site.path, 'page.md'), 'w') as f:
+            f.write('A Title\nThe content')
+        director = Director(config, site, [])
+        director.produce()
+        output_file = os.path.join(director.outdir, 'page.html')
+        past = os.path.getmtime(output_file) - 10
+        os.utime(output_file, (past, past))
+        config.force = True
+
+        director.produce()
+
+        self.assertEqual(past, os.path.getmtime(output_file))
+
+    def test_no_content_cache_when_size_is_zero(self):
+        config = Configuration()
+        config.content_cache_size = 0
+        director = Director(config, self.factory.make_site(), [])
+        self.assertIsNone(director.content_cache)
@@ -0,0 +1,42 @@
+# Copyright (c) 2017, Matt Layman
+
+from handroll.documents import Document, DocumentStore
+from handroll.tests import TestCase
+
+
+class TestDocument(TestCase):
+
+    def test_loads_body_once(self):
+        loads = []
+
+        def load_body():
+            loads.append(True)
+            return 'body'
+        document = Document('title\n', None, body_loader=load_body)
+
+        self.assertEqual('body', document.body)
+        self.assertEqual('body', document.body)
+        self.assertEqual(1, len(loads))
+
+
+class TestDocumentStore(TestCase):
+
+    def test_gets_added_document(self):
+        store = DocumentStore()
+        document = Document('title\n', None, 'body')
+
+        store.add('source.md', document)
+
+        self.assertEqual(document, store.get('source.md'))
+
+    def test_missing_document(self):
+        store = DocumentStore()
+        self.assertIsNone(store.get('source.md'))
+
+    def test_clear(self):
+        store = DocumentStore()
+        store.add('source.md', Document('title\n', None, 'body'))
+
+        store.clear()
+
+        self.assertEqual(0, len(store))
@@ -98,6 +98,37 @@ class TestArguments(TestCase):
         args = entry.parse(argv)
         self.assertTrue(args.force)
 
+    def test_profile_argument(self):
+        argv = self._make_argv_with()
+        args = entry.parse(argv)
+        self.assertIsNone(args.profile)
+
+        argv = ['/fake/bin/handroll', '--profile', 'report.json', 'build']
+        args = entry.parse(argv)
+        self.assertEqual('report.json', args.profile)
+
+    def test_cprofile_argument(self):
+        argv = self._make_argv_with()
+        args = entry.parse(argv)
+        self.assertIsNone(args.cprofile)
+
+        argv = ['/fake/bin/handroll', '--cprofile', 'build.prof', 'build']
+        args = entry.parse(argv)
+        self.assertEqual('build.prof', args.cprofile)
+
+    def test_jobs_argument(self):
+        argv = self._make_argv_with()
+        args = entry.parse(argv)
+        self.assertIsNone(args.jobs)
+
+        argv = ['/fake/bin/handroll', '-j', '4', 'build']
+        args = entry.parse(argv)
+        self.assertEqual(4, args.jobs)
+
+        argv = ['/fake/bin/handroll', '--jobs', '4', 'build']
+        args = entry.parse(argv)
+        self.assertEqual(4, args.jobs)
+
 
 class TestMain(TestCase):
 
@@ -18,11 +18,13 @@ class TestExtensionLoader(TestCase):
         signals.frontmatter_loaded.receivers.clear()
         signals.pre_composition.receivers.clear()
         signals.post_composition.receivers.clear()
+        signals.source_removed.receivers.clear()
 
     def test_loads_available_extensions(self):
         loader = ExtensionLoader()
         loader.load()
-        self.assertEqual(BlogExtension, loader._available_extensions['blog'])
+        self.assertEqual(
+            BlogExtension, loader._available_extensions['blog'].load())
 
     def test_gets_active_extensions(self):
         config = Configuration()
@@ -81,3 +83,17 @@ class TestExtension(TestCase):
         with self.assertRaises(NotImplementedError):
             signals.pre_composition.send(director)
         signals.pre_composition.receivers.clear()
+
+    @mock.patch('handroll.extensions.base.signals.source_removed')
+    def test_source_removed_connection_default(self, source_removed):
+        Extension(None)
+        self.assertFalse(source_removed.connect.called)
+
+    def test_connects_to_source_removed(self):
+        class Remover(Extension):
+            handle_source_removed = True
+        extension = Remover(None)
+        self.assertTrue(extension.handle_source_removed)
+        with self.assertRaises(NotImplementedError):
+            signals.source_removed.send('a_source_file')
+        signals.source_removed.receivers.clear()
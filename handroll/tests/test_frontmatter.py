@@ -1,7 +1,13 @@
+import datetime
 import inspect
+import os
+import pickle
 import tempfile
 
-from handroll.frontmatter import FrontmatterExtractor
+import mock
+
+from handroll.documents import DocumentStore
+from handroll.frontmatter import FrontmatterExtractor, FrontmatterIndex
 from handroll.tests import TestCase
 
 
@@ -20,3 +26,120 @@ class TestFrontmatterExtractor(TestCase):
         frontmatter = extractor.extract(f.name)
         self.assertEqual(
             'ØMQ: A dynamic book with surprises', frontmatter['title'])
+
+    def test_extracts_without_reading_body(self):
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            f.write(b'---\ntitle: A Title\n---\nThe Content')
+        extractor = FrontmatterExtractor(DocumentStore())
+
+        with mock.patch.object(extractor, '_read_body') as read_body:
+            frontmatter = extractor.extract(f.name)
+
+        self.assertEqual({'title': 'A Title'}, frontmatter)
+        self.assertFalse(read_body.called)
+
+
+class TestFrontmatterIndex(TestCase):
+
+    def setUp(self):
+        self.site = tempfile.mkdtemp()
+        self.path = os.path.join(tempfile.mkdtemp(), 'frontmatter.sqlite')
+        self.source_file = os.path.join(self.site, 'post.md')
+        with open(self.source_file, 'w') as f:
+            f.write('---\ntitle: A Post\n---\nThe content')
+        self.frontmatter = {
+            'title': 'A Post', 'date': datetime.datetime(2017, 1, 1)}
+
+    def _make_one(self):
+        return FrontmatterIndex(self.path, self.site)
+
+    def test_gets_recorded_frontmatter(self):
+        index = self._make_one()
+        index.record(self.source_file, '---\n', self.frontmatter)
+
+        self.assertEqual(
+            ('---\n', self.frontmatter), index.get(self.source_file))
+
+    def test_missing_source(self):
+        index = self._make_one()
+        self.assertIsNone(index.get(self.source_file))
+
+    def test_changed_source_is_a_miss(self):
+        index = self._make_one()
+        index.record(self.source_file, '---\n', self.frontmatter)
+        with open(self.source_file, 'a') as f:
+            f.write('More content')
+
+        self.assertIsNone(index.get(self.source_file))
+
+    def test_saves_and_loads(self):
+        index = self._make_one()
+        index.record(self.source_file, '---\n', self.frontmatter)
+        index.save()
+
+        loaded = self._make_one()
+
+        self.assertEqual(
+            ('---\n', self.frontmatter), loaded.get(self.source_file))
+
+    def test_retain_removes_other_sources(self):
+        index = self._make_one()
+        index.record(self.source_file, '---\n', self.frontmatter)
+        index.save()
+        index.retain([])
+        index.save()
+
+        loaded = self._make_one()
+
+        self.assertIsNone(loaded.get(self.source_file))
+
+    def test_unreadable_index_starts_over(self):
+        with open(self.path, 'w') as f:
+            f.write('not a database')
+        index = self._make_one()
+
+        self.assertIsNone(index.get(self.source_file))
+        index.record(self.source_file, '---\n', self.frontmatter)
+        index.save()
+
+        self.assertIsNotNone(self._make_one().get(self.source_file))
+
+    def test_keeps_dates(self):
+        index = self._make_one()
+        frontmatter = {
+            'day': datetime.date(2017, 1, 2),
+            'when': datetime.datetime(
+                2017, 1, 2, 3, 4, 5, 6,
+                tzinfo=datetime.timezone(datetime.timedelta(hours=-5))),
+            'tags': ['a', {'nested': datetime.datetime(2017, 1, 1)}],
+        }
+        index.record(self.source_file, '---\n', frontmatter)
+        index.save()
+
+        first_line, loaded = self._make_one().get(self.source_file)
+
+        self.assertEqual(frontmatter, loaded)
+        self.assertIsInstance(loaded['day'], datetime.date)
+        self.assertEqual(
+            frontmatter['when'].utcoffset(), loaded['when'].utcoffset())
+
+    def test_skips_frontmatter_that_json_changes(self):
+        index = self._make_one()
+        for frontmatter in (
+            {'tags': set(['a'])},
+            {1: 'a number key'},
+            {'title': {'__date__': [2017, 1, 1]}},
+        ):
+            index.record(self.source_file, '---\n', frontmatter)
+
+            self.assertIsNone(index.get(self.source_file))
+
+    def test_does_not_unpickle_entries(self):
+        index = self._make_one()
+        index.record(self.source_file, '---\n', self.frontmatter)
+        key = index._key(self.source_file)
+        entry = index._entries[key]
+        index._entries[key] = entry[:3] + (
+            pickle.dumps(('---\n', self.frontmatter)),)
+
+        self.assertIsNone(index.get(self.source_file))
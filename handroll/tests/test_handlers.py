@@ -1,13 +1,17 @@
 # Copyright (c) 2017, Matt Layman
 
 import os
+import shutil
 import tempfile
+import threading
 
+import mock
 from watchdog import events
 
 from handroll.configuration import Configuration
 from handroll.director import Director
-from handroll.handlers import SiteHandler
+from handroll.exceptions import AbortError
+from handroll.handlers import RebuildQueue, SiteHandler
 from handroll.tests import TestCase
 
 
@@ -26,6 +30,7 @@ class TestSiteHandler(TestCase):
         event = events.FileCreatedEvent(markdown)
 
         handler.on_created(event)
+        handler.queue.flush()
 
         html = os.path.join(self.director.config.outdir, 'index.html')
         self.assertTrue(os.path.exists(html))
@@ -39,6 +44,7 @@ class TestSiteHandler(TestCase):
         event = events.DirCreatedEvent(directory)
 
         handler.on_created(event)
+        handler.queue.flush()
 
         out_directory = os.path.join(self.director.config.outdir, 'directory')
         self.assertTrue(os.path.exists(out_directory))
@@ -51,6 +57,7 @@ class TestSiteHandler(TestCase):
         event = events.FileModifiedEvent(markdown)
 
         handler.on_modified(event)
+        handler.queue.flush()
 
         html = os.path.join(self.director.config.outdir, 'index.html')
         self.assertTrue(os.path.exists(html))
@@ -59,9 +66,11 @@ class TestSiteHandler(TestCase):
         markdown = os.path.join(self.site.path, 'index.md')
         open(markdown, 'w').close()
         handler = SiteHandler(self.director)
-        event = events.FileMovedEvent('', markdown)
+        event = events.FileMovedEvent(
+            os.path.join(self.site.path, 'old.md'), markdown)
 
         handler.on_moved(event)
+        handler.queue.flush()
 
         html = os.path.join(self.director.config.outdir, 'index.html')
         self.assertTrue(os.path.exists(html))
@@ -70,10 +79,123 @@ class TestSiteHandler(TestCase):
         directory = os.path.join(self.site.path, 'directory')
         os.mkdir(directory)
         handler = SiteHandler(self.director)
-        event = events.DirMovedEvent('', directory)
+        event = events.DirMovedEvent(
+            os.path.join(self.site.path, 'old_directory'), directory)
 
         handler.on_moved(event)
+        handler.queue.flush()
 
         out_directory = os.path.join(self.director.config.outdir, 'directory')
         self.assertTrue(os.path.exists(out_directory))
         self.assertTrue(os.path.isdir(out_directory))
+
+    def test_on_moved_removes_old_output(self):
+        old_markdown = os.path.join(self.site.path, 'old.md')
+        open(old_markdown, 'w').close()
+        self.director.produce()
+        markdown = os.path.join(self.site.path, 'index.md')
+        os.rename(old_markdown, markdown)
+        handler = SiteHandler(self.director)
+        event = events.FileMovedEvent(old_markdown, markdown)
+
+        handler.on_moved(event)
+        handler.queue.flush()
+
+        outdir = self.director.config.outdir
+        self.assertFalse(os.path.exists(os.path.join(outdir, 'old.html')))
+        self.assertTrue(os.path.exists(os.path.join(outdir, 'index.html')))
+
+    def test_on_deleted_removes_output(self):
+        markdown = os.path.join(self.site.path, 'index.md')
+        open(markdown, 'w').close()
+        self.director.produce()
+        os.remove(markdown)
+        handler = SiteHandler(self.director)
+        event = events.FileDeletedEvent(markdown)
+
+        handler.on_deleted(event)
+        handler.queue.flush()
+
+        html = os.path.join(self.director.config.outdir, 'index.html')
+        self.assertFalse(os.path.exists(html))
+
+    def test_on_deleted_removes_directory_output(self):
+        directory = os.path.join(self.site.path, 'directory')
+        os.mkdir(directory)
+        open(os.path.join(directory, 'page.md'), 'w').close()
+        self.director.produce()
+        shutil.rmtree(directory)
+        handler = SiteHandler(self.director)
+        event = events.DirDeletedEvent(directory)
+
+        handler.on_deleted(event)
+        handler.queue.flush()
+
+        out_directory = os.path.join(self.director.config.outdir, 'directory')
+        self.assertFalse(os.path.exists(out_directory))
+
+    def test_on_modified_ignores_directories(self):
+        handler = SiteHandler(self.director)
+        event = events.DirModifiedEvent(self.site.path)
+
+        handler.on_modified(event)
+
+        self.assertEqual([], handler.queue._take_paths())
+
+
+class TestRebuildQueue(TestCase):
+
+    def test_batches_unique_paths(self):
+        director = mock.Mock()
+        queue = RebuildQueue(director, 0)
+
+        queue.put('a.md')
+        queue.put('b.md')
+        queue.put('a.md')
+        queue.flush()
+
+        director.process_changes.assert_called_once_with(['a.md', 'b.md'])
+
+    def test_flush_without_paths(self):
+        director = mock.Mock()
+        queue = RebuildQueue(director, 0)
+
+        queue.flush()
+
+        self.assertFalse(director.process_changes.called)
+
+    def test_abort_keeps_processing(self):
+        director = mock.Mock()
+        director.process_changes.side_effect = AbortError('Broken.')
+        queue = RebuildQueue(director, 0)
+        queue.put('a.md')
+
+        queue.flush()
+        queue.put('b.md')
+        queue.flush()
+
+        self.assertEqual(2, director.process_changes.call_count)
+
+    def test_worker_thread_processes_batch(self):
+        director = mock.Mock()
+        done = threading.Event()
+        director.process_changes.side_effect = lambda paths: done.set()
+        queue = RebuildQueue(director, 0.01)
+        queue.start()
+
+        queue.put('a.md')
+        queue.put('b.md')
+        done.wait(5)
+        queue.stop()
+
+        director.process_changes.assert_called_once_with(['a.md', 'b.md'])
+
+    def test_stop_discards_pending_paths(self):
+        director = mock.Mock()
+        queue = RebuildQueue(director, 60)
+        queue.start()
+        queue.put('a.md')
+
+        queue.stop()
+
+        self.assertFalse(director.process_changes.called)
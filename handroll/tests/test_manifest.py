@@ -0,0 +1,328 @@
+# Copyright (c) 2017, Matt Layman
+
+import os
+import tempfile
+
+import mock
+
+from handroll import __version__
+from handroll.composers import CopyComposer
+from handroll.manifest import BuildManifest
+from handroll.tests import TestCase
+
+
+class TestBuildManifest(TestCase):
+
+    def setUp(self):
+        self.site = tempfile.mkdtemp()
+        self.outdir = tempfile.mkdtemp()
+        self.path = os.path.join(tempfile.mkdtemp(), 'cache', 'manifest.json')
+        self.source_file = os.path.join(self.site, 'source.txt')
+        with open(self.source_file, 'w') as f:
+            f.write('The source')
+        self.output_file = os.path.join(self.outdir, 'source.txt')
+        open(self.output_file, 'w').close()
+
+    def _make_one(self):
+        return BuildManifest(self.path, self.site, self.outdir)
+
+    def test_fingerprint(self):
+        manifest = self._make_one()
+        composer = CopyComposer(None)
+        template = mock.Mock(digest='template_digest')
+
+        fingerprint = manifest.fingerprint(
+            composer, self.source_file, template=template,
+            frontmatter={'title': 'A Title'})
+
+        self.assertEqual(
+            'handroll.composers.CopyComposer', fingerprint['composer'])
+        self.assertEqual(__version__, fingerprint['handroll'])
+        self.assertEqual(
+            manifest.hash_file(self.source_file), fingerprint['source'])
+        self.assertEqual('template_digest', fingerprint['template'])
+        self.assertEqual(
+            manifest.hash_data({'title': 'A Title'}),
+            fingerprint['frontmatter'])
+
+    def test_is_current_with_recorded_fingerprint(self):
+        manifest = self._make_one()
+        fingerprint = {'source': 'a_digest'}
+
+        manifest.record(self.output_file, fingerprint)
+
+        self.assertTrue(manifest.is_current(self.output_file, fingerprint))
+        self.assertFalse(
+            manifest.is_current(self.output_file, {'source': 'changed'}))
+
+    def test_is_not_current_without_output(self):
+        manifest = self._make_one()
+        fingerprint = {'source': 'a_digest'}
+        manifest.record(self.output_file, fingerprint)
+        os.remove(self.output_file)
+
+        self.assertFalse(manifest.is_current(self.output_file, fingerprint))
+
+    def test_has_record(self):
+        manifest = self._make_one()
+        self.assertFalse(manifest.has_record(self.output_file))
+
+        manifest.record(self.output_file, {'source': 'a_digest'})
+
+        self.assertTrue(manifest.has_record(self.output_file))
+
+    def test_saves_and_loads(self):
+        manifest = self._make_one()
+        fingerprint = manifest.fingerprint(
+            CopyComposer(None), self.source_file)
+        manifest.record(self.output_file, fingerprint)
+
+        manifest.save()
+        manifest = self._make_one()
+
+        self.assertTrue(manifest.is_current(self.output_file, fingerprint))
+
+    def test_hash_survives_modified_time_change(self):
+        manifest = self._make_one()
+        digest = manifest.hash_file(self.source_file)
+        future = os.path.getmtime(self.source_file) + 10
+        os.utime(self.source_file, (future, future))
+
+        self.assertEqual(digest, manifest.hash_file(self.source_file))
+
+    def test_hash_changes_with_content(self):
+        manifest = self._make_one()
+        digest = manifest.hash_file(self.source_file)
+        with open(self.source_file, 'w') as f:
+            f.write('A different source')
+
+        self.assertNotEqual(digest, manifest.hash_file(self.source_file))
+
+    @mock.patch('handroll.manifest.hash_bytes')
+    def test_unchanged_stat_reuses_hash(self, hash_bytes):
+        hash_bytes.return_value = 'a_digest'
+        manifest = self._make_one()
+        manifest.hash_file(self.source_file)
+
+        manifest.hash_file(self.source_file)
+
+        self.assertEqual(1, hash_bytes.call_count)
+
+    def test_hash_uses_scanned_stat(self):
+        manifest = self._make_one()
+        manifest.stats = {self.source_file: os.stat(self.source_file)}
+
+        with mock.patch('handroll.manifest.os.stat') as stat:
+            manifest.hash_file(self.source_file)
+
+        self.assertFalse(stat.called)
+
+    def test_source_info_until_source_changes(self):
+        manifest = self._make_one()
+        manifest.record_source_info(self.source_file, {'template': 'a.j2'})
+        self.assertEqual(
+            {'template': 'a.j2'}, manifest.get_source_info(self.source_file))
+
+        with open(self.source_file, 'w') as f:
+            f.write('A longer source than before')
+
+        self.assertIsNone(manifest.get_source_info(self.source_file))
+
+    def test_saves_source_info(self):
+        manifest = self._make_one()
+        manifest.record_source_info(self.source_file, {'template': 'a.j2'})
+        manifest.save()
+
+        loaded = self._make_one()
+
+        self.assertEqual(
+            {'template': 'a.j2'}, loaded.get_source_info(self.source_file))
+
+    def test_paths_are_relative(self):
+        manifest = self._make_one()
+        manifest.hash_file(self.source_file)
+        manifest.record(self.output_file, {'source': 'a_digest'})
+
+        updates = manifest.drain()
+
+        self.assertIn('source.txt', updates['hashes'])
+        self.assertIn('source.txt', updates['outputs'])
+
+    def test_drain_and_merge(self):
+        worker_manifest = self._make_one()
+        worker_manifest.record(self.output_file, {'source': 'a_digest'})
+        manifest = self._make_one()
+
+        manifest.merge(worker_manifest.drain())
+
+        self.assertTrue(
+            manifest.is_current(self.output_file, {'source': 'a_digest'}))
+        self.assertFalse(any(worker_manifest.drain().values()))
+
+    def test_content_digest(self):
+        manifest = self._make_one()
+        self.assertIsNone(manifest.get_content_digest(self.output_file))
+
+        manifest.record_content(self.output_file, 'a_digest')
+
+        self.assertEqual(
+            'a_digest', manifest.get_content_digest(self.output_file))
+
+    def test_content_digest_of_changed_output(self):
+        manifest = self._make_one()
+        manifest.record_content(self.output_file, 'a_digest')
+        with open(self.output_file, 'w') as f:
+            f.write('A change')
+
+        self.assertIsNone(manifest.get_content_digest(self.output_file))
+
+    def test_saves_content_digest(self):
+        manifest = self._make_one()
+        manifest.record_content(self.output_file, 'a_digest')
+        manifest.save()
+
+        manifest = self._make_one()
+
+        self.assertEqual(
+            'a_digest', manifest.get_content_digest(self.output_file))
+
+    def test_gets_dependents(self):
+        manifest = self._make_one()
+        template = os.path.join(self.site, 'templates', 'base.j2')
+        other = os.path.join(self.site, 'other.md')
+        manifest.record_dependencies(self.source_file, [template])
+        manifest.record_dependencies(other, [])
+
+        dependents = manifest.get_dependents(template)
+
+        self.assertEqual([self.source_file], dependents)
+
+    def test_gets_dependencies(self):
+        manifest = self._make_one()
+        template = os.path.join(self.site, 'templates', 'base.j2')
+        manifest.record_dependencies(self.source_file, [template])
+
+        self.assertEqual(
+            [template], manifest.get_dependencies(self.source_file))
+        self.assertEqual([], manifest.get_dependencies(template))
+
+    def test_saves_dependencies(self):
+        manifest = self._make_one()
+        template = os.path.join(self.site, 'template.html')
+        manifest.record_dependencies(self.source_file, [template])
+
+        manifest.save()
+        manifest = self._make_one()
+
+        self.assertEqual(
+            [self.source_file], manifest.get_dependents(template))
+
+    def test_unchanged_dependencies_do_not_dirty(self):
+        manifest = self._make_one()
+        template = os.path.join(self.site, 'template.html')
+        manifest.record_dependencies(self.source_file, [template])
+        manifest.save()
+        manifest = self._make_one()
+
+        manifest.record_dependencies(self.source_file, [template])
+
+        self.assertFalse(manifest._dirty)
+
+    def test_gets_sources_in_directory(self):
+        manifest = self._make_one()
+        nested = os.path.join(self.site, 'dir', 'nested.txt')
+        os.mkdir(os.path.dirname(nested))
+        open(nested, 'w').close()
+        sibling = os.path.join(self.site, 'directory.txt')
+        open(sibling, 'w').close()
+        manifest.hash_file(nested)
+        manifest.hash_file(sibling)
+        manifest.record_dependencies(self.source_file, [])
+
+        self.assertEqual(
+            [nested], manifest.get_sources(os.path.dirname(nested)))
+        self.assertEqual(
+            [self.source_file], manifest.get_sources(self.source_file))
+
+    def test_removes_source(self):
+        manifest = self._make_one()
+        template = os.path.join(self.site, 'template.html')
+        manifest.hash_file(self.source_file)
+        manifest.record_dependencies(self.source_file, [template])
+        manifest.record_source_info(self.source_file, {'template': 'a'})
+        manifest.save()
+
+        manifest.remove_source(self.source_file)
+
+        self.assertTrue(manifest._dirty)
+        self.assertEqual([], manifest.get_sources(self.source_file))
+        self.assertEqual([], manifest.get_dependents(template))
+        self.assertEqual(
+            [], list(manifest.drain()['source_info']))
+
+    def test_removes_output(self):
+        manifest = self._make_one()
+        manifest.record(self.output_file, {'source': 'a_digest'})
+        manifest.record_content(self.output_file, 'a_digest')
+
+        manifest.remove_output(self.output_file)
+
+        self.assertFalse(manifest.has_record(self.output_file))
+        self.assertIsNone(manifest.get_content_digest(self.output_file))
+        self.assertEqual({}, manifest.drain()['outputs'])
+
+    def test_other_outdir_starts_outputs_over(self):
+        manifest = self._make_one()
+        manifest.hash_file(self.source_file)
+        manifest.record(self.output_file, {'source': 'a_digest'})
+        manifest.record_content(self.output_file, 'a_digest')
+        manifest.save()
+
+        other = BuildManifest(self.path, self.site, tempfile.mkdtemp())
+
+        self.assertFalse(other.has_record(self.output_file))
+        self.assertEqual({}, other._contents)
+        self.assertEqual(
+            [self.source_file], other.get_sources(self.source_file))
+        self.assertTrue(self._make_one().has_record(self.output_file))
+
+    def test_outdir_in_site_matches_after_move(self):
+        self.outdir = os.path.join(self.site, 'output')
+        os.mkdir(self.outdir)
+        output_file = os.path.join(self.outdir, 'source.txt')
+        open(output_file, 'w').close()
+        manifest = self._make_one()
+        manifest.record(output_file, {'source': 'a_digest'})
+        manifest.save()
+        moved = self.site + '-moved'
+        os.rename(self.site, moved)
+
+        manifest = BuildManifest(
+            self.path, moved, os.path.join(moved, 'output'))
+
+        self.assertTrue(manifest.has_record(
+            os.path.join(moved, 'output', 'source.txt')))
+
+    def test_unreadable_manifest_starts_over(self):
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, 'w') as f:
+            f.write('{not json')
+
+        manifest = self._make_one()
+
+        self.assertFalse(manifest.has_record(self.output_file))
+
+    def test_ignores_other_manifest_version(self):
+        manifest = self._make_one()
+        manifest.record(self.output_file, {'source': 'a_digest'})
+        manifest.save()
+
+        with mock.patch.object(BuildManifest, 'VERSION', 2):
+            manifest = self._make_one()
+
+        self.assertFalse(manifest.has_record(self.output_file))
+
+    def test_save_skips_unchanged_manifest(self):
+        manifest = self._make_one()
+        manifest.save()
+        self.assertFalse(os.path.exists(self.path))
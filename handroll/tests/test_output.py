@@ -0,0 +1,163 @@
+# Copyright (c) 2017, Matt Layman
+
+import json
+import os
+import tempfile
+
+import mock
+
+from handroll.manifest import BuildManifest
+from handroll.output import OutputWriter
+from handroll.tests import TestCase
+
+
+class TestOutputWriter(TestCase):
+
+    def setUp(self):
+        self.outdir = tempfile.mkdtemp()
+        self.output_file = os.path.join(self.outdir, 'page.html')
+
+    def _make_manifest(self):
+        path = os.path.join(tempfile.mkdtemp(), 'manifest.json')
+        return BuildManifest(path, tempfile.mkdtemp(), self.outdir)
+
+    def _read(self):
+        with open(self.output_file, 'rb') as f:
+            return f.read()
+
+    def test_writes_new_file(self):
+        writer = OutputWriter()
+
+        self.assertTrue(writer.write(self.output_file, b'content'))
+
+        self.assertEqual(b'content', self._read())
+        self.assertEqual(1, writer.written)
+
+    def test_leaves_same_content_alone(self):
+        with open(self.output_file, 'wb') as f:
+            f.write(b'content')
+        past = os.path.getmtime(self.output_file) - 10
+        os.utime(self.output_file, (past, past))
+        writer = OutputWriter()
+
+        self.assertFalse(writer.write(self.output_file, b'content'))
+
+        self.assertEqual(past, os.path.getmtime(self.output_file))
+        self.assertEqual(1, writer.unchanged)
+
+    def test_writes_changed_content(self):
+        with open(self.output_file, 'wb') as f:
+            f.write(b'content')
+        writer = OutputWriter()
+
+        self.assertTrue(writer.write(self.output_file, b'changed'))
+
+        self.assertEqual(b'changed', self._read())
+
+    def test_uses_manifest_hash(self):
+        manifest = self._make_manifest()
+        writer = OutputWriter(manifest)
+        writer.write(self.output_file, b'content')
+
+        with mock.patch('handroll.output.open', create=True) as mock_open:
+            self.assertFalse(writer.write(self.output_file, b'content'))
+
+        self.assertFalse(mock_open.called)
+
+    def test_writes_when_file_changed_outside_build(self):
+        manifest = self._make_manifest()
+        writer = OutputWriter(manifest)
+        writer.write(self.output_file, b'content')
+        with open(self.output_file, 'wb') as f:
+            f.write(b'edited by hand')
+
+        self.assertTrue(writer.write(self.output_file, b'content'))
+
+        self.assertEqual(b'content', self._read())
+
+    def test_records_hash_of_same_file(self):
+        with open(self.output_file, 'wb') as f:
+            f.write(b'content')
+        manifest = self._make_manifest()
+        writer = OutputWriter(manifest)
+
+        writer.write(self.output_file, b'content')
+
+        self.assertIsNotNone(manifest.get_content_digest(self.output_file))
+
+    def test_drain_and_merge(self):
+        worker_writer = OutputWriter()
+        worker_writer.write(self.output_file, b'content')
+        worker_writer.write(self.output_file, b'content')
+        writer = OutputWriter()
+
+        writer.merge(worker_writer.drain())
+
+        self.assertEqual(1, writer.written)
+        self.assertEqual(1, writer.unchanged)
+        self.assertEqual({self.output_file: 'unchanged'}, writer.changes)
+        self.assertEqual(0, worker_writer.written)
+        self.assertEqual({}, worker_writer.changes)
+
+    def test_tracks_changes(self):
+        writer = OutputWriter()
+        writer.write(self.output_file, b'content')
+        self.assertEqual('added', writer.changes[self.output_file])
+
+        writer.write(self.output_file, b'changed')
+        self.assertEqual('modified', writer.changes[self.output_file])
+
+        writer.write(self.output_file, b'changed')
+        self.assertEqual('unchanged', writer.changes[self.output_file])
+
+    def test_change_list(self):
+        os.mkdir(os.path.join(self.outdir, 'old'))
+        orphan = os.path.join(self.outdir, 'old', 'gone.html')
+        open(orphan, 'w').close()
+        ignored = os.path.join(self.outdir, 'changes.txt')
+        open(ignored, 'w').close()
+        copied = os.path.join(self.outdir, 'photo.png')
+        open(copied, 'w').close()
+        writer = OutputWriter()
+        writer.write(self.output_file, b'content')
+        writer.mark(copied, 'unchanged')
+
+        change_list = writer.get_change_list(
+            self.outdir, lambda path: path == ignored)
+
+        self.assertEqual({
+            'added': ['page.html'],
+            'modified': [],
+            'unchanged': ['photo.png'],
+            'orphaned': ['old/gone.html'],
+        }, change_list)
+
+    def test_writes_change_list_lines(self):
+        writer = OutputWriter()
+        writer.write(self.output_file, b'content')
+        path = os.path.join(tempfile.mkdtemp(), 'changes.txt')
+
+        writer.write_change_list(path, self.outdir)
+
+        with open(path) as f:
+            self.assertEqual('added page.html\n', f.read())
+
+    def test_writes_change_list_json(self):
+        writer = OutputWriter()
+        writer.write(self.output_file, b'content')
+        path = os.path.join(tempfile.mkdtemp(), 'changes.json')
+
+        writer.write_change_list(path, self.outdir)
+
+        with open(path) as f:
+            self.assertEqual(['page.html'], json.load(f)['added'])
+
+    @mock.patch('handroll.output.logger')
+    def test_report(self, logger):
+        writer = OutputWriter()
+        writer.write(self.output_file, b'content')
+
+        writer.report()
+
+        self.assertIn('1', logger.info.call_args[0][0])
+        self.assertEqual(0, writer.written)
@@ -0,0 +1,20 @@
+# Copyright (c) 2017, Matt Layman
+
+import warnings
+
+from handroll import plugins
+from handroll.tests import TestCase
+
+
+class TestFindEntryPoints(TestCase):
+
+    def test_finds_groups(self):
+        tables = plugins._find_entry_points()
+
+        self.assertIn('.md', tables['handroll.composers'])
+        self.assertIn('blog', tables['handroll.extensions'])
+
+    def test_finds_without_deprecation_warnings(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', DeprecationWarning)
+            plugins._find_entry_points()
@@ -0,0 +1,125 @@
+# Copyright (c) 2017, Matt Layman
+
+import json
+import os
+import tempfile
+
+import mock
+
+from handroll.profiler import NULL_TIMER, BuildProfiler
+from handroll.tests import TestCase
+
+
+class TestBuildProfiler(TestCase):
+
+    def test_disabled_without_output(self):
+        profiler = BuildProfiler()
+
+        self.assertFalse(profiler.enabled)
+        self.assertIs(NULL_TIMER, profiler.build())
+        self.assertIs(NULL_TIMER, profiler.phase('walk'))
+        self.assertIs(NULL_TIMER, profiler.file('a.md', object()))
+        self.assertIs(NULL_TIMER, profiler.extension(object(), 'hook'))
+
+    def test_times_file_phases(self):
+        profiler = BuildProfiler(log_summary=True)
+        composer = mock.Mock()
+
+        with profiler.file('a.md', composer):
+            with profiler.phase('convert'):
+                pass
+            with profiler.phase('convert'):
+                pass
+
+        report = profiler.report(1.0)
+        record = report['slowest_files'][0]
+        self.assertEqual('a.md', record['path'])
+        self.assertEqual('Mock', record['composer'])
+        self.assertEqual(['convert'], list(record['phases']))
+        self.assertEqual(1, report['composers']['Mock']['files'])
+        self.assertEqual(
+            record['phases']['convert'], report['phases']['convert'])
+
+    def test_times_extension_hooks(self):
+        profiler = BuildProfiler(log_summary=True)
+        extension = mock.Mock()
+
+        with profiler.extension(extension, 'post_composition'):
+            pass
+
+        report = profiler.report(1.0)
+        stats = report['extensions']['Mock']['post_composition']
+        self.assertEqual(1, stats['calls'])
+        self.assertEqual(stats['seconds'], report['phases']['extensions'])
+
+    def test_limits_slowest_files(self):
+        profiler = BuildProfiler(log_summary=True)
+        profiler.TOP_FILES = 2
+        for index, seconds in enumerate([0.1, 0.3, 0.2]):
+            profiler.merge({'phases': {}, 'extensions': {}, 'files': [{
+                'path': str(index), 'composer': 'Composer',
+                'seconds': seconds, 'phases': {}}]})
+
+        report = profiler.report(1.0)
+
+        self.assertEqual(
+            ['1', '2'], [record['path'] for record in report['slowest_files']])
+        self.assertEqual(3, report['file_count'])
+
+    def test_drain_and_merge(self):
+        worker = BuildProfiler(log_summary=True)
+        with worker.file('a.md', mock.Mock()):
+            with worker.phase('render'):
+                pass
+        with worker.extension(mock.Mock(), 'frontmatter_loaded'):
+            pass
+        profiler = BuildProfiler(log_summary=True)
+
+        profiler.merge(worker.drain())
+
+        report = profiler.report(1.0)
+        self.assertEqual(1, report['file_count'])
+        self.assertIn('frontmatter_loaded', report['extensions']['Mock'])
+        self.assertEqual(0, worker.report(1.0)['file_count'])
+
+    def test_writes_report(self):
+        report_path = os.path.join(tempfile.mkdtemp(), 'nested', 'report.json')
+        profiler = BuildProfiler(report_path=report_path)
+
+        with profiler.build():
+            with profiler.phase('walk'):
+                pass
+
+        with open(report_path) as f:
+            report = json.load(f)
+        self.assertEqual(
+            sorted(BuildProfiler.PHASES), sorted(report['phases']))
+
+    def test_no_report_for_failed_build(self):
+        report_path = os.path.join(tempfile.mkdtemp(), 'report.json')
+        profiler = BuildProfiler(report_path=report_path)
+
+        with self.assertRaises(ValueError):
+            with profiler.build():
+                raise ValueError()
+
+        self.assertFalse(os.path.exists(report_path))
+
+    def test_dumps_cprofile(self):
+        cprofile_path = os.path.join(tempfile.mkdtemp(), 'build.prof')
+        profiler = BuildProfiler(cprofile_path=cprofile_path)
+
+        with profiler.build():
+            pass
+
+        self.assertTrue(os.path.exists(cprofile_path))
+
+    @mock.patch('handroll.profiler.logger')
+    def test_logs_summary(self, logger):
+        profiler = BuildProfiler(log_summary=True)
+
+        with profiler.build():
+            with profiler.file('a.md', mock.Mock()):
+                pass
+
+        self.assertTrue(logger.warning.called)
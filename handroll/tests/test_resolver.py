@@ -27,6 +27,16 @@ class TestFileResolver(TestCase):
         route = resolver.as_route(md_file)
         self.assertEqual('/a_dir/test.html', route)
 
+    def test_as_output_file(self):
+        site = self.factory.make_site()
+        config = self.factory.make_configuration()
+        composers = Composers(config)
+        resolver = FileResolver(site.path, composers, config)
+        md_file = os.path.join(site.path, 'a_dir', 'test.md')
+        output_file = resolver.as_output_file(md_file, '/out')
+        self.assertEqual(
+            os.path.join('/out', 'a_dir', 'test.html'), output_file)
+
 
 class TestURLResolver(TestCase):
 
@@ -1,12 +1,15 @@
 # Copyright (c) 2017, Matt Layman
 
+import http.client
+import os
 import tempfile
+import threading
 
 import mock
 
 from handroll.configuration import Configuration
 from handroll.director import Director
-from handroll.server import serve
+from handroll.server import DevelopmentServer, SiteRequestHandler, serve
 from handroll.tests import TestCase
 
 
@@ -19,10 +22,10 @@ class TestServer(TestCase):
         self.director = Director(config, self.site, [])
 
     @mock.patch('handroll.server.Observer')
-    @mock.patch('handroll.server.socketserver.TCPServer')
-    def test_serves_forever(self, tcp_server, observer_cls):
+    @mock.patch('handroll.server.DevelopmentServer')
+    def test_serves_forever(self, server_cls, observer_cls):
         httpd = mock.MagicMock()
-        tcp_server.return_value = httpd
+        server_cls.return_value = httpd
         observer = mock.MagicMock()
         observer_cls.return_value = observer
 
@@ -32,15 +35,156 @@ class TestServer(TestCase):
         self.assertTrue(observer.start.called)
 
     @mock.patch('handroll.server.Observer')
-    @mock.patch('handroll.server.socketserver.TCPServer')
+    @mock.patch('handroll.server.DevelopmentServer')
     def test_server_quits_on_keyboard_interrupt(
-            self, tcp_server, observer_cls):
+            self, server_cls, observer_cls):
         httpd = mock.MagicMock()
         httpd.serve_forever.side_effect = KeyboardInterrupt
-        tcp_server.return_value = httpd
+        server_cls.return_value = httpd
         observer = mock.MagicMock()
         observer_cls.return_value = observer
 
         serve(self.site, self.director)
 
         self.assertTrue(observer.stop.called)
+        self.assertTrue(httpd.server_close.called)
+
+    @mock.patch('handroll.server.Observer')
+    @mock.patch('handroll.server.DevelopmentServer')
+    def test_serves_output_at_address(self, server_cls, observer_cls):
+        cwd = os.getcwd()
+
+        serve(self.site, self.director, port=8080, bind='127.0.0.1')
+
+        server_cls.assert_called_once_with(
+            ('127.0.0.1', 8080), self.director.outdir)
+        self.assertEqual(cwd, os.getcwd())
+
+
+class TestDevelopmentServer(TestCase):
+
+    def setUp(self):
+        self.outdir = tempfile.mkdtemp()
+        with open(os.path.join(self.outdir, 'index.html'), 'w') as f:
+            f.write('<p>Hello</p>')
+        self.httpd = DevelopmentServer(('127.0.0.1', 0), self.outdir)
+        thread = threading.Thread(
+            target=self.httpd.serve_forever, kwargs={'poll_interval': 0.01})
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(self.httpd.server_close)
+        self.addCleanup(self.httpd.shutdown)
+        self.connection = http.client.HTTPConnection(
+            '127.0.0.1', self.httpd.server_address[1])
+        self.addCleanup(self.connection.close)
+
+    def _request(self, path, method='GET', headers=None):
+        self.connection.request(method, path, headers=headers or {})
+        response = self.connection.getresponse()
+        body = response.read()
+        return response, body
+
+    def test_serves_file(self):
+        response, body = self._request('/index.html')
+
+        self.assertEqual(200, response.status)
+        self.assertEqual(b'<p>Hello</p>', body)
+        self.assertEqual('text/html', response.getheader('Content-Type'))
+        self.assertIsNotNone(response.getheader('ETag'))
+        self.assertIsNotNone(response.getheader('Last-Modified'))
+
+    def test_serves_directory_index(self):
+        response, body = self._request('/')
+        self.assertEqual(b'<p>Hello</p>', body)
+
+    def test_redirects_directory_without_slash(self):
+        os.mkdir(os.path.join(self.outdir, 'blog'))
+
+        response, body = self._request('/blog?page=2')
+
+        self.assertEqual(301, response.status)
+        self.assertEqual('/blog/?page=2', response.getheader('Location'))
+
+    def test_lists_directory_without_index(self):
+        os.mkdir(os.path.join(self.outdir, 'blog'))
+        open(os.path.join(self.outdir, 'blog', 'post.html'), 'w').close()
+
+        response, body = self._request('/blog/')
+
+        self.assertEqual(200, response.status)
+        self.assertIn(b'post.html', body)
+
+    def test_missing_file(self):
+        response, body = self._request('/missing.html')
+        self.assertEqual(404, response.status)
+
+    def test_keeps_connection_alive(self):
+        self._request('/index.html')
+        sock = self.connection.sock
+
+        response, body = self._request('/index.html')
+
+        self.assertEqual(200, response.status)
+        self.assertIs(sock, self.connection.sock)
+
+    def test_not_modified_for_matching_etag(self):
+        response, body = self._request('/index.html')
+        etag = response.getheader('ETag')
+
+        response, body = self._request(
+            '/index.html', headers={'If-None-Match': etag})
+
+        self.assertEqual(304, response.status)
+        self.assertEqual(b'', body)
+        self.assertEqual(etag, response.getheader('ETag'))
+
+    def test_modified_for_other_etag(self):
+        response, body = self._request(
+            '/index.html', headers={'If-None-Match': '"other"'})
+        self.assertEqual(200, response.status)
+
+    def test_not_modified_since_last_modified(self):
+        response, body = self._request('/index.html')
+        last_modified = response.getheader('Last-Modified')
+
+        response, body = self._request(
+            '/index.html', headers={'If-Modified-Since': last_modified})
+
+        self.assertEqual(304, response.status)
+
+    def test_modified_since_older_date(self):
+        response, body = self._request('/index.html', headers={
+            'If-Modified-Since': 'Thu, 01 Jan 1970 00:00:00 GMT'})
+        self.assertEqual(200, response.status)
+
+    def test_ignores_invalid_modified_since(self):
+        response, body = self._request(
+            '/index.html', headers={'If-Modified-Since': 'garbage'})
+        self.assertEqual(200, response.status)
+
+    def test_head_has_no_body(self):
+        response, body = self._request('/index.html', method='HEAD')
+
+        self.assertEqual(200, response.status)
+        self.assertEqual('12', response.getheader('Content-Length'))
+        self.assertEqual(b'', body)
+
+    def test_sends_large_file(self):
+        content = os.urandom(SiteRequestHandler.SENDFILE_SIZE * 2)
+        with open(os.path.join(self.outdir, 'large.bin'), 'wb') as f:
+            f.write(content)
+
+        response, body = self._request('/large.bin')
+
+        self.assertEqual(content, body)
+
+    def test_stays_in_output_directory(self):
+        outside = os.path.join(os.path.dirname(self.outdir), 'secret.txt')
+        with open(outside, 'w') as f:
+            f.write('secret')
+        self.addCleanup(os.remove, outside)
+
+        response, body = self._request('/../secret.txt')
+
+        self.assertEqual(404, response.status)
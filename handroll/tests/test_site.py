@@ -52,3 +52,84 @@ class TestSite(TestCase):
         self.assertEqual(2, len(dirnames))
         self.assertEqual('keep', dirnames[0])
         self.assertEqual('another_keeper', dirnames[1])
+
+    def test_walk_skips_cache(self):
+        site = self.factory.make_site()
+        os.mkdir(site.cache_root)
+
+        for dirpath, dirnames, filenames in site.walk():
+            self.assertNotIn(Site.CACHE, dirnames)
+
+    def test_scan_skips_excluded_paths(self):
+        site = self.factory.make_site()
+        for directory in ('buildcache', 'pages', 'pages/public'):
+            os.mkdir(os.path.join(site.path, directory))
+        for filename in ('changes.txt', 'index.md', 'pages/about.md'):
+            open(os.path.join(site.path, filename), 'w').close()
+        site.exclude(os.path.join(site.path, 'buildcache'))
+        site.exclude(os.path.join(site.path, 'pages', 'public'))
+        site.exclude(os.path.join(site.path, 'changes.txt'))
+
+        walk = self._normalize(site.scan().walk())
+
+        self.assertEqual([
+            (site.path, ['pages'], ['index.md']),
+            (os.path.join(site.path, 'pages'), [], ['about.md']),
+        ], walk)
+        self.assertTrue(site.is_excluded(
+            os.path.join(site.path, 'changes.txt')))
+
+    def _make_site_tree(self):
+        site = self.factory.make_site()
+        for directory in ('pages', 'pages/deep', 'templates', 'output'):
+            os.mkdir(os.path.join(site.path, directory))
+        for filename in ('index.md', 'template.html', 'pages/about.md',
+                         'pages/deep/more.md', 'templates/base.j2'):
+            open(os.path.join(site.path, filename), 'w').close()
+        os.mkdir(site.cache_root)
+        return site
+
+    def _normalize(self, walk):
+        return sorted(
+            (dirpath, sorted(dirnames), sorted(filenames))
+            for dirpath, dirnames, filenames in walk)
+
+    def test_scan_matches_walk(self):
+        site = self._make_site_tree()
+
+        inventory = site.scan()
+
+        self.assertEqual(
+            self._normalize(site.walk()), self._normalize(inventory.walk()))
+
+    def test_scan_has_parents_first(self):
+        site = self._make_site_tree()
+
+        dirpaths = [dirpath for dirpath, _, _ in site.scan().walk()]
+
+        self.assertLess(
+            dirpaths.index(os.path.join(site.path, 'pages')),
+            dirpaths.index(os.path.join(site.path, 'pages', 'deep')))
+
+    def test_scan_keeps_file_stats(self):
+        site = self._make_site_tree()
+        about = os.path.join(site.path, 'pages', 'about.md')
+
+        inventory = site.scan()
+
+        self.assertEqual(os.stat(about), inventory.stat(about))
+        self.assertIsNone(inventory.stat(os.path.join(site.path, 'pages')))
+
+    def test_scan_does_not_follow_directory_links(self):
+        site = self._make_site_tree()
+        os.symlink(
+            os.path.join(site.path, 'pages'),
+            os.path.join(site.path, 'linked'))
+
+        inventory = site.scan()
+
+        dirpaths = [dirpath for dirpath, _, _ in inventory.walk()]
+        self.assertNotIn(os.path.join(site.path, 'linked'), dirpaths)
+        root = [dirnames for dirpath, dirnames, _ in inventory.walk()
+                if dirpath == site.path][0]
+        self.assertIn('linked', root)
@@ -15,6 +15,7 @@ class TestSitemapExtention(TestCase):
         signals.frontmatter_loaded.receivers.clear()
         signals.pre_composition.receivers.clear()
         signals.post_composition.receivers.clear()
+        signals.source_removed.receivers.clear()
 
     def _make_one(self, director):
         director.config.parser.add_section('sitemap')
@@ -34,6 +35,32 @@ class TestSitemapExtention(TestCase):
         extension = SitemapExtension(None)
         self.assertTrue(extension.handle_post_composition)
 
+    def test_handles_source_removed(self):
+        extension = SitemapExtension(None)
+        self.assertTrue(extension.handle_source_removed)
+
+    def test_removes_url_of_removed_source(self):
+        director = self.factory.make_director()
+        extension = self._make_one(director)
+        path = os.path.join(director.site.path, 'sample.md')
+        extension.on_frontmatter_loaded(path, {})
+        extension._dirty = False
+
+        extension.on_source_removed(path)
+
+        self.assertFalse(extension.urls)
+        self.assertTrue(extension._dirty)
+
+    def test_not_dirty_when_removed_source_had_no_url(self):
+        director = self.factory.make_director()
+        extension = self._make_one(director)
+        extension._dirty = False
+        path = os.path.join(director.site.path, 'sample.md')
+
+        extension.on_source_removed(path)
+
+        self.assertFalse(extension._dirty)
+
     def test_records_html_url(self):
         director = self.factory.make_director()
         extension = self._make_one(director)
@@ -5,7 +5,9 @@ import tempfile
 import unittest
 
 import jinja2
+import mock
 
+from handroll.assets import AssetLookup, AssetManifest
 from handroll.exceptions import AbortError
 from handroll import template
 from handroll.template.catalog import StringTemplate
@@ -44,6 +46,43 @@ class TestJinjaTemplateBuilder(unittest.TestCase):
         self.assertEqual(
             os.path.getmtime(self.base_file), template.last_modified)
 
+    def test_digest_with_changed_parent(self):
+        template_file = os.path.join(self.templates, 'derived.j2')
+        with open(template_file, 'w') as f:
+            f.write('{% extends "base.j2" %}')
+        digest = self.builder.build(template_file).digest
+        with open(self.base_file, 'w') as f:
+            f.write('A change')
+
+        builder = JinjaTemplateBuilder(self.templates)
+        template = builder.build(template_file)
+
+        self.assertNotEqual(digest, template.digest)
+
+    def test_dependencies_include_chain(self):
+        middle_file = os.path.join(self.templates, 'middle.j2')
+        with open(middle_file, 'w') as f:
+            f.write('{% extends "base.j2" %}')
+        template_file = os.path.join(self.templates, 'derived.j2')
+        with open(template_file, 'w') as f:
+            f.write('{% extends "middle.j2" %}')
+
+        template = self.builder.build(template_file)
+
+        self.assertEqual(
+            sorted([self.base_file, middle_file, template_file]),
+            sorted(template.dependencies))
+
+    def test_reset_picks_up_changes(self):
+        self.builder.build(self.base_file)
+        with open(self.base_file, 'w') as f:
+            f.write('changed')
+
+        self.builder.reset()
+        template = self.builder.build(self.base_file)
+
+        self.assertEqual('changed', template.render())
+
     def test_skips_nonetype_parent(self):
         with open(self.base_file, 'w') as f:
             f.write('{% include helper %}')  # Non-existent "parent"
@@ -55,6 +94,72 @@ class TestJinjaTemplateBuilder(unittest.TestCase):
         template = self.builder.build(self.base_file)
         self.assertTrue(isinstance(template, jinja2.Template))
 
+    def test_stores_bytecode_in_cache(self):
+        cache = os.path.join(tempfile.mkdtemp(), 'jinja')
+        builder = JinjaTemplateBuilder(self.templates, cache)
+
+        builder.build(self.base_file)
+
+        self.assertEqual(1, len(os.listdir(cache)))
+
+    def test_loads_bytecode_from_cache(self):
+        cache = tempfile.mkdtemp()
+        JinjaTemplateBuilder(self.templates, cache).build(self.base_file)
+        builder = JinjaTemplateBuilder(self.templates, cache)
+
+        env = builder._env
+        with mock.patch.object(env, 'compile', wraps=env.compile) as compile:
+            builder.build(self.base_file)
+
+        self.assertFalse(compile.called)
+
+    def test_builds_page_that_extends_template(self):
+        with open(self.base_file, 'w') as f:
+            f.write('<p>{% block body %}{% endblock %}</p>')
+        page_file = os.path.join(tempfile.mkdtemp(), 'page.html.j2')
+
+        template = self.builder.build_page(
+            '{% extends "base.j2" %}{% block body %}{{ title }}{% endblock %}',
+            page_file)
+
+        self.assertEqual('<p>Hi</p>', template.render({'title': 'Hi'}))
+        self.assertEqual([self.base_file], template.dependencies)
+
+    def test_page_digest_with_changed_template(self):
+        source = '{% include "base.j2" %}'
+        page_file = os.path.join(tempfile.mkdtemp(), 'page.html.j2')
+        digest = self.builder.build_page(source, page_file).digest
+        with open(self.base_file, 'w') as f:
+            f.write('A change')
+
+        builder = JinjaTemplateBuilder(self.templates)
+        template = builder.build_page(source, page_file)
+
+        self.assertNotEqual(digest, template.digest)
+
+    def test_loads_page_bytecode_from_cache(self):
+        cache = tempfile.mkdtemp()
+        page_file = os.path.join(tempfile.mkdtemp(), 'page.html.j2')
+        JinjaTemplateBuilder(self.templates, cache).build_page(
+            '{{ title }}', page_file)
+        builder = JinjaTemplateBuilder(self.templates, cache)
+
+        env = builder._env
+        with mock.patch.object(env, 'compile', wraps=env.compile) as compile:
+            template = builder.build_page('{{ title }}', page_file)
+
+        self.assertFalse(compile.called)
+        self.assertEqual('Hi', template.render({'title': 'Hi'}))
+
+    def test_aborts_with_bad_page(self):
+        with self.assertRaises(AbortError):
+            self.builder.build_page('{%', '/site/page.html.j2')
+
+    def test_aborts_with_page_of_missing_template(self):
+        with self.assertRaises(AbortError):
+            self.builder.build_page(
+                '{% extends "missing.j2" %}', '/site/page.html.j2')
+
 
 class TestStringTemplate(unittest.TestCase):
 
@@ -64,6 +169,38 @@ class TestStringTemplate(unittest.TestCase):
         template = StringTemplate(path)
         self.assertEqual(expected, template.last_modified)
 
+    def test_template_digest(self):
+        fh, path = tempfile.mkstemp()
+        digest = StringTemplate(path).digest
+        with open(path, 'w') as f:
+            f.write('$content')
+        self.assertNotEqual(digest, StringTemplate(path).digest)
+
+    def test_template_dependencies(self):
+        fh, path = tempfile.mkstemp()
+        template = StringTemplate(path)
+        self.assertEqual([path], template.dependencies)
+
+    def test_renders_asset_url(self):
+        fh, path = tempfile.mkstemp()
+        with open(path, 'w') as f:
+            f.write('<link href="${asset: css/site.css }"> $content')
+        template = StringTemplate(path)
+        assets = AssetManifest()
+        assets.add('/site/css/site.css', 'css/site.css', '1234567890')
+
+        html = template.render(
+            {'content': 'hi', 'asset': AssetLookup(assets)})
+
+        self.assertEqual('<link href="/css/site.12345678.css"> hi', html)
+
+    def test_leaves_asset_placeholder_without_lookup(self):
+        fh, path = tempfile.mkstemp()
+        with open(path, 'w') as f:
+            f.write('${asset:css/site.css}')
+        template = StringTemplate(path)
+        self.assertEqual('${asset:css/site.css}', template.render({}))
+
 
 class TestTemplateCatalog(unittest.TestCase):
 
@@ -93,6 +230,26 @@ class TestTemplateCatalog(unittest.TestCase):
         with self.assertRaises(NotImplementedError):
             template.last_modified
 
+    def test_dependencies_not_implemented(self):
+        from handroll.template.catalog import Template
+        template = Template()
+        with self.assertRaises(NotImplementedError):
+            template.dependencies
+
+    def test_reset_forgets_templates(self):
+        catalog = self._make_one_with_template('page.html')
+        template = catalog.get_template('page.html')
+
+        catalog.reset()
+
+        self.assertIsNot(template, catalog.get_template('page.html'))
+
+    def test_digest_not_implemented(self):
+        from handroll.template.catalog import Template
+        template = Template()
+        with self.assertRaises(NotImplementedError):
+            template.digest
+
     def test_renders_default(self):
         """Test rendering a default template."""
         content = '<html>${title}${content}</html>\n'
@@ -140,6 +297,15 @@ class TestTemplateCatalog(unittest.TestCase):
         path = os.path.join(catalog.templates_path, 'foundme.html')
         self.assertTrue(catalog.is_template(path))
 
+    def test_builds_jinja_page_with_site_templates(self):
+        catalog = self._make_one_with_template('base.j2')
+        page_file = os.path.join(self.site_path, 'page.html.j2')
+
+        template = catalog.build_jinja_page(
+            '{% include "base.j2" %}', page_file)
+
+        self.assertEqual('Does not matter.', template.render())
+
     def test_is_not_a_template(self):
         catalog = self._make_one()
         self.assertFalse(catalog.is_template('nope'))